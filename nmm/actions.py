@@ -0,0 +1,151 @@
+"""The canonical integer actions of nine men's morris, with their encode and decode tables.
+
+Every action a side can take is an integer in `[0, NUM_ACTIONS)`, by kind (see `ACTION_STATES`):
+- `PLACE + c` (24 actions): place a piece on the cell `c`,
+- `MOVE + i` (64 actions): move a piece to an adjacent cell, `i` numbering the (source, destination)
+  pairs of adjacent cells in the order of the source, then of the destination,
+- `FLY + i` (552 actions): fly a piece (a side with 3 pieces), `i` numbering all the (source, destination)
+  pairs of distinct cells in the same order; a flying side flies to adjacent cells too,
+- `KILL + c` (24 actions): kill the opponent's piece on the cell `c`.
+So a legal action has exactly one integer, which is what the transposition tables, the game logs,
+the policies and the messages between processes store. `ACTION_SOURCES` and `ACTION_TARGETS` decode
+an action into cell ids, `MOVE_ACTIONS` and `FLY_ACTIONS` encode the moves, and `legal_mask` gives
+the legal actions of a `nmm.positions.Position` as a mask, where bit `a` stands for the action `a`.
+`encode_action` / `decode_action` convert from / to the cells of a `Board` or a `BitBoard`
+(as `AIPlayer.play` returns them).
+"""
+from typing import List, Tuple, Union, TYPE_CHECKING
+
+from nmm.topology import NUM_CELLS, FULL_MASK, ADJACENT, CellIndex, mask_to_ids
+from nmm.dtypes import PlayerState
+from nmm.cells import Cell
+from nmm.boards import Board
+from nmm.bitboards import BitBoard
+
+if TYPE_CHECKING:
+    from nmm.positions import Position
+
+
+def _build_pairs(adjacent:bool) -> Tuple[Tuple[int, int], ...]:
+    """The (source, destination) pairs of the moves (adjacent cells) or of the flights (distinct cells)."""
+    return tuple((source, destination) for source in range(NUM_CELLS) for destination in range(NUM_CELLS)
+                 if (destination in ADJACENT[source] if adjacent else destination != source))
+
+
+MOVE_PAIRS: Tuple[Tuple[int, int], ...] = _build_pairs(adjacent=True)
+FLY_PAIRS: Tuple[Tuple[int, int], ...] = _build_pairs(adjacent=False)
+
+PLACE: int = 0
+MOVE: int = PLACE + NUM_CELLS
+FLY: int = MOVE + len(MOVE_PAIRS)
+KILL: int = FLY + len(FLY_PAIRS)
+NUM_ACTIONS: int = KILL + NUM_CELLS
+
+ACTION_STATES: Tuple[PlayerState, ...] = ((PlayerState.PLACING,) * NUM_CELLS + (PlayerState.MOVING,) * len(MOVE_PAIRS)
+                                          + (PlayerState.FLYING,) * len(FLY_PAIRS) + (PlayerState.KILLING,) * NUM_CELLS)
+ACTION_SOURCES: Tuple[int, ...] = ((-1,) * NUM_CELLS + tuple(s for s, _ in MOVE_PAIRS) + tuple(s for s, _ in FLY_PAIRS)
+                                   + (-1,) * NUM_CELLS)  # -1 for the placements and the kills
+ACTION_TARGETS: Tuple[int, ...] = (tuple(range(NUM_CELLS)) + tuple(d for _, d in MOVE_PAIRS)
+                                   + tuple(d for _, d in FLY_PAIRS) + tuple(range(NUM_CELLS)))
+
+
+def _build_encoding(first:int, pairs:Tuple[Tuple[int, int], ...]) -> Tuple[Tuple[int, ...], ...]:
+    """`table[source][destination]`: the action of a move (or a flight), or -1 if there is none."""
+    table = [[-1] * NUM_CELLS for _ in range(NUM_CELLS)]
+    for i, (source, destination) in enumerate(pairs):
+        table[source][destination] = first + i
+    return tuple(tuple(row) for row in table)
+
+
+def _build_masks(encoding:Tuple[Tuple[int, ...], ...]) -> Tuple[Tuple[int, ...], Tuple[int, ...]]:
+    """The masks of the actions from every source cell, and of the actions to every destination cell."""
+    sources, destinations = [0] * NUM_CELLS, [0] * NUM_CELLS
+    for source in range(NUM_CELLS):
+        for destination in range(NUM_CELLS):
+            if (action := encoding[source][destination]) >= 0:
+                sources[source] |= 1 << action
+                destinations[destination] |= 1 << action
+    return tuple(sources), tuple(destinations)
+
+
+MOVE_ACTIONS: Tuple[Tuple[int, ...], ...] = _build_encoding(MOVE, MOVE_PAIRS)
+FLY_ACTIONS: Tuple[Tuple[int, ...], ...] = _build_encoding(FLY, FLY_PAIRS)
+_MOVES_FROM, _MOVES_TO = _build_masks(MOVE_ACTIONS)
+_FLIGHTS_FROM, _FLIGHTS_TO = _build_masks(FLY_ACTIONS)
+
+
+def check_action(action:int) -> int:
+    if not isinstance(action, int) or not 0 <= action < NUM_ACTIONS:
+        raise ValueError(f"Invalid action: {action} !")
+    return action
+
+
+def legal_mask(position:'Position') -> int:
+    """The mask of the legal actions of the side to move of a position.
+    The moves are the actions from a cell of the side to move and to an empty cell,
+    which is the AND of the precomputed masks of those cells."""
+    side = position.side
+    mine, theirs = position.occupancy[side], position.occupancy[1 - side]
+    if position.pending:
+        return theirs << KILL
+    empty = FULL_MASK & ~(mine | theirs)
+    if position.ready[side]:
+        return empty << PLACE
+    flying = mine.bit_count() == 3  # a side left with 3 pieces flies
+    sources, destinations = (_FLIGHTS_FROM, _FLIGHTS_TO) if flying else (_MOVES_FROM, _MOVES_TO)
+    frm = to = 0
+    for source in mask_to_ids(mine):
+        frm |= sources[source]
+    for destination in mask_to_ids(empty):
+        to |= destinations[destination]
+    return frm & to
+
+
+def mask_to_actions(mask:int) -> List[int]:
+    """The actions of a mask (in increasing order)."""
+    return list(mask_to_ids(mask))
+
+
+def encode_action(board:Union[Board, BitBoard], move:Union[Cell, CellIndex, Tuple[Union[Cell, CellIndex], ...]],
+                  state:PlayerState) -> int:
+    """The action of a move as `AIPlayer.play` returns it (a cell, or a pair of cells), in the given state."""
+    if state in (PlayerState.MOVING, PlayerState.FLYING):
+        if not isinstance(move, (tuple, list)) or len(move) != 2:
+            raise ValueError(f"A move must be a pair of cells, not {move} !")
+        source, destination = _cell_id(board, move[0]), _cell_id(board, move[1])
+        action = (MOVE_ACTIONS if state == PlayerState.MOVING else FLY_ACTIONS)[source][destination]
+        if action < 0:
+            raise ValueError(f"Cannot move from {move[0]} to {move[1]} while {state.value.lower()} !")
+        return action
+    if state == PlayerState.PLACING:
+        return PLACE + _cell_id(board, move)
+    if state == PlayerState.KILLING:
+        return KILL + _cell_id(board, move)
+    raise ValueError(f"No action in state {state} !")
+
+
+def _cell_id(board:Union[Board, BitBoard], cell:Union[Cell, CellIndex]) -> int:
+    cell = board.check_cell(cell)
+    return cell if isinstance(cell, int) else cell.id
+
+
+def decode_action(board:Union[Board, BitBoard], action:int) -> Union[Cell, CellIndex, Tuple[Union[Cell, CellIndex], ...]]:
+    """The cells of an action on a `Board` or a `BitBoard`, as `AIPlayer.play` returns them:
+    a cell to place on or to kill, or a `(source, destination)` pair of cells."""
+    check_action(action)
+    cells = board.cells
+    source = ACTION_SOURCES[action]
+    if source < 0:
+        return cells[ACTION_TARGETS[action]]
+    return cells[source], cells[ACTION_TARGETS[action]]
+
+
+def action_name(action:int) -> str:
+    """A readable name of an action, e.g. 'place 3', 'move 0-1', 'fly 0-23' or 'kill 7' (cell ids)."""
+    check_action(action)
+    kind = {PlayerState.PLACING: 'place', PlayerState.MOVING: 'move',
+            PlayerState.FLYING: 'fly', PlayerState.KILLING: 'kill'}[ACTION_STATES[action]]
+    source = ACTION_SOURCES[action]
+    if source < 0:
+        return f"{kind} {ACTION_TARGETS[action]}"
+    return f"{kind} {source}-{ACTION_TARGETS[action]}"
@@ -2,17 +2,27 @@
 import random
 import time
 from abc import ABC, abstractmethod
-from typing import Tuple
+from typing import Callable, Tuple, Optional, Union
 from nmm.players import Player
 from nmm.boards import Board
 from nmm.dtypes import PlayerState
 from nmm.players import AIPlayer
+from nmm.cells import Cell
+from nmm.search import TranspositionTable, AlphaBeta, SearchResult, evaluate
+from nmm.positions import Position, NO_ACTION, decode_turn
+from nmm.actions import KILL, decode_action
+from nmm.parallel import PARALLEL_SEARCHES, ParallelMCTS
+from nmm.mcts import MCTS, MCTSResult
+from nmm.tablebase.probe import Tablebase
 
 
 
 
 class RandomAgent(AIPlayer):
     def play(self, board:Board, state:PlayerState) -> Tuple[int, int, int]:
+        move = self.tablebase_play(board, state)
+        if move is not None:
+            return move
         if state == PlayerState.PLACING:
             return random.choice(board.get_empty_cells())
         elif state == PlayerState.KILLING:
@@ -29,13 +39,158 @@ class RandomAgent(AIPlayer):
         return None
 
 
-class EasyAgent(AIPlayer):
+class SearchAgent(AIPlayer):
+    """An agent playing the best turn found by an `AlphaBeta` search of `time_limit` seconds
+    (and at most `max_depth` turns). `last_search` is the `SearchResult` of its last search.
+    With `workers` > 1, the search runs in parallel, which searches deeper within the same time: `parallel`
+    is one of `nmm.parallel.PARALLEL_SEARCHES`, 'lazy_smp' (`LazySMPSearch`, all the workers search the root
+    and share a transposition table) or 'root_split' (`RootSplitSearch`, the workers split the turns of the root).
+    Call `close()` (or use a `with` block) to stop the workers, which are also stopped when the agent is dropped.
+    `evaluation` is the static evaluation of the leaves of the search (override it with another function
+    of a module, so that the workers can use it).
+
+    The transposition table, the killers and the history of the search are kept across the turns of a game.
+    A parallel search has its own tables (in its workers, or shared by them): it cannot be given
+    a `transposition_table`, and the agent's is `None`.
+
+    The game asks for the kills of a turn after its placement or move (`PlayerState.KILLING`):
+    the agent then plays the kills of the turn it searched, without searching again."""
+    time_limit: float = 1.0
+    max_depth: int = 64
+    evaluation: Callable[[Position], int] = staticmethod(evaluate)
+
+    def __init__(self, name:str, time_limit:Optional[float]=None, max_depth:Optional[int]=None,
+                 transposition_table:Optional[TranspositionTable]=None, tablebase:Optional[Union[Tablebase, str]]=None,
+                 workers:int=1, parallel:str='lazy_smp'):
+        super().__init__(name, tablebase)
+        if time_limit is not None:
+            if time_limit <= 0:
+                raise ValueError(f"The time limit must be positive, not {time_limit} !")
+            self.time_limit = time_limit
+        if max_depth is not None:
+            self.max_depth = max_depth
+        if parallel not in PARALLEL_SEARCHES:
+            raise ValueError(f"Unknown parallel search: {parallel} !")
+        self.workers = workers
+        self.parallel = parallel
+        if workers > 1:
+            if transposition_table is not None:
+                raise ValueError("A parallel search cannot be given a transposition table, its workers have their own !")
+            self.transposition_table: Optional[TranspositionTable] = None
+            self.searcher = PARALLEL_SEARCHES[parallel](workers, tablebase=self.tablebase, evaluation=self.evaluation)
+        else:
+            self.transposition_table = TranspositionTable() if transposition_table is None else transposition_table
+            self.searcher = AlphaBeta(self.transposition_table, self.tablebase, self.evaluation)
+        self.last_search: Optional[SearchResult] = None
+        self._kills: Optional[Tuple[int, int]] = None  # (key of the position, victims) of the kills to play
+
+    def close(self):
+        if not isinstance(self.searcher, AlphaBeta):
+            self.searcher.close()
+
     def play(self, board:Board, state:PlayerState) -> Tuple[int, int, int]:
-        ### >>> YOUR CODE HERE <<< ###
-        return None
+        move = self.tablebase_play(board, state)
+        if move is not None:
+            return move
+        position = Position.from_board(board, self)
+        if state == PlayerState.KILLING and self._kills is not None and self._kills[0] == position.key:
+            return self._kill(board, position, self._kills[1])
+        self._kills = None
+        self.last_search = self.searcher.search(position, max_depth=self.max_depth, time_limit=self.time_limit)
+        if self.last_search.turn is None:
+            return None
+        action, victims = decode_turn(self.last_search.turn)
+        if action == NO_ACTION:
+            return self._kill(board, position, victims)
+        if victims:
+            position.apply(action)
+            self._kills = (position.key, victims)
+        return decode_action(board, action)
+
+    def _kill(self, board:Board, position:Position, victims:int) -> Cell:
+        """Kill the first of the victims, and keep the others for the next kills of the turn."""
+        victim = (victims & -victims).bit_length() - 1
+        victims ^= 1 << victim
+        position.apply(KILL + victim)
+        self._kills = (position.key, victims) if victims else None
+        return decode_action(board, KILL + victim)
+
+    def clone(self):
+        return self.__class__(self._name, self.time_limit, self.max_depth, tablebase=self.tablebase, workers=self.workers,
+                              parallel=self.parallel)
+
+
+class EasyAgent(SearchAgent):
+    """A shallow and quick search."""
+    time_limit: float = 0.5
+    max_depth: int = 3
 
 
-class HardAgent(AIPlayer):
+class HardAgent(SearchAgent):
+    """A deep search. The transposition table is kept across the moves of a game (and, with one worker,
+    can be shared with other agents)."""
+    time_limit: float = 3.0
+    max_depth: int = 64
+
+    def __init__(self, name:str, transposition_table:Optional[TranspositionTable]=None,
+                 tablebase:Optional[Union[Tablebase, str]]=None, time_limit:Optional[float]=None,
+                 max_depth:Optional[int]=None, workers:int=1, parallel:str='lazy_smp'):
+        super().__init__(name, time_limit, max_depth, transposition_table, tablebase, workers, parallel)
+
+    def clone(self):
+        return self.__class__(self._name, self.transposition_table, self.tablebase, self.time_limit, self.max_depth,
+                              self.workers, self.parallel)
+
+
+class MCTSAgent(AIPlayer):
+    """An agent playing the most visited action of a Monte Carlo tree search (see `nmm.mcts.MCTS`)
+    of `iterations` iterations, or of `time_limit` seconds (1 second when neither is given).
+    `last_search` is the `MCTSResult` of its last search.
+
+    The search is over the actions of the game, so the agent searches again for every kill.
+    The tree is kept across the turns: the next search starts from the subtree of the action played
+    and of the reply of the opponent (found by comparing the boards), unless the game went elsewhere.
+    With `workers` > 1, the random games run in parallel (see `nmm.parallel.ParallelMCTS`, and its
+    `deterministic` mode); call `close()` (or use a `with` block) to stop the workers, which are also stopped
+    when the agent is dropped."""
+    time_limit: float = 1.0
+
+    def __init__(self, name:str, time_limit:Optional[float]=None, iterations:Optional[int]=None, formula:str='uct',
+                 exploration:float=1.4, playouts:int=32, max_nodes:int=1 << 18,
+                 tablebase:Optional[Union[Tablebase, str]]=None, seed:Optional[int]=None, workers:int=1,
+                 deterministic:bool=False):
+        super().__init__(name, tablebase)
+        if time_limit is not None and time_limit <= 0:
+            raise ValueError(f"The time limit must be positive, not {time_limit} !")
+        if iterations is not None and iterations < 1:
+            raise ValueError(f"The number of iterations must be positive, not {iterations} !")
+        self.time_limit = time_limit if time_limit is not None or iterations is not None else self.time_limit
+        self.iterations = iterations
+        if workers > 1:
+            self.mcts = ParallelMCTS(workers, formula, exploration, playouts, max_nodes, seed=seed,
+                                     deterministic=deterministic)
+        else:
+            self.mcts = MCTS(formula, exploration, playouts, max_nodes, seed=seed)
+        self.seed = seed
+        self.workers = workers
+        self.deterministic = deterministic
+        self.last_search: Optional[MCTSResult] = None
+
+    def close(self):
+        if isinstance(self.mcts, ParallelMCTS):
+            self.mcts.close()
+
     def play(self, board:Board, state:PlayerState) -> Tuple[int, int, int]:
-        ### >>> YOUR CODE HERE <<< ###
-        return None
+        move = self.tablebase_play(board, state)
+        if move is not None:
+            return move
+        self.last_search = self.mcts.search(Position.from_board(board, self), self.iterations, self.time_limit)
+        if self.last_search.action is None:
+            return None
+        self.mcts.advance([self.last_search.action])  # the next search starts from the subtree of the action
+        return decode_action(board, self.last_search.action)
+
+    def clone(self):
+        mcts = self.mcts
+        return self.__class__(self._name, self.time_limit, self.iterations, mcts.formula, mcts.exploration,
+                              mcts.playouts, mcts.max_nodes, self.tablebase, self.seed, self.workers, self.deterministic)
@@ -0,0 +1,335 @@
+from __future__ import annotations
+from typing import List, Tuple, Optional, Union, Self, Set, Dict
+
+from nmm.cells import Cell
+from nmm.boards import Board, draw_board
+from nmm.mills import MILLS, MILL_IDS, MillIndex
+from nmm.topology import CellIndex, CELLS, CELL_IDS, ADJACENT_MASKS, MILL_MASKS, CELL_MILLS, FULL_MASK, \
+                          PIECES_PER_PLAYER, mask_to_ids
+from nmm.dtypes import NamedPlayer, PlayerState
+
+
+class BitBoard:
+    """A compact nine men's morris board.
+
+    It plays by the same rules and exposes the same surface as `nmm.boards.Board`
+    (`place`, `move`, `fly`, `kill`, `get_empty_cells`, `get_possible_moves`, `mills`, ...),
+    but the position is stored as plain integers instead of `Cell` and `Piece` objects:
+    - two 24-bit occupancy masks (one per player), where bit `i` refers to the i-th cell in `CELLS`,
+    - the number of ready (not yet placed) and dead pieces of each player,
+    - a 16-bit mask of utilized mills per player (bit `m` refers to the m-th mill in `MILLS`).
+
+    Neighbors and mills are looked up in the masks of `nmm.topology` (`ADJACENT_MASKS`, `MILL_MASKS`),
+    which makes every operation a handful of integer operations.
+
+    Cells are accepted as `Cell` objects, `(x, y, z)` tuples or cell ids (0..23),
+    and are returned as `(x, y, z)` tuples (which compare equal to `Cell` objects).
+    Mills are returned as sorted triplets of `(x, y, z)` tuples.
+    """
+    __slots__ = ('_players', '_occupancy', '_ready', '_dead', '_utilized')
+
+    def __init__(self, players:Tuple[str, str]):
+        assert len(players) == 2, "Only two players are supported"
+        assert all([p is not None for p in players]), "Player names cannot be None"
+        assert isinstance(players, (list, tuple))
+        assert all([isinstance(player, (str, NamedPlayer))
+                    for player in players]), "One of the players"
+        self._players: Tuple[str, str] = tuple([str(player) for player in players])
+        self._occupancy: List[int] = [0, 0]
+        self._ready: List[int] = [PIECES_PER_PLAYER, PIECES_PER_PLAYER]
+        self._dead: List[int] = [0, 0]
+        self._utilized: List[int] = [0, 0]
+
+    @classmethod
+    def from_board(cls, board:Board) -> Self:
+        """Build a `BitBoard` holding the same position as a `nmm.boards.Board`."""
+        bitboard = cls(board.players)
+        for p, player in enumerate(bitboard._players):
+            for cell in board.get_my_cells(player):
+                bitboard._occupancy[p] |= 1 << cell._id
+            bitboard._ready[p] = len(board.get_my_ready_pieces(player))
+            bitboard._dead[p] = len(board.get_my_dead_pieces(player))
+            for mill in board.get_my_mills(player):
+                if mill.utilized:
+                    bitboard._utilized[p] |= 1 << MILL_IDS[tuple(cell.index for cell in mill)]
+        return bitboard
+
+    @property
+    def players(self) -> Tuple[str, str]:
+        return self._players
+
+    @property
+    def occupancy(self) -> Tuple[int, int]:
+        return tuple(self._occupancy)
+
+    @property
+    def cells(self) -> List[CellIndex]:
+        return list(CELLS)
+
+    def get_opponent(self, player:Union[NamedPlayer, str]) -> str:
+        return self._players[1 - self.check_player(player)]
+
+    def get_ready_count(self, player:Union[NamedPlayer, str]) -> int:
+        return self._ready[self.check_player(player)]
+
+    def get_placed_count(self, player:Union[NamedPlayer, str]) -> int:
+        return self._occupancy[self.check_player(player)].bit_count()
+
+    def get_dead_count(self, player:Union[NamedPlayer, str]) -> int:
+        return self._dead[self.check_player(player)]
+
+    def get_empty_cells(self) -> List[CellIndex]:
+        return self._mask_to_cells(FULL_MASK & ~(self._occupancy[0] | self._occupancy[1]))
+
+    def get_occupied_cells(self) -> List[CellIndex]:
+        return self._mask_to_cells(self._occupancy[0] | self._occupancy[1])
+
+    def get_my_cells(self, player:Union[NamedPlayer, str]) -> List[CellIndex]:
+        return self._mask_to_cells(self._occupancy[self.check_player(player)])
+
+    def get_opponent_cells(self, player:Union[NamedPlayer, str]) -> List[CellIndex]:
+        return self._mask_to_cells(self._occupancy[1 - self.check_player(player)])
+
+    def place(self,
+              cell:Union[Cell, CellIndex, int],
+              player:Union[NamedPlayer, str]) -> CellIndex:
+        c = self.check_cell(cell)
+        p = self.check_player(player)
+        if self._ready[p] == 0:
+            raise ValueError(f"No more pieces to place for player {self._players[p]} !")
+        if (self._occupancy[0] | self._occupancy[1]) >> c & 1:
+            raise ValueError(f"Cell {CELLS[c]} already occupied !")
+        self._ready[p] -= 1
+        self._occupancy[p] |= 1 << c
+        return CELLS[c]
+
+    def remove(self, cell:Union[Cell, CellIndex, int]) -> CellIndex:
+        """Remove a piece from the board and return it to its owner's ready pieces.
+        WARNING: this method does not KILL the piece. If you want to kill a piece, use `board.kill(cell)`.
+        """
+        c = self.check_cell(cell)
+        p = self._owner_of(c)
+        if p is None:
+            raise ValueError(f"No piece found at cell ... Cell {CELLS[c]} is empty !")
+        self._occupancy[p] &= ~(1 << c)
+        self._ready[p] += 1
+        self._release_mills(p, c)
+        return CELLS[c]
+
+    def move(self,
+             from_cell:Union[Cell, CellIndex, int],
+             to_cell:Union[Cell, CellIndex, int]) -> CellIndex:
+        source, destination = self.check_cell(from_cell), self.check_cell(to_cell)
+        if not ADJACENT_MASKS[source] >> destination & 1:
+            self._check_fly(source, destination)
+            raise ValueError(f"Destination cell {CELLS[destination]} is not a neighbor "
+                             f"of source cell {CELLS[source]} !")
+        return self._internal_fly(source, destination)
+
+    def fly(self,
+            from_cell:Union[Cell, CellIndex, int],
+            to_cell:Union[Cell, CellIndex, int]) -> CellIndex:
+        source, destination = self.check_cell(from_cell), self.check_cell(to_cell)
+        return self._internal_fly(source, destination)
+
+    def kill(self, cell:Union[Cell, CellIndex, int], mill:Optional[Union[MillIndex, int]]=None) -> CellIndex:
+        """Kill the piece at `cell`. If `mill` is given (as cells or as an index into `MILLS`),
+        it is marked as utilized for the killer (that's the opponent of the killed piece).
+        """
+        c = self.check_cell(cell)
+        p = self._owner_of(c)
+        if p is None:
+            raise ValueError(f"No piece found at cell ... Cell {CELLS[c]} is empty ... Can't KILL !")
+        self._occupancy[p] &= ~(1 << c)
+        self._dead[p] += 1
+        self._release_mills(p, c)
+        if mill is not None:
+            m = mill if isinstance(mill, int) else MILL_IDS[tuple(sorted(tuple(x) for x in mill))]
+            if self._occupancy[1 - p] & MILL_MASKS[m] == MILL_MASKS[m]:
+                self._utilized[1 - p] |= 1 << m
+        return CELLS[c]
+
+    def _internal_fly(self, source:int, destination:int) -> CellIndex:
+        p = self._check_fly(source, destination)
+        self._occupancy[p] ^= (1 << source) | (1 << destination)
+        self._release_mills(p, source)
+        return CELLS[destination]
+
+    def _check_fly(self, source:int, destination:int) -> int:
+        p = self._owner_of(source)
+        if p is None:
+            raise ValueError(f"Source cell {CELLS[source]} is empty !")
+        if self._owner_of(destination) is not None:
+            raise ValueError(f"Destination {CELLS[destination]} is not empty !")
+        return p
+
+    def _owner_of(self, c:int) -> Optional[int]:
+        if self._occupancy[0] >> c & 1:
+            return 0
+        if self._occupancy[1] >> c & 1:
+            return 1
+        return None
+
+    def _release_mills(self, p:int, c:int):
+        """Forget the utilization of `p`'s mills that went through the emptied cell `c`."""
+        for m in CELL_MILLS[c]:
+            self._utilized[p] &= ~(1 << m)
+
+    def check_cell(self, cell:Union[Cell, CellIndex, int]) -> int:
+        if isinstance(cell, int):
+            if not 0 <= cell < len(CELLS):
+                raise ValueError(f"Invalid cell id: {cell} !")
+            return cell
+        if not isinstance(cell, (tuple, list, Cell)):
+            raise TypeError(f"Cell must be a tuple or Cell object, not {type(cell)} !")  # pragma: no cover
+        if isinstance(cell, Cell):
+            return cell._id
+        index = tuple(cell)
+        if index not in CELL_IDS:
+            raise ValueError(f"Invalid cell coordinates: {index} !")
+        return CELL_IDS[index]
+
+    def check_player(self, player:Union[NamedPlayer, str]) -> int:
+        if not isinstance(player, (str, NamedPlayer)):
+            raise TypeError(f"Player must be a str or NamedPlayer object, not {type(player)} !")  # pragma: no cover
+        player = player.name if isinstance(player, NamedPlayer) else str(player)
+        if player == self._players[0]:
+            return 0
+        if player == self._players[1]:
+            return 1
+        raise ValueError(f"Player not in the game: {player}")
+
+    def _formed_mills(self, p:int) -> int:
+        occupancy = self._occupancy[p]
+        return sum(1 << m for m, mask in enumerate(MILL_MASKS) if occupancy & mask == mask)
+
+    @property
+    def mills(self) -> Set[MillIndex]:
+        return self.get_my_mills(self._players[0]) | self.get_my_mills(self._players[1])
+
+    def get_my_mills(self, player:Union[NamedPlayer, str]) -> Set[MillIndex]:
+        formed = self._formed_mills(self.check_player(player))
+        return {MILLS[m] for m in range(len(MILLS)) if formed >> m & 1}
+
+    def get_opponent_mills(self, player:Union[NamedPlayer, str]) -> Set[MillIndex]:
+        return self.get_my_mills(self.get_opponent(player))
+
+    def get_pending_mills(self, player:Union[NamedPlayer, str]) -> Set[MillIndex]:
+        """Return the mills of `player` that are formed but not utilized yet (each entitles a kill)."""
+        p = self.check_player(player)
+        pending = self._formed_mills(p) & ~self._utilized[p]
+        return {MILLS[m] for m in range(len(MILLS)) if pending >> m & 1}
+
+    def get_possible_moves_from_cell(self, cell:Union[Cell, CellIndex, int]) -> List[CellIndex]:
+        c = self.check_cell(cell)
+        if self._owner_of(c) is None:
+            raise ValueError(f"Cell {CELLS[c]} is empty !")
+        return self._mask_to_cells(ADJACENT_MASKS[c] & ~(self._occupancy[0] | self._occupancy[1]))
+
+    def get_possible_moves(self, player:Union[NamedPlayer, str]) -> List[Tuple[CellIndex, CellIndex]]:
+        p = self.check_player(player)
+        empty = FULL_MASK & ~(self._occupancy[0] | self._occupancy[1])
+        return [(CELLS[source], destination)
+                for source in self._mask_to_ids(self._occupancy[p])
+                for destination in self._mask_to_cells(ADJACENT_MASKS[source] & empty)]
+
+    @property
+    def all_placed(self) -> bool:
+        return self._ready[0] == 0 and self._ready[1] == 0
+
+    @property
+    def is_empty(self) -> bool:
+        return (self._occupancy[0] | self._occupancy[1]) == 0
+
+    def get_player_state(self, player:Union[NamedPlayer, str]) -> PlayerState:
+        p = self.check_player(player)
+        placed = self._occupancy[p].bit_count()
+        if self._formed_mills(p) & ~self._utilized[p]:
+            return PlayerState.KILLING
+        if self._ready[p] != 0:
+            return PlayerState.PLACING
+        if placed > 3:
+            return PlayerState.MOVING
+        if placed == 3:
+            return PlayerState.FLYING
+        return PlayerState.LOOSING
+
+    def game_over(self, phase:int) -> Tuple[bool, Optional[str]]:
+        return {1: self._test_game_over_phase_1,
+                2: self._test_game_over_phase_2,
+                3: self._test_game_over_phase_3}[phase]()
+
+    def _test_game_over_phase_1(self) -> Tuple[bool, Optional[str]]:
+        if not self.all_placed:
+            return False, None
+        if self._dead[0] == self._dead[1]:
+            return True, None
+        return True, self._players[0] if self._dead[0] < self._dead[1] else self._players[1]
+
+    def _test_game_over_phase_2(self) -> Tuple[bool, Optional[str]]:
+        return self._test_game_over(min_pieces=4)
+
+    def _test_game_over_phase_3(self) -> Tuple[bool, Optional[str]]:
+        return self._test_game_over(min_pieces=3)
+
+    def _test_game_over(self, min_pieces:int) -> Tuple[bool, Optional[str]]:
+        if not self.all_placed:
+            return False, None
+        empty = FULL_MASK & ~(self._occupancy[0] | self._occupancy[1])
+        for p in (0, 1):
+            if self._occupancy[p].bit_count() < min_pieces:
+                return True, self._players[1 - p]
+            if not any(ADJACENT_MASKS[c] & empty for c in self._mask_to_ids(self._occupancy[p])):
+                return True, self._players[1 - p]
+        return False, None
+
+    def clone(self) -> Self:
+        board = BitBoard.__new__(BitBoard)
+        board._players = self._players
+        board._occupancy = self._occupancy[:]
+        board._ready = self._ready[:]
+        board._dead = self._dead[:]
+        board._utilized = self._utilized[:]
+        return board
+
+    def reset(self):
+        self._occupancy = [0, 0]
+        self._ready = [PIECES_PER_PLAYER, PIECES_PER_PLAYER]
+        self._dead = [0, 0]
+        self._utilized = [0, 0]
+
+    @staticmethod
+    def _mask_to_ids(mask:int) -> List[int]:
+        return list(mask_to_ids(mask))
+
+    @staticmethod
+    def _mask_to_cells(mask:int) -> List[CellIndex]:
+        return [CELLS[c] for c in mask_to_ids(mask)]
+
+    def __iter__(self):
+        """Return an iterator over the cell coordinates of the board."""
+        return iter(CELLS)
+
+    def __len__(self):
+        """Return the number of cells in the board."""
+        return len(CELLS)
+
+    def __getitem__(self, key:Union[Cell, CellIndex, int]) -> Optional[str]:
+        """Return the name of the player occupying the given cell (or `None` if it is empty)."""
+        p = self._owner_of(self.check_cell(key))
+        return None if p is None else self._players[p]
+
+    def __contains__(self, item:Union[Cell, CellIndex]):
+        """Return True if the item is a valid cell of the board, False otherwise."""
+        if isinstance(item, Cell):
+            return item.index in CELL_IDS
+        if isinstance(item, (tuple, list)):
+            return tuple(item) in CELL_IDS
+        raise TypeError(f"Invalid item type: {type(item)} !")  # pragma: no cover
+
+    def __str__(self):
+        marks = {None: ' ', self._players[0]: 'x', self._players[1]: 'o'}
+        return draw_board({cell: marks[self[cell]] for cell in CELLS})
+
+    def __repr__(self):
+        return self.__str__()
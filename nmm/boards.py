@@ -1,17 +1,35 @@
 
-from typing import List, Tuple, Optional, Union, Self, Set, Dict
-from itertools import combinations, product
+from typing import List, Tuple, Optional, Union, Self, Set, Dict, Iterable, NamedTuple
 from copy import deepcopy
 import numpy as np
 
 from nmm.cells import Cell
 from nmm.mills import Mill
+from nmm.topology import CellIndex, CELLS, CELL_IDS, ADJACENT_MASKS, MILL_CELLS, CELL_MILLS
+from nmm.zobrist import CELL_KEYS, READY_KEYS, PENDING_KEYS
 from nmm.dtypes import NamedPlayer
 from collections import defaultdict
-from nmm.pieces import Piece, PieceState
+from nmm.pieces import Piece, PieceState, PieceList
 from nmm.dtypes import PlayerState
 
 
+Action = Union[Cell, Tuple[int, int, int], Tuple[Union[Cell, Tuple[int, int, int]], Union[Cell, Tuple[int, int, int]]]]
+
+
+class UndoToken(NamedTuple):
+    """Everything `Board.undo` needs to take back an action applied with `Board.apply`."""
+    kind: str                                    # 'place', 'move', 'fly' or 'kill'
+    piece: Piece                                 # the piece that was placed, moved, flown or killed
+    source: Cell                                 # the cell the action was applied to (or the origin of a move)
+    destination: Optional[Cell]                  # the destination of a move (`None` otherwise)
+    position: Optional[int]                      # the position of a killed piece in the list of placed pieces
+    mill: Optional[Mill]                         # the mill utilized by a kill (if any)
+    slots: Tuple[Tuple[int, Optional[Mill]], ...]  # the mill slots touched by the action, as they were before it
+    last_mills: Tuple[List[Mill], List[Mill]]    # the last formed/broken mills before the action
+    dirty_mills: bool
+    key: int                                     # the Zobrist key of the position before the action
+
+
 class Board:
     """The nine men's morris board.
 
@@ -20,6 +38,9 @@ class Board:
     - the second index is the vertical position,
     - the third index is the horizontal position.
 
+    The coordinates are resolved to cells (and cells to their neighbors and mills) through the 
+    static tables of `nmm.topology`, shared by all boards: a cell is stored at its integer id in `board.cells`.
+
     The board contains:
     - 24 valid cells (of type `Cell`),
     - 18 game pieces (of type `Piece`), 9 for each player.
@@ -33,6 +54,10 @@ class Board:
       - be indexed to get a specific cell using `board[i, j, k]` or `board[cell]` (where `cell` is a `Cell` object),
       - be iterated over to yield all its cells using `for cell in board: ...`,
       - be converted to a string to display the current state of the board using `print(board)` or `str(board)`.
+      - be hashed and compared in O(1) (`hash(board)`, `board == other`), through a 64-bit Zobrist key 
+        (see `nmm.zobrist`) updated by every mutation. The key covers the occupancy, the ready pieces 
+        of each player and the pending (formed but not utilized) mills, but not the player to move, 
+        which the board does not know about.
       - place a piece on the board using `board.place(cell, player)` (where `cell` is a `Cell` object and `player` is a `str`-name of the player),
       - remove a piece from the board using `board.remove(cell)` (where `cell` is a `Cell` object).
       - get all empty cells using `board.get_empty_cells()`,
@@ -48,18 +73,25 @@ class Board:
         assert all([isinstance(player, (str, NamedPlayer)) 
                     for player in players]), "One of the players"
         self._players = tuple([str(player) for player in players])
-        self._board: np.ndarray = np.empty((3, 3, 3), dtype=object)
+        self._sides: Dict[str, int] = {player: side for side, player in enumerate(self._players)}
+        self._board: Dict[CellIndex, Cell] = {}
         self._cells: List[Cell] = []
-        self._mills: Set[Mill] = set()
+        self._mill_cells: List[Tuple[Cell, Cell, Cell]] = []
+        self._mills: List[Optional[Mill]] = [None] * len(MILL_CELLS)
         self._dirty_mills: bool = True
-        self._pieces: Dict[str, Dict[str, Piece]] = \
-            {PieceState.READY: defaultdict(list),
-             PieceState.PLACED: defaultdict(list),
-             PieceState.DEAD: defaultdict(list)}
+        self._last_formed_mills: List[Mill] = []
+        self._last_broken_mills: List[Mill] = []
+        self._pieces: Dict[str, Dict[str, PieceList]] = \
+            {PieceState.READY: defaultdict(PieceList),
+             PieceState.PLACED: defaultdict(PieceList),
+             PieceState.DEAD: defaultdict(PieceList)}
+        self._piece_at: List[Optional[Piece]] = [None] * len(CELLS)
+        self._hash: int = 0
         self._add_pieces()
         self._add_cells()
         self._set_neighbors()
         self.check_mills()
+        self._hash = self._compute_hash()
 
     @property
     def players(self) -> Tuple[str, str]:
@@ -161,16 +193,20 @@ class Board:
             raise ValueError(f"Cell {cell} already occupied by {cell.occupant} !")
 
         assert len(self._pieces[PieceState.READY][player]) > 0, 'Something is wrong with the board'
-        assert cell is self._board[cell.index], 'Something is wrong with the board'
+        assert cell is self._cells[cell._id], 'Something is wrong with the board'
         assert cell.occupant == None, 'Something is wrong with the board'
 
-        piece = self._pieces[PieceState.READY][player].pop()
+        ready = self._pieces[PieceState.READY][player]
+        piece = ready.pop()
         self._pieces[PieceState.PLACED][player].append(piece)
         piece.state = PieceState.PLACED
         piece.cell = cell
         cell.occupant = player
+        self._piece_at[cell._id] = piece
+        side = self._sides[player]
+        self._hash ^= CELL_KEYS[side][cell._id] ^ READY_KEYS[side][len(ready) + 1] ^ READY_KEYS[side][len(ready)]
         self._dirty_mills = True
-        self.check_mills()
+        self.check_mills((cell,))
         return piece
     
     def remove(self, cell:Union[Cell, Tuple[int, int, int]]):
@@ -182,15 +218,17 @@ class Board:
         if cell.is_empty:
             raise ValueError(f"No piece found at cell ... Cell {cell} is empty !")
         player = self.check_player(cell.occupant)
-        piece = [piece for piece in self._pieces[PieceState.PLACED][player] 
-                 if piece.cell == cell][0]
+        piece = self._pop_piece(cell)
+        ready = self._pieces[PieceState.READY][player]
         self._pieces[PieceState.PLACED][player].remove(piece)
-        self._pieces[PieceState.READY][player].append(piece)
+        ready.append(piece)
         piece.state = PieceState.READY
         piece.cell = None
         cell.occupant = None
+        side = self._sides[player]
+        self._hash ^= CELL_KEYS[side][cell._id] ^ READY_KEYS[side][len(ready) - 1] ^ READY_KEYS[side][len(ready)]
         self._dirty_mills = True
-        self.check_mills()
+        self.check_mills((cell,))
         return piece
     
     def move(self, 
@@ -202,7 +240,7 @@ class Board:
             raise ValueError(f"Source cell {from_cell} is empty !")
         if not to_cell.is_empty:
             raise ValueError(f"Destination {to_cell} is empty !")
-        if to_cell not in list(from_cell.neighbors.values()):
+        if not ADJACENT_MASKS[from_cell._id] >> to_cell._id & 1:
             raise ValueError(f"Destination cell {to_cell} is not a neighbor of source cell {from_cell} !")
         return self._internal_fly(from_cell, to_cell)
 
@@ -222,44 +260,145 @@ class Board:
         if cell.is_empty:
             raise ValueError(f"No piece found at cell ... Cell {cell} is empty ... Can't KILL !")
         player = self.check_player(cell.occupant)
-        piece = [piece for piece in self._pieces[PieceState.PLACED][player] 
-                 if piece.cell == cell][0]
-        assert piece.state == PieceState.PLACED, 'Something is wrong with the board !'
-        assert piece.cell == cell, 'Something is wrong with the board !'
+        piece = self._pop_piece(cell)
         assert piece.state == PieceState.PLACED, 'Something is wrong with the board !'
+        assert piece.cell is cell, 'Something is wrong with the board !'
         self._pieces[PieceState.PLACED][player].remove(piece)
         self._pieces[PieceState.DEAD][player].append(piece)
         piece.state = PieceState.DEAD
         piece.cell = None
         cell.occupant = None
+        self._hash ^= CELL_KEYS[self._sides[player]][cell._id]
         if mill is not None:
             mill.utilized = True
         self._dirty_mills = True
-        self.check_mills()
+        self.check_mills((cell,))
         return piece
 
     def _internal_fly(self, from_cell:Cell, to_cell:Cell):
         assert from_cell.occupant is not None, 'Something is wrong with the board !'
         assert to_cell.occupant is None, 'Something is wrong with the board !'
         player = self.check_player(from_cell.occupant)
-        piece = [piece for piece in self._pieces[PieceState.PLACED][player] 
-                 if piece.cell == from_cell][0]
+        piece = self._pop_piece(from_cell)
         assert piece.state == PieceState.PLACED, 'Something is wrong with the board !'
-        assert piece.cell == from_cell, 'Something is wrong with the board !'
+        assert piece.cell is from_cell, 'Something is wrong with the board !'
         to_cell.occupant = player
         from_cell.occupant = None
         piece.cell = to_cell
+        self._piece_at[to_cell._id] = piece
+        keys = CELL_KEYS[self._sides[player]]
+        self._hash ^= keys[from_cell._id] ^ keys[to_cell._id]
         self._dirty_mills = True
-        self.check_mills()
+        self.check_mills((from_cell, to_cell))
         return piece
 
+    def apply(self, action:Action, player:Optional[Union[NamedPlayer, str]]=None) -> UndoToken:
+        """Apply an action and return a token that takes it back with `board.undo(token)`.
+
+        The action is given the way players return it:
+        - a cell: places a piece of `player` if the cell is empty, or kills the piece on it otherwise
+          (utilizing one of the killer's pending mills, if any),
+        - a pair of cells `(source, destination)`: moves the piece on `source` (or flies it 
+          if its owner is down to three pieces).
+
+        Actions are undone in the reverse order they were applied (like a stack), which makes it 
+        possible to explore many lines of play on the same board instead of cloning it.
+        """
+        if isinstance(action, Cell) or not isinstance(action[0], (tuple, list, Cell)):
+            cell = self.check_cell(action)
+            if cell.is_empty:
+                return self._apply_place(cell, player)
+            return self._apply_kill(cell, player)
+        source, destination = self.check_cell(action[0]), self.check_cell(action[1])
+        if source.is_empty:
+            raise ValueError(f"Source cell {source} is empty !")
+        owner = self.check_player(source.occupant)
+        if player is not None and self.check_player(player) != owner:
+            raise ValueError(f"Player {player} cannot move a piece of {owner} !")
+        flying = len(self._pieces[PieceState.READY][owner]) == 0 and \
+                 len(self._pieces[PieceState.PLACED][owner]) == 3
+        slots, last = self._save_slots((source, destination)), self._save_state()
+        piece = self.fly(source, destination) if flying else self.move(source, destination)
+        return UndoToken('fly' if flying else 'move', piece, source, destination, None, None, slots, *last)
+
+    def _take_pending(self, mill:Mill):
+        """Take the pending kill of a mill being utilized out of the Zobrist key
+        (if the mill is one of the formed mills of this board), see `Mill.utilized`."""
+        for m, slot in enumerate(self._mills):
+            if slot is mill:
+                self._hash ^= PENDING_KEYS[m]
+
+    def _pop_piece(self, cell:Cell) -> Piece:
+        piece, self._piece_at[cell._id] = self._piece_at[cell._id], None
+        return piece
+
+    def _apply_place(self, cell:Cell, player:Optional[Union[NamedPlayer, str]]) -> UndoToken:
+        if player is None:
+            raise ValueError(f"A player is needed to place a piece at {cell} !")
+        slots, last = self._save_slots((cell,)), self._save_state()
+        piece = self.place(cell, player)
+        return UndoToken('place', piece, cell, None, None, None, slots, *last)
+
+    def _apply_kill(self, cell:Cell, player:Optional[Union[NamedPlayer, str]]) -> UndoToken:
+        victim = self.check_player(cell.occupant)
+        killer = self.get_opponent(victim)
+        if player is not None and self.check_player(player) != killer:
+            raise ValueError(f"Player {player} cannot kill its own piece at {cell} !")
+        mill = next((mill for mill in self._mills 
+                     if mill is not None and mill.owner == killer and not mill.utilized), None)
+        position = self._pieces[PieceState.PLACED][victim].index(self._piece_at[cell._id])
+        slots, last = self._save_slots((cell,)), self._save_state()
+        piece = self.kill(cell, mill)
+        return UndoToken('kill', piece, cell, None, position, mill, slots, *last)
+
+    def _save_slots(self, cells:Iterable[Cell]) -> Tuple[Tuple[int, Optional[Mill]], ...]:
+        return tuple((m, self._mills[m]) for cell in cells for m in CELL_MILLS[cell._id])
+
+    def _save_state(self) -> Tuple[Tuple[List[Mill], List[Mill]], bool, int]:
+        return (self._last_formed_mills, self._last_broken_mills), self._dirty_mills, self._hash
+
+    def undo(self, token:UndoToken):
+        """Take back the action that returned `token` (see `board.apply`), restoring the exact previous state."""
+        piece, source, owner = token.piece, token.source, token.piece.owner
+        if token.kind == 'place':
+            placed = self._pieces[PieceState.PLACED][owner].pop()
+            assert placed is piece, 'Actions must be undone in the reverse order they were applied !'
+            self._pieces[PieceState.READY][owner].append(piece)
+            piece.state = PieceState.READY
+            piece.cell = None
+            source._occupant = None
+            self._piece_at[source._id] = None
+        elif token.kind == 'kill':
+            killed = self._pieces[PieceState.DEAD][owner].pop()
+            assert killed is piece, 'Actions must be undone in the reverse order they were applied !'
+            self._pieces[PieceState.PLACED][owner].restore(token.position, piece)
+            piece.state = PieceState.PLACED
+            piece.cell = source
+            source._occupant = owner
+            self._piece_at[source._id] = piece
+            if token.mill is not None:
+                token.mill._utilized = False
+        else:
+            assert piece.cell is token.destination, 'Actions must be undone in the reverse order they were applied !'
+            token.destination._occupant = None
+            source._occupant = owner
+            piece.cell = source
+            self._piece_at[token.destination._id] = None
+            self._piece_at[source._id] = piece
+        for m, mill in reversed(token.slots):
+            self._mills[m] = mill
+        (self._last_formed_mills, self._last_broken_mills), self._dirty_mills = token.last_mills, token.dirty_mills
+        self._hash = token.key
+
     def check_cell(self, cell:Union[Cell, Tuple[int, int, int]]) -> Cell:
-        if not isinstance(cell, (tuple, list, Cell)):
+        if isinstance(cell, Cell):
+            return self._cells[cell._id]
+        if not isinstance(cell, (tuple, list)):
             raise TypeError(f"Cell must be a tuple or Cell object, not {type(cell)} !") # pragma: no cover
-        cell = cell.index if isinstance(cell, Cell) else cell
-        if not Cell.is_valid_index(*cell):
+        c = CELL_IDS.get(tuple(cell))
+        if c is None:
             raise ValueError(f"Invalid cell coordinates: {cell} !")
-        return self._board[cell]
+        return self._cells[c]
 
     def check_player(self, player:Union[NamedPlayer, str]) -> str:
         if not isinstance(player, (str, NamedPlayer)):
@@ -269,19 +408,55 @@ class Board:
             raise ValueError(f"Player not in the game: {player}")
         return player
     
-    def check_mills(self):
-        self._mills -= {mill for mill in self._mills if not mill.still_valid}
-        for subset in combinations(self._cells, 3):
-            if Mill.is_mill(subset) and Mill(subset) not in self._mills:
-                self._mills.add(Mill(subset))
-                print(f"[{subset}] is a MILL !")
+    def check_mills(self, cells:Optional[Iterable[Cell]]=None) -> Tuple[List[Mill], List[Mill]]:
+        """Bring the formed mills up to date with the occupancy of the board.
+        Only the 16 triplets of the mill registry (`nmm.topology.MILL_CELLS`) are checked: a registry slot 
+        holds a `Mill` for as long as its cells are occupied by the same player, which keeps 
+        the `utilized` flag of a mill until the mill is broken.
+
+        If `cells` is given, only the mills passing through these cells are checked 
+        (that's two mills per cell), which is all a mutation of these cells can change.
+
+        Returns the mills formed and the mills broken by the update, which are also 
+        available as `board.last_formed_mills` and `board.last_broken_mills`.
+        """
+        slots = range(len(self._mill_cells)) if cells is None else \
+                [m for cell in cells for m in CELL_MILLS[cell._id]]
+        formed, broken = [], []
+        for m in slots:
+            a, b, c = self._mill_cells[m]
+            owner = a._occupant
+            complete = owner is not None and owner == b._occupant == c._occupant
+            mill = self._mills[m]
+            if mill is not None and not (complete and mill.owner == owner):
+                broken.append(mill)
+                if not mill._utilized:
+                    self._hash ^= PENDING_KEYS[m]
+                self._mills[m] = mill = None
+            if complete and mill is None:
+                self._mills[m] = mill = Mill((a, b, c))
+                mill._board = self
+                self._hash ^= PENDING_KEYS[m]
+                formed.append(mill)
+        self._last_formed_mills, self._last_broken_mills = formed, broken
         self._dirty_mills = False
+        return formed, broken
+
+    @property
+    def last_formed_mills(self) -> List[Mill]:
+        """The mills formed by the last mutation of the board (e.g. the mill closed by the last move)."""
+        return self._last_formed_mills
+
+    @property
+    def last_broken_mills(self) -> List[Mill]:
+        """The mills broken by the last mutation of the board (e.g. the mill opened by the last move)."""
+        return self._last_broken_mills
 
     @property
     def mills(self) -> Set[Mill]:
         if self._dirty_mills:
             self.check_mills()
-        return {mill for mill in self._mills if mill.still_valid}
+        return {mill for mill in self._mills if mill is not None}
     
     def get_my_mills(self, player:Union[NamedPlayer, str]) -> Set[Mill]:
         player = self.check_player(player)
@@ -293,46 +468,79 @@ class Board:
     
     def clone(self) -> Self:
         board = Board([p for p in self._players])
-        for i in range(3):
-            for j in range(3):
-                for k in range(3):
-                    if self._board[i, j, k] is not None:
-                        board._board[i, j, k]._occupant = \
-                            self._board[i, j, k]._occupant
+        for mine, theirs in zip(self._cells, board._cells):
+            theirs._occupant = mine._occupant
         for state, queue in self._pieces.items():
             for player, pieces in queue.items():
                 board._pieces[state][player] = \
-                    [piece.clone(board._board[piece.cell.index] 
-                                 if state == PieceState.PLACED else None) 
-                     for piece in pieces]
+                    PieceList([piece.clone(board._cells[piece.cell._id] 
+                                           if state == PieceState.PLACED else None) 
+                               for piece in pieces])
+        for piece in board.placed_pieces:
+            board._piece_at[piece.cell._id] = piece
         board.check_mills()
-        for m1 in self.mills:
-            for m2 in board.mills:
-                if m1 == m2:
-                    m2.utilized = m1.utilized
+        for mine, theirs in zip(self._mills, board._mills):
+            if mine is not None and mine.utilized:
+                theirs.utilized = True
+        board._hash = self._hash
         return board    
     
     def reset(self):
         for state in [PieceState.PLACED, PieceState.DEAD]:
             for p in self._players:
-                for piece in self._pieces[state][p]:
+                pieces = self._pieces[state][p]
+                while pieces:
+                    piece = pieces.pop()
                     piece.state = PieceState.READY
                     piece.cell = None
-                    self._pieces[state][p].remove(piece)
                     self._pieces[PieceState.READY][p].append(piece)
+        self._piece_at = [None] * len(CELLS)
         for p in self._players:
             assert len(self._pieces[PieceState.READY][p]) == 9, \
                 'Something went wrong with the board during a reset !'
         for cell in self._cells:
             cell.reset() # simply sets the occupant to None
-        self._mills = set()
+        self._mills = [None] * len(MILL_CELLS)
+        self._last_formed_mills, self._last_broken_mills = [], []
         self._dirty_mills = True
+        self._hash = self._compute_hash()
+
+    def _compute_hash(self) -> int:
+        """Compute the Zobrist key of the position from scratch (the mutations update it incrementally)."""
+        key = 0
+        for side, player in enumerate(self._players):
+            key ^= READY_KEYS[side][len(self._pieces[PieceState.READY][player])]
+        for cell in self._cells:
+            if cell._occupant is not None:
+                key ^= CELL_KEYS[self._sides[cell._occupant]][cell._id]
+        for m, mill in enumerate(self._mills):
+            if mill is not None and not mill._utilized:
+                key ^= PENDING_KEYS[m]
+        return key
+
+    @property
+    def zobrist(self) -> int:
+        """The 64-bit Zobrist key of the position (see `nmm.zobrist`)."""
+        return self._hash
+
+    def _position(self) -> Tuple[List[Optional[str]], List[int], List[bool]]:
+        return ([cell._occupant for cell in self._cells],
+                [len(self._pieces[PieceState.READY][player]) for player in self._players],
+                [mill is not None and not mill._utilized for mill in self._mills])
+
+    def __hash__(self):
+        return self._hash
+
+    def __eq__(self, other:Self):
+        """Two boards are equal if they hold the same position: same players, same occupancy, 
+        same number of ready pieces and same pending mills. The Zobrist keys tell 
+        different positions apart without looking at the cells."""
+        if not isinstance(other, Board):
+            return NotImplemented
+        if self._hash != other._hash or self._players != other._players:
+            return False
+        return self._position() == other._position()
 
-    def game_over(self, phase:int) -> bool:
-        if phase == 1:
-            ready = self._pieces[PieceState.READY][self._players[0]]
-            ready += self._pieces[PieceState.READY][self._players[1]]
-        
     def get_possible_moves_from_cell(self, cell:Cell) -> List[Cell]:
         cell = self.check_cell(cell)
         if cell.is_empty:
@@ -426,8 +634,8 @@ class Board:
     def __getitem__(self, key:Tuple[int, int, int]):
         """Otherwise, return the cell of the board at the given coordinates."""
         if isinstance(key, Cell):
-            return self._board[tuple(key.index)]
-        return self._board[tuple(key)]
+            return self._cells[key._id]
+        return self._board.get(tuple(key))
 
     def __contains__(self, item:Union[Cell, Tuple[int, int, int]]):
         """Return True if the item is in the board, False otherwise.
@@ -435,59 +643,53 @@ class Board:
         the id of the cell object.
         """
         if isinstance(item, Cell):
-            return item in self._cells
+            return True
         if isinstance(item, (tuple, list, np.ndarray)):
-            return tuple(item) in self._cells
+            return tuple(item) in CELL_IDS
         raise TypeError(f"Invalid item type: {type(item)} !") # pragma: no cover
    
     def _add_cells(self):
-        for i, j, k in product([0, 1, 2], repeat=3):
-            if Cell.is_valid_index(i, j, k):
-                self._board[i, j, k] = Cell(i, j, k)
-                self._cells.append(self._board[i, j, k])
+        self._cells = [Cell(*index) for index in CELLS]
+        self._board = dict(zip(CELLS, self._cells))
+        cells = self._cells
+        self._mill_cells = [(cells[a], cells[b], cells[c]) for a, b, c in MILL_CELLS]
 
     def _set_neighbors(self):
+        """Attach the cells to the board, so that they resolve their neighbors (from the shared 
+        `nmm.topology.NEIGHBORS` table) to the cells of this board."""
         for cell in self._cells:
-            indices = dict(right=cell.npindex + [0, 0, 1],
-                           left=cell.npindex + [0, 0, -1],
-                           upper=cell.npindex + [0, -1, 0],
-                           lower=cell.npindex + [0, 1, 0])
-            if 1 in cell.index[1:]:
-                indices['outer'] = cell.npindex + [-1, 0, 0]
-                indices['inner'] = cell.npindex + [1, 0, 0]
-
-            for key, value in indices.items():
-                if Cell.is_valid_index(*value):
-                    cell._neighbors[key] = self._board[tuple(value)]
-                
+            cell.attach(self._cells)
+
     def _add_pieces(self):
         players = self._players
         for p in players:
             self._pieces[PieceState.READY][p] = \
-                [Piece(p, i + 1) for i in range(9)]
-            self._pieces[PieceState.PLACED][p] = []
-            self._pieces[PieceState.DEAD][p] = []
+                PieceList(Piece(p, i + 1) for i in range(9))
+            self._pieces[PieceState.PLACED][p] = PieceList()
+            self._pieces[PieceState.DEAD][p] = PieceList()
 
     def __str__(self):
-        players = self.players
-        # marks = {k: v for k, v in zip([None] + list(players), [" ", "x", "o"])}
         marks = {self._players[0]: 'x', self._players[1]: 'o', None: ' '}
-        marks = {cell: marks[cell.occupant] for cell in self._cells}
-        line1 = marks[self[0, 0, 0]] + "--------" + marks[self[0, 0, 1]] + "--------" + marks[self[0, 0, 2]]
-        line2 = "|        |        |"
-        line3 = "|  " + marks[self[1, 0, 0]] + "-----" + marks[self[1, 0, 1]] + "-----" + marks[self[1, 0, 2]] + "  |"
-        line4 = "|  |     |     |  |"
-        line5 = "|  |  " + marks[self[2, 0, 0]] + "--" + marks[self[2, 0, 1]] + "--" + marks[self[2, 0, 2]] + "  |  |"
-        line6 = "|  |  |     |  |  |"
-        line7 = marks[self[0, 1, 0]] + "--" + marks[self[1, 1, 0]] + "--" + marks[self[2, 1, 0]] + "     " + \
-                marks[self[2, 1, 2]] + "--" + marks[self[1, 1, 2]] + "--" + marks[self[0, 1, 2]]
-        line8 = line6
-        line9 = "|  |  " + marks[self[2, 2, 0]] + "--" + marks[self[2, 2, 1]] + "--" + marks[self[2, 2, 2]] + "  |  |"
-        line10 = line4
-        line11 = "|  " + marks[self[1, 2, 0]] + "-----" + marks[self[1, 2, 1]] + "-----" + marks[self[1, 2, 2]] + "  |"
-        line12 = line2
-        line13 = marks[self[0, 2, 0]] + "--------" + marks[self[0, 2, 1]] + "--------" + marks[self[0, 2, 2]]
-        return "\n".join([line1, line2, line3, line4, line5, line6, line7, line8, line9, line10, line11, line12, line13])
+        return draw_board({cell.index: marks[cell.occupant] for cell in self._cells})
     
     def __repr__(self):
-        return self.__str__()
\ No newline at end of file
+        return self.__str__()
+
+
+def draw_board(marks:Dict[Tuple[int, int, int], str]) -> str:
+    """Draw the board as text, given the one-character mark of every cell (indexed by its coordinates)."""
+    line1 = marks[0, 0, 0] + "--------" + marks[0, 0, 1] + "--------" + marks[0, 0, 2]
+    line2 = "|        |        |"
+    line3 = "|  " + marks[1, 0, 0] + "-----" + marks[1, 0, 1] + "-----" + marks[1, 0, 2] + "  |"
+    line4 = "|  |     |     |  |"
+    line5 = "|  |  " + marks[2, 0, 0] + "--" + marks[2, 0, 1] + "--" + marks[2, 0, 2] + "  |  |"
+    line6 = "|  |  |     |  |  |"
+    line7 = marks[0, 1, 0] + "--" + marks[1, 1, 0] + "--" + marks[2, 1, 0] + "     " + \
+            marks[2, 1, 2] + "--" + marks[1, 1, 2] + "--" + marks[0, 1, 2]
+    line8 = line6
+    line9 = "|  |  " + marks[2, 2, 0] + "--" + marks[2, 2, 1] + "--" + marks[2, 2, 2] + "  |  |"
+    line10 = line4
+    line11 = "|  " + marks[1, 2, 0] + "-----" + marks[1, 2, 1] + "-----" + marks[1, 2, 2] + "  |"
+    line12 = line2
+    line13 = marks[0, 2, 0] + "--------" + marks[0, 2, 1] + "--------" + marks[0, 2, 2]
+    return "\n".join([line1, line2, line3, line4, line5, line6, line7, line8, line9, line10, line11, line12, line13])
@@ -1,11 +1,50 @@
 from __future__ import annotations
-from typing import Tuple, Optional, Union, Self, TYPE_CHECKING
-from collections import defaultdict
+from typing import Tuple, Optional, Union, Self, Dict, Iterator, List, TYPE_CHECKING
+from collections.abc import Mapping
 import numpy as np
 
 from nmm.dtypes import NamedPlayer
+from nmm.topology import CellIndex, CELL_IDS, NEIGHBOR_KEYS, NEIGHBORS
 
 
+_KEY_INDICES: Dict[str, int] = {key: i for i, key in enumerate(NEIGHBOR_KEYS)}
+
+
+class Neighbors(Mapping):
+    """The existing neighbors of a cell, mapped by their keys (right, left, upper, lower, outer, inner).
+    It is read-only, and a missing neighbor (or key) maps to `None`, as in a `defaultdict(lambda: None)`.
+    It holds the cells of the board (indexed by id) and the row of the cell in `nmm.topology.NEIGHBORS`."""
+    __slots__ = ('_grid', '_ids', '_cells')
+
+    def __init__(self, grid:Optional[List['Cell']]=None, ids:Tuple[int, ...]=(-1,) * len(NEIGHBOR_KEYS)):
+        self._grid = grid
+        self._ids = ids if grid is not None else (-1,) * len(NEIGHBOR_KEYS)
+        self._cells: Tuple['Cell', ...] = tuple(grid[n] for n in self._ids if n >= 0)
+
+    def __getitem__(self, key:str) -> Optional['Cell']:
+        i = _KEY_INDICES.get(key)
+        n = -1 if i is None else self._ids[i]
+        return None if n < 0 else self._grid[n]
+
+    def __contains__(self, key:object) -> bool:
+        return self[key] is not None
+
+    def __iter__(self) -> Iterator[str]:
+        return (key for key, n in zip(NEIGHBOR_KEYS, self._ids) if n >= 0)
+
+    def __len__(self) -> int:
+        return len(self._cells)
+
+    def values(self) -> Tuple['Cell', ...]:
+        """The neighboring cells (in the order of the keys)."""
+        return self._cells
+
+    def __repr__(self) -> str:
+        return f"Neighbors({dict(self)})"
+
+
+NO_NEIGHBORS: Neighbors = Neighbors()
+
 
 class Cell:
     """A cell in the nine men's morris board.
@@ -16,10 +55,18 @@ class Cell:
     the second index `y` refers to the vertical position in the square (0: top, 1: left, 2: bottom),
     the third index `z` refers to the horizontal position in the square (0: left, 1: middle, 2: right).
 
-    Every cell has a unique index, knows its neighbors, whether it is occupied, and which player occupies it.
+    Every cell has a unique index, an integer id (0..23, see `nmm.topology`), knows its neighbors,
+    whether it is occupied, and which player occupies it.
 
     If board is indexed as `board[x][y][z]` or as `board[x, y, z]`, it returns an object of this class `Cell`.
+
+    The neighborhood of a cell is the same on every board: the ids of the neighbors come from the shared
+    `nmm.topology.NEIGHBORS` table, and they are resolved to the `Cell` objects of the board the cell
+    belongs to by a `Neighbors` mapping, built once when the board attaches the cell (see `attach`).
+    A cell created outside of a board has no neighbors.
     """
+    __slots__ = ('x', 'y', 'z', '_id', '_occupant', '_neighbors')
+
     def __init__(self, x:int, y:int, z:int, 
                  occupant:Optional[Union[str, NamedPlayer]]=None):
         self.x = x
@@ -27,17 +74,20 @@ class Cell:
         self.z = z
 
         self._occupant: Optional[str] = occupant
-        self._neighbors = dict(right=None, left=None,
-                               upper=None, lower=None,
-                               outer=None, inner=None)
+        self._neighbors: Neighbors = NO_NEIGHBORS
 
         if not self.is_valid_index(x, y, z):
             raise ValueError("Invalid cell coordinates")
+        self._id: int = CELL_IDS[(x, y, z)]
 
     @property
     def index(self) -> Tuple[int, int, int]:
         return (self.x, self.y, self.z)
 
+    @property
+    def id(self) -> int:
+        return self._id
+
     @property
     def npindex(self) -> np.ndarray:
         return np.array([self.x, self.y, self.z])
@@ -54,13 +104,14 @@ class Cell:
     def horizontal_position(self) -> int:
         return self.z
 
+    def attach(self, grid:List[Self]):
+        """Resolve the neighbors of the cell to the cells of `grid` (the cells of a board, indexed by id)."""
+        self._neighbors = Neighbors(grid, NEIGHBORS[self._id])
+
     @property
-    def neighbors(self) -> dict:
-        neighbors = defaultdict(lambda: None)
-        for k, v in self._neighbors.items():    
-            if v is not None:
-                neighbors[k] = v
-        return neighbors
+    def neighbors(self) -> Neighbors:
+        """The existing neighbors of the cell, mapped by their keys (a missing neighbor maps to `None`)."""
+        return self._neighbors
 
     @property
     def occupant(self) -> Optional[str]:
@@ -87,11 +138,11 @@ class Cell:
 
     def __eq__(self, value:Optional[Union[Self, Tuple[int, int, int]]]):
         if isinstance(value, self.__class__):
-           return np.array_equal(self.index, value.index)
-        elif isinstance(value, np.ndarray) and len(value) == 3:
-            return np.array_equal(self.npindex, np.array(value))
+            return self._id == value._id
         elif isinstance(value, tuple) and len(value) == 3:
-            return np.array_equal(self.npindex, np.array(value))
+            return (self.x, self.y, self.z) == value
+        elif isinstance(value, np.ndarray) and len(value) == 3:
+            return (self.x, self.y, self.z) == tuple(value.tolist())
         return False
 
     def __hash__(self):
@@ -110,14 +161,7 @@ class Cell:
         if isinstance(value, (tuple, list, np.ndarray)) and len(value) == 3:
             value = Cell(*value)
         assert isinstance(value, self.__class__)
-        if self.x < value.x:
-            return True
-        elif self.x == value.x:
-            if self.y < value.y:
-                return True
-            elif self.y == value.y:
-                return self.z < value.z
-        return False
+        return self._id < value._id  # ids follow the order of the coordinates
 
     def __le__(self, value:Self):
         return (self < value) or (self == value)
@@ -138,4 +182,5 @@ class Cell:
     def is_valid_index(x, y, z) -> bool:
         within_bounds = 0 <= x <= 2 and 0 <= y <= 2 and 0 <= z <= 2
         uncentered = not (y == z == 1)
-        return within_bounds and uncentered
\ No newline at end of file
+        return within_bounds and uncentered
+
@@ -0,0 +1,323 @@
+"""Monte Carlo tree search for the nine men's morris agents.
+
+`MCTS` grows a search tree over the integer actions of `nmm.actions` (placements, moves, flights
+and kills, so a turn that closes a mill spans several levels of the tree, all of the same side).
+Every iteration:
+- selects a path from the root, choosing at every node the child with the best UCT score
+  (`Q + c * sqrt(ln N / n)`) or PUCT score (`Q + c * P * sqrt(N) / (1 + n)`, with the priors `P` of the actions),
+- expands the leaf reached: all its legal actions become children at once,
+- evaluates the leaf with a batch of random games (`random_playouts`), played all at once with NumPy,
+- backs the result up the path: every node counts the result for the side that chose its action.
+
+The tree is a set of flat NumPy arrays indexed by node (the parent, the action, the visits, the total
+value, the prior, and the range of the children, which are allocated together), preallocated for
+`max_nodes` nodes: a long search stops expanding when the tree is full, and keeps refining what it has.
+
+The tree is kept from one search to the next: the root moves down to the position searched next
+(`advance`), along the actions played meanwhile, found by comparing the positions (`Position.actions_to`).
+The subtree of the new root is compacted at the start of the arrays, and the rest of the tree is dropped.
+"""
+from typing import Callable, List, NamedTuple, Optional, Sequence, Tuple
+import math
+import time
+import numpy as np
+
+from nmm.topology import NUM_CELLS, MILL_CELLS, CELL_MILLS
+from nmm.actions import MOVE, FLY, KILL, NUM_ACTIONS, MOVE_PAIRS, FLY_PAIRS, ACTION_SOURCES, ACTION_TARGETS
+from nmm.positions import Position, MIN_PIECES
+
+
+MAX_TURNS: int = 200  # the turns of a random game before it counts as a draw
+DRAW: float = 0.5
+
+_MOVE_SOURCES: np.ndarray = np.array([s for s, _ in MOVE_PAIRS], dtype=np.intp)
+_MOVE_TARGETS: np.ndarray = np.array([d for _, d in MOVE_PAIRS], dtype=np.intp)
+_FLY_SOURCES: np.ndarray = np.array([s for s, _ in FLY_PAIRS], dtype=np.intp)
+_FLY_TARGETS: np.ndarray = np.array([d for _, d in FLY_PAIRS], dtype=np.intp)
+_SOURCES: np.ndarray = np.array(ACTION_SOURCES, dtype=np.intp)
+_TARGETS: np.ndarray = np.array(ACTION_TARGETS, dtype=np.intp)
+_CELL_MILL_CELLS: np.ndarray = np.array([[MILL_CELLS[m] for m in CELL_MILLS[c]] for c in range(NUM_CELLS)],
+                                        dtype=np.intp)  # [cell, mill through the cell, cell of the mill]
+_CELL_BITS: np.ndarray = np.arange(NUM_CELLS)
+
+
+def _random_choice(legal:np.ndarray, rng:np.random.Generator) -> np.ndarray:
+    """A random column among the True ones of every row (rows without any give garbage)."""
+    return np.where(legal, rng.random(legal.shape, dtype=np.float32), -1.0).argmax(axis=1)
+
+
+def random_playouts(position:Position, count:int, rng:np.random.Generator, max_turns:int=MAX_TURNS) -> float:
+    """The mean result of `count` random games from the position, for its side to move:
+    1 for a win, 0 for a loss and `DRAW` for a game still going after `max_turns` turns.
+
+    The games are played together, one turn of all the games at every step: the boards are
+    the rows of a `(count, 24)` array (-1 for an empty cell, else the side of the piece), and every step
+    draws the actions of all the games at once among their legal ones."""
+    games = np.arange(count)
+    board = np.full((count, NUM_CELLS), -1, dtype=np.int8)
+    for side in (0, 1):
+        board[:, (position.occupancy[side] >> _CELL_BITS) & 1 == 1] = side
+    ready = np.tile(np.array(position.ready, dtype=np.int16), (count, 1))
+    side = np.full(count, position.side, dtype=np.int8)
+    winner = np.full(count, -1, dtype=np.int8)
+    active = np.ones(count, dtype=bool)
+    kills = np.full(count, position.pending.bit_count(), dtype=np.int8)
+    for _ in range(max_turns + 1):
+        # the kills of the mills closed by the last action (or pending in the position)
+        for k in range(2):
+            killing = active & (kills > k)
+            theirs = board == (1 - side)[:, None]
+            killing &= theirs.any(axis=1)
+            if not killing.any():
+                break
+            victims = _random_choice(theirs[killing], rng)
+            board[games[killing], victims] = -1
+        ended = active & (kills > 0)
+        side[ended] ^= 1
+        kills[:] = 0
+        # the start of the next turn
+        mine = board == side[:, None]
+        lost = active & (mine.sum(axis=1) + ready[games, side] < MIN_PIECES)
+        winner[lost] = 1 - side[lost]
+        active &= ~lost
+        if not active.any():
+            break
+        empty = board < 0
+        placing = ready[games, side] > 0
+        flying = mine.sum(axis=1) == MIN_PIECES
+        legal = np.concatenate((empty & placing[:, None],
+                                mine[:, _MOVE_SOURCES] & empty[:, _MOVE_TARGETS] & ~(placing | flying)[:, None]), axis=1)
+        legal &= active[:, None]
+        actions, any_legal = _random_choice(legal, rng), legal.any(axis=1)
+        flights = active & ~placing & flying
+        if flights.any():
+            legal = mine[flights][:, _FLY_SOURCES] & empty[flights][:, _FLY_TARGETS]
+            actions[flights], any_legal[flights] = FLY + _random_choice(legal, rng), legal.any(axis=1)
+        blocked = active & ~any_legal  # no legal action: that's a loss
+        winner[blocked] = 1 - side[blocked]
+        active &= ~blocked
+        moving = games[active]
+        actions, turn_side = actions[active], side[active]
+        sources, targets = _SOURCES[actions], _TARGETS[actions]
+        board[moving, targets] = turn_side
+        board[moving[sources >= 0], sources[sources >= 0]] = -1
+        placed = moving[sources < 0]
+        ready[placed, side[placed]] -= 1
+        closed = (board[moving[:, None, None], _CELL_MILL_CELLS[targets]] == turn_side[:, None, None]).all(axis=2)
+        kills[moving] = closed.sum(axis=1)
+        side[moving[kills[moving] == 0]] ^= 1
+    wins = np.count_nonzero(winner == position.side)
+    draws = np.count_nonzero(winner < 0)
+    return (wins + DRAW * draws) / count
+
+
+class MCTSResult(NamedTuple):
+    """The outcome of a search: the most visited action of the root, its value for the side to move
+    (the mean result of its games, in [0, 1]), its visits, the work done, and the visits of the root
+    kept from the previous searches."""
+    action: Optional[int]
+    value: float
+    visits: int
+    iterations: int
+    nodes: int
+    seconds: float
+    reused: int = 0
+
+    @property
+    def ips(self) -> float:
+        """Iterations per second."""
+        return self.iterations / self.seconds if self.seconds > 0 else 0.0
+
+
+class MCTS:
+    """A Monte Carlo tree search (see the module doc).
+
+    `formula` is 'uct' or 'puct', with the `exploration` constant `c`. `prior` gives the priors of the
+    legal actions of a position for PUCT (uniform by default). Every leaf is evaluated with `playouts`
+    random games. The tree holds at most `max_nodes` nodes. `root` is the position of the root of the tree,
+    which the next search reuses (see `advance`).
+    """
+    FORMULAS = ('uct', 'puct')
+
+    def __init__(self, formula:str='uct', exploration:float=1.4, playouts:int=32, max_nodes:int=1 << 18,
+                 prior:Optional[Callable[[Position, List[int]], Sequence[float]]]=None, seed:Optional[int]=None):
+        if formula not in self.FORMULAS:
+            raise ValueError(f"Unknown formula: {formula} !")
+        if playouts < 1:
+            raise ValueError(f"The number of playouts must be positive, not {playouts} !")
+        if max_nodes < 1:
+            raise ValueError(f"The tree must hold at least one node, not {max_nodes} !")
+        self.formula: str = formula
+        self.exploration: float = exploration
+        self.playouts: int = playouts
+        self.prior: Optional[Callable[[Position, List[int]], Sequence[float]]] = prior
+        self.rng: np.random.Generator = np.random.default_rng(seed)
+        self.parent: np.ndarray = np.full(max_nodes, -1, dtype=np.int32)
+        self.action: np.ndarray = np.full(max_nodes, -1, dtype=np.int16)
+        self.visits: np.ndarray = np.zeros(max_nodes, dtype=np.int32)
+        self.value: np.ndarray = np.zeros(max_nodes, dtype=np.float64)  # for the side that chose the action
+        self.prior_of: np.ndarray = np.zeros(max_nodes, dtype=np.float32)
+        self.first_child: np.ndarray = np.full(max_nodes, -1, dtype=np.int32)  # -1 while not expanded
+        self.num_children: np.ndarray = np.zeros(max_nodes, dtype=np.int16)
+        self.nodes: int = 0
+        self.root: Optional[Position] = None
+
+    @property
+    def max_nodes(self) -> int:
+        return len(self.parent)
+
+    def search(self, position:Position, iterations:Optional[int]=None, time_limit:Optional[float]=None) -> MCTSResult:
+        """Search a position for `iterations` iterations, or until `time_limit` seconds have passed
+        (whichever comes first, at least one of them must be given)."""
+        if iterations is None and time_limit is None:
+            raise ValueError("An iteration or time budget is needed !")
+        start = time.perf_counter()
+        deadline = float('inf') if time_limit is None else start + time_limit
+        self._set_root(position)
+        done = 0
+        while (iterations is None or done < iterations) and (done == 0 or time.perf_counter() < deadline):
+            self._iterate(position.copy())
+            done += 1
+        return self._result(done, time.perf_counter() - start)
+
+    def _set_root(self, position:Position):
+        """Make the position the root, keeping the subtree of the previous searches that starts there (if any)."""
+        actions = None if self.root is None else self.root.actions_to(position)
+        if actions is None or not self.advance(actions):
+            self._reset(position)
+
+    def advance(self, actions:List[int]) -> bool:
+        """Move the root down along actions played from it (e.g. the action chosen by the last search, or
+        the reply of the opponent), and drop the rest of the tree. Return False, and drop the whole tree,
+        if the tree does not have them."""
+        if self.root is None:
+            return False
+        node, position = 0, self.root.copy()
+        for action in actions:
+            first, count = int(self.first_child[node]), int(self.num_children[node])
+            children = np.flatnonzero(self.action[first:first + count] == action) if first >= 0 else []
+            if not len(children):
+                self.root, self.nodes = None, 0
+                return False
+            position.apply(action)
+            node = first + int(children[0])
+        self._compact(node)
+        self.root = position
+        return True
+
+    def _compact(self, root:int):
+        """Move the subtree of a node to the start of the arrays, in breadth-first order (which keeps
+        the children of a node together), with the node as the root."""
+        if root == 0:
+            return
+        levels, level = [], np.array([root], dtype=np.intp)
+        while level.size:
+            levels.append(level)
+            expanded = level[(self.first_child[level] >= 0) & (self.num_children[level] > 0)]
+            counts = self.num_children[expanded].astype(np.intp)
+            offsets = np.cumsum(counts) - counts
+            level = np.repeat(self.first_child[expanded] - offsets, counts) + np.arange(counts.sum())
+        order = np.concatenate(levels)
+        count = len(order)
+        index = np.full(self.nodes, -1, dtype=np.int32)  # the new index of the nodes kept
+        index[order] = np.arange(count)
+        first, children = self.first_child[order], self.num_children[order]
+        for array in (self.action, self.visits, self.value, self.prior_of, self.num_children):
+            array[:count] = array[order]
+        self.parent[:count] = index[self.parent[order]]
+        self.parent[0], self.action[0] = -1, -1
+        expanded = (first >= 0) & (children > 0)
+        self.first_child[:count] = np.where(expanded, index[np.where(expanded, first, 0)], np.where(first >= 0, 0, -1))
+        self.nodes = count
+
+    def _reset(self, position:Position):
+        self.root = position.copy()
+        self.nodes = 1
+        self.parent[0], self.action[0], self.visits[0], self.value[0] = -1, -1, 0, 0.0
+        self.first_child[0], self.num_children[0] = -1, 0
+
+    def _iterate(self, position:Position):
+        path, movers = self._descend(position)
+        result = 0.0 if self._lost(path[-1]) else random_playouts(position, self.playouts, self.rng)
+        self._backup(path, movers, position.side, result)
+
+    def _descend(self, position:Position, virtual_loss:int=0) -> Tuple[List[int], List[int]]:
+        """Select a path from the root and expand its leaf, playing its actions on the position.
+        Return the nodes of the path and the sides that chose them (-1 for the root).
+        With a `virtual_loss`, the path counts as that many lost visits until `_backup` (see `nmm.parallel.ParallelMCTS`)."""
+        node = 0
+        path, movers = [0], [-1]
+        while self.first_child[node] >= 0 and self.num_children[node]:
+            child = self._select(node)
+            movers.append(position.side)
+            position.apply(int(self.action[child]))
+            path.append(child)
+            node = child
+        if self.first_child[node] < 0:
+            self._expand(node, position)
+        if virtual_loss:
+            self.visits[path] += virtual_loss
+        return path, movers
+
+    def _lost(self, node:int) -> bool:
+        """Whether the side to move at an expanded node has lost (on pieces or without any action)."""
+        return self.first_child[node] >= 0 and self.num_children[node] == 0
+
+    def _backup(self, path:List[int], movers:List[int], side:int, result:float, virtual_loss:int=0):
+        """Count the result of a leaf for `side`, the side to move at the leaf, along the path."""
+        for node, mover in zip(path, movers):
+            self.visits[node] += 1 - virtual_loss
+            self.value[node] += result if mover == side else 1.0 - result
+
+    def _select(self, node:int) -> int:
+        first = int(self.first_child[node])
+        children = slice(first, first + int(self.num_children[node]))
+        visits = self.visits[children]
+        total = int(self.visits[node])
+        if self.formula == 'uct':
+            unvisited = np.flatnonzero(visits == 0)
+            if len(unvisited):
+                return first + int(unvisited[0])
+            scores = self.value[children] / visits + self.exploration * np.sqrt(math.log(total) / visits)
+        else:
+            q = np.where(visits > 0, self.value[children] / np.maximum(visits, 1), DRAW)
+            scores = q + self.exploration * self.prior_of[children] * math.sqrt(total) / (1 + visits)
+        return first + int(scores.argmax())
+
+    def _expand(self, node:int, position:Position):
+        """Add the legal actions of the position as the children of `node` (if the tree has room for them)."""
+        actions = [] if position.is_lost() else position.actions()
+        if self.nodes + len(actions) > self.max_nodes:
+            return
+        first = self.nodes
+        children = slice(first, first + len(actions))
+        self.parent[children] = node
+        self.action[children] = actions
+        self.visits[children] = 0
+        self.value[children] = 0.0
+        self.first_child[children] = -1
+        self.num_children[children] = 0
+        if actions:
+            priors = np.full(len(actions), 1 / len(actions)) if self.prior is None else \
+                     np.asarray(self.prior(position, actions), dtype=np.float64)
+            self.prior_of[children] = priors / priors.sum()
+        self.first_child[node], self.num_children[node] = first, len(actions)
+        self.nodes += len(actions)
+
+    def _result(self, iterations:int, seconds:float) -> MCTSResult:
+        reused = int(self.visits[0]) - iterations  # every iteration visits the root
+        if self.num_children[0] == 0:
+            return MCTSResult(None, 0.0, 0, iterations, self.nodes, seconds, reused)
+        first = int(self.first_child[0])
+        best = first + int(self.visits[first:first + int(self.num_children[0])].argmax())
+        visits = int(self.visits[best])
+        return MCTSResult(int(self.action[best]), float(self.value[best]) / max(visits, 1), visits, iterations,
+                          self.nodes, seconds, reused)
+
+    def root_visits(self) -> np.ndarray:
+        """The visits of the actions of the root after a search, indexed by action (e.g. a policy target)."""
+        visits = np.zeros(NUM_ACTIONS, dtype=np.int32)
+        first, count = int(self.first_child[0]), int(self.num_children[0])
+        if count:
+            visits[self.action[first:first + count]] = self.visits[first:first + count]
+        return visits
@@ -1,14 +1,31 @@
-from typing import List, Optional, Self, Tuple, Union
+from typing import Dict, List, Optional, Self, Tuple, Union, TYPE_CHECKING
 
 from nmm.cells import Cell
 from nmm.dtypes import NamedPlayer
+from nmm.topology import CellIndex, CELLS, MILL_CELLS
+
+if TYPE_CHECKING:
+    from nmm.boards import Board
+
+
+MillIndex = Tuple[CellIndex, CellIndex, CellIndex]
+
+
+# The mill registry: the only 16 triplets of cells that can ever form a mill,
+# as sorted triplets of cell coordinates (in the order of `nmm.topology.MILL_CELLS`).
+# It is built once and shared by all boards.
+MILLS: Tuple[MillIndex, ...] = tuple(tuple(CELLS[c] for c in mill) for mill in MILL_CELLS)
+MILL_IDS: Dict[MillIndex, int] = {mill: m for m, mill in enumerate(MILLS)}
 
 
 class Mill:
+    __slots__ = ('_cells', '_utilized', '_owner', '_board')
+
     def __init__(self, cells:Tuple[Cell, Cell, Cell], utilized:bool=False):
         self._cells: Tuple[Cell, Cell, Cell] = self._check_cells(cells)
         self._utilized: bool = utilized
         self._owner: str = self._cells[0].occupant  # Cell occupancy may change, but owner is set once
+        self._board: Optional['Board'] = None  # the board that formed the mill (its Zobrist key has the pending kill)
 
     @property
     def owner(self) -> str:
@@ -67,6 +84,8 @@ class Mill:
     @utilized.setter
     def utilized(self, value:bool):
         if not self._utilized:
+            if value and self._board is not None:
+                self._board._take_pending(self)
             self._utilized = value
         else:
             raise ValueError("Mill has already been utilized")
@@ -86,36 +105,24 @@ class Mill:
         if len(set([cell.occupant for cell in cells])) != 1:
             raise ValueError("All cells of a mill must have the same owner !")
         
-        for cell in cells:
-            if cell.neighbors['right'] in cells and cell.neighbors['left'] in cells:
-                return sorted(cells)
-            if cell.neighbors['upper'] in cells and cell.neighbors['lower'] in cells:
-                return sorted(cells)
-            if cell.neighbors['outer'] in cells and cell.neighbors['inner'] in cells:
-                return sorted(cells)
+        if self.registry_id(cells) is not None:
+            return sorted(cells)
         
         raise ValueError(f"Cells do not form a mill: {cells} !")
 
 
     @staticmethod
     def is_mill(cells:List[Cell]) -> bool:
-        if len(set(cells)) != 3:
+        if len(cells) != 3:
             return False
 
-        if any([cell.is_empty for cell in cells]):
+        owner = cells[0].occupant
+        if owner is None or any([cell.occupant != owner for cell in cells]):
             return False
 
-        if not all([cell.occupant == cells[0].occupant for cell in cells]):
-            return False
+        return Mill.registry_id(cells) is not None
 
-        for cell in cells:
-            if cell.neighbors['right'] in cells and \
-               cell.neighbors['left'] in cells:
-                return True
-            if cell.neighbors['upper'] in cells and \
-               cell.neighbors['lower'] in cells:
-                return True
-            if cell.neighbors['outer'] in cells and \
-               cell.neighbors['inner'] in cells:
-                return True
-        return False
\ No newline at end of file
+    @staticmethod
+    def registry_id(cells:List[Cell]) -> Optional[int]:
+        """Return the index of the given cells in the mill registry `MILLS` (or `None` if they cannot form a mill)."""
+        return MILL_IDS.get(tuple(sorted(tuple(cell) for cell in cells)))
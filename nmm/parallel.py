@@ -0,0 +1,458 @@
+"""Parallel searches over a pool of worker processes (Python searches one position per core at most).
+
+`RootSplitSearch` splits the root of an iterative deepening alpha-beta search (see `nmm.search`):
+at every depth, the best turn of the previous iteration is searched first with the full window,
+then the other turns of the root are spread over the workers. The workers share the best score found
+so far at the root (alpha) in shared memory: a turn is first searched with a null window at the
+current alpha, and searched again with the full window only when it does better. So the turns that
+start later are searched with the bound found by the others, as in a sequential search, and a worker
+polls the shared alpha during its search: when another worker raises it, the turn is searched again
+with the narrower window.
+
+`LazySMPSearch` runs the whole search of the same position in every worker, sharing a single
+`SharedTranspositionTable`: the workers only cooperate through the table, where each one finds the
+bounds and best turns stored by the others. The helpers skip some depths and shuffle the order of
+their quiet turns, so they do not all search the same tree at the same time. It needs no
+synchronization besides a stop flag, and scales better in the placing phase, where the 24 placements
+of the root leave few turns to split but many transpositions to share.
+
+`ParallelMCTS` runs the simulations of a Monte Carlo tree search (see `nmm.mcts`) in parallel: the tree
+stays in the arrays of the calling process, which selects the leaves with a virtual loss (the path
+of a leaf being evaluated counts as lost visits, so the next selections go elsewhere), while the workers
+play the random games of the leaves. The selection takes a fraction of a playout, so a few workers keep busy.
+
+The workers are processes of a `concurrent.futures.ProcessPoolExecutor`, started once and kept warm
+across searches: each worker keeps its own `AlphaBeta` (its killers and history, and the transposition table
+of a `RootSplitSearch`),
+and opens its own `Tablebase` (the files are memory-mapped, so the workers share them).
+The workers are stopped, and the shared memory is freed, by `close()` (or at the end of a `with` block),
+or else when the search is garbage collected or the interpreter exits (see `weakref.finalize`).
+"""
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple, Type, Union
+from concurrent.futures import ProcessPoolExecutor, Future, wait, FIRST_COMPLETED
+from multiprocessing.shared_memory import SharedMemory
+import multiprocessing as mp
+import numpy as np
+import os
+import random
+import time
+import weakref
+
+from nmm.dtypes import NamedPlayer
+from nmm.positions import Position
+from nmm.boards import Board
+from nmm.bitboards import BitBoard
+from nmm.search import AlphaBeta, MoveOrdering, SearchResult, TranspositionTable, INFINITY, MAX_PLY, evaluate, \
+                       root_position
+from nmm.mcts import MCTS, MCTSResult, random_playouts
+from nmm.tablebase.probe import Tablebase
+
+
+class _RootResult(NamedTuple):
+    """The search of a turn of the root by a worker (`score` is `None` if the time ran out)."""
+    turn: int
+    score: Optional[int]
+    exact: bool           # False when the score is only an upper bound (the turn did not beat alpha)
+    pv: List[int]
+    nodes: int
+
+
+_searcher: Optional[AlphaBeta] = None
+_alpha = None  # the best score of the root so far, shared by the workers (a `multiprocessing.Value`)
+_root: Optional[int] = None  # the key of the last root searched by the worker
+
+
+def _init_worker(alpha, table_mb:float, tablebase:Optional[str], evaluation:Callable[[Position], int]):
+    global _searcher, _alpha
+    _alpha = alpha
+    _searcher = AlphaBeta(TranspositionTable(table_mb), None if tablebase is None else Tablebase(tablebase), evaluation)
+
+
+def _ready() -> int:
+    return os.getpid()
+
+
+def _search_turn(position:Position, root:int, turn:int, depth:int, deadline:float) -> _RootResult:
+    """Search a turn of the root to `depth` (counting the turn), as a worker."""
+    global _root
+    searcher = _searcher
+    if root != _root:  # a new search: age the entries of the previous ones
+        searcher.transposition_table.new_search()
+        searcher.ordering.new_search()
+        _root = root
+    if time.time() >= deadline:
+        return _RootResult(turn, None, False, [], 0)
+    position.play(turn)
+    nodes = 0
+    searcher.stop = lambda: _alpha.value > alpha  # another worker raised alpha: search again with it
+    try:
+        while True:
+            alpha = _alpha.value
+            if alpha > -INFINITY:
+                found = searcher.search_window(position, depth - 1, -alpha - 1, -alpha, 1, deadline - time.time())
+                nodes += searcher.nodes
+                if found is None:
+                    if _alpha.value > alpha and time.time() < deadline:
+                        continue
+                    return _RootResult(turn, None, False, [], nodes)
+                if -found[0] <= alpha:
+                    return _RootResult(turn, -found[0], False, [turn] + found[1], nodes)
+            found = searcher.search_window(position, depth - 1, -INFINITY, -alpha, 1, deadline - time.time())
+            nodes += searcher.nodes
+            if found is not None:
+                break
+            if _alpha.value <= alpha or time.time() >= deadline:
+                return _RootResult(turn, None, False, [], nodes)
+    finally:
+        searcher.stop = None
+    score = -found[0]
+    with _alpha.get_lock():
+        if score > _alpha.value:
+            _alpha.value = score
+    return _RootResult(turn, score, score > alpha, [turn] + found[1], nodes)
+
+
+class RootSplitSearch:
+    """An iterative deepening search splitting the turns of the root over `workers` processes
+    (see the module doc), with the same `search` as `AlphaBeta`.
+
+    Each worker has a transposition table of `table_mb` MB, and opens the tablebase of the directory
+    `tablebase` if given. `evaluation` must be picklable (a function of a module, not a lambda).
+    Call `close()` (or use a `with` block) to stop the workers.
+    """
+
+    def __init__(self, workers:Optional[int]=None, table_mb:float=16, tablebase:Optional[Union[Tablebase, str]]=None,
+                 evaluation:Callable[[Position], int]=evaluate, info:Optional[Callable[[SearchResult], None]]=None):
+        if workers is None:
+            workers = os.cpu_count() or 1
+        if workers < 1:
+            raise ValueError(f"The number of workers must be positive, not {workers} !")
+        if isinstance(tablebase, Tablebase):
+            tablebase = tablebase.directory
+        self.workers: int = workers
+        self.info: Optional[Callable[[SearchResult], None]] = info
+        self.ordering: MoveOrdering = MoveOrdering()
+        self._alpha = mp.Value('i', -INFINITY)
+        self._pool: ProcessPoolExecutor = ProcessPoolExecutor(workers, initializer=_init_worker,
+                                                              initargs=(self._alpha, table_mb, tablebase, evaluation))
+        self._finalizer: weakref.finalize = weakref.finalize(self, _shutdown, self._pool)
+        for future in [self._pool.submit(_ready) for _ in range(workers)]:  # start the workers now
+            future.result()
+
+    def search(self, position:Union[Position, Board, BitBoard], player:Optional[Union[NamedPlayer, str]]=None,
+               max_depth:int=MAX_PLY, time_limit:Optional[float]=None) -> SearchResult:
+        """Search a `Position`, or a `Board` / `BitBoard` with `player` to move, until `max_depth`
+        or until `time_limit` seconds have passed (whichever comes first).
+        An iteration cut by the deadline still counts if the best turn of the previous iteration was
+        searched to its depth: the best turn searched to that depth is at least as good."""
+        position = root_position(position, player, max_depth)
+        start = time.time()
+        deadline = float('inf') if time_limit is None else start + time_limit
+        self.ordering.new_search()
+        turns = self.ordering.order(position, position.turns(), None, 0)
+        result = SearchResult(turns[0] if turns else None, 0, 0, turns[:1], 0, 0.0)
+        if len(turns) <= 1 or position.is_lost():
+            return result
+        nodes = 0
+        for depth in range(1, max_depth + 1):
+            self._alpha.value = -INFINITY
+            first = self._pool.submit(_search_turn, position, position.key, turns[0], depth, deadline).result()
+            results = [first]
+            if first.score is not None:
+                futures: List[Future] = [self._pool.submit(_search_turn, position, position.key, turn, depth, deadline)
+                                         for turn in turns[1:]]
+                wait(futures)
+                results.extend(future.result() for future in futures)
+            nodes += sum(r.nodes for r in results)
+            if first.score is None:
+                break
+            best = max((r for r in results if r.exact), key=lambda r: r.score)
+            result = SearchResult(best.turn, best.score, depth, best.pv, nodes, time.time() - start)
+            if any(r.score is None for r in results):
+                break
+            if self.info is not None:
+                self.info(result)
+            scores = {r.turn: r.score for r in results}
+            turns.sort(key=lambda turn: (turn == best.turn, scores[turn]), reverse=True)
+            if result.mate or result.seconds > (deadline - start) / 2:
+                break
+        return result._replace(nodes=nodes, seconds=time.time() - start)
+
+    def close(self):
+        self._finalizer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class SharedTranspositionTable(TranspositionTable):
+    """A `TranspositionTable` in shared memory (`multiprocessing.shared_memory`), for the processes
+    of a parallel search. The entries need no lock (see `TranspositionTable`).
+
+    Create the table in one process, and `attach` it by its `name` in the others (a pickled table
+    attaches itself). The generation is kept in the shared memory too: `new_search()` starts a new search
+    in the process that created the table, and only reads the current generation in the others.
+    Every process calls `close()` when done, and the table is freed when its creator closes it
+    (or drops it: the shared memory of a table that was not closed is freed when it is garbage collected).
+    """
+    HEADER: int = 2  # words before the entries: the generation and the number of buckets
+
+    def __init__(self, size_mb:float=16):
+        self._owner: bool = True
+        super().__init__(size_mb)
+
+    def _allocate(self, entries:int) -> Tuple[np.ndarray, np.ndarray]:
+        self._memory = SharedMemory(create=True, size=(self.HEADER + 2 * entries) * 8)
+        self._unlink: weakref.finalize = weakref.finalize(self, self._memory.unlink)
+        keys, data = self._map(entries)
+        self._header[:] = (0, entries // 2)
+        keys.fill(0)
+        data.fill(0)
+        return keys, data
+
+    def _map(self, entries:int) -> Tuple[np.ndarray, np.ndarray]:
+        words = np.ndarray((self.HEADER + 2 * entries,), dtype=np.uint64, buffer=self._memory.buf)
+        self._header: np.ndarray = words[:self.HEADER]
+        return words[self.HEADER:self.HEADER + entries], words[self.HEADER + entries:]
+
+    @classmethod
+    def attach(cls, name:str) -> 'SharedTranspositionTable':
+        """The table created by another process under the `name`."""
+        table = cls.__new__(cls)
+        table._owner = False
+        table._memory = SharedMemory(name)
+        header = np.ndarray((cls.HEADER,), dtype=np.uint64, buffer=table._memory.buf)
+        table._buckets = int(header[1])
+        del header
+        table._keys, table._data = table._map(2 * table._buckets)
+        table._generation = int(table._header[0])
+        return table
+
+    @property
+    def name(self) -> str:
+        return self._memory.name
+
+    def new_search(self):
+        if self._owner:
+            super().new_search()
+            self._header[0] = self._generation
+        else:
+            self._generation = int(self._header[0])
+
+    def clear(self):
+        super().clear()
+        self._header[0] = 0
+
+    def close(self):
+        if self._memory is None:
+            return
+        del self._header, self._keys, self._data  # the views of the memory must go before it is closed
+        self._memory.close()
+        if self._owner:
+            self._unlink()
+        self._memory = None
+
+    def __reduce__(self):
+        return SharedTranspositionTable.attach, (self.name,)
+
+
+class _Helper(AlphaBeta):
+    """A helper of a Lazy SMP search: it skips some depths (as Stockfish's helper threads did) and adds
+    some noise to its history, so that it searches ahead of, or aside from, the other workers."""
+    SKIP_SIZE: Tuple[int, ...] = (1, 1, 2, 2, 2, 2, 3, 3, 3, 3, 3, 3, 4, 4, 4, 4, 4, 4, 4, 4)
+    SKIP_PHASE: Tuple[int, ...] = (0, 1, 0, 1, 2, 3, 0, 1, 2, 3, 4, 5, 0, 1, 2, 3, 4, 5, 6, 7)
+    NOISE: int = 64  # the history noise, below the history of the turns that made a cutoff at depth 8
+
+    def __init__(self, index:int, transposition_table:SharedTranspositionTable, tablebase:Optional[Tablebase],
+                 evaluation:Callable[[Position], int]):
+        super().__init__(transposition_table, tablebase, evaluation)
+        self.index: int = index
+        self._random: random.Random = random.Random(index)
+
+    def search(self, position:Position, player:Optional[Union[NamedPlayer, str]]=None, max_depth:int=MAX_PLY,
+               time_limit:Optional[float]=None) -> SearchResult:
+        for history in self.ordering.history:
+            history[:] = [value + self._random.randrange(self.NOISE) for value in history]
+        return super().search(position, player, max_depth, time_limit)
+
+    def _depths(self, max_depth:int) -> Iterable[int]:
+        i = self.index % len(self.SKIP_SIZE)
+        size, phase = self.SKIP_SIZE[i], self.SKIP_PHASE[i]
+        return [depth for depth in range(1, max_depth + 1) if (depth + phase) // size % 2 == 0 or depth == max_depth]
+
+
+_helper: Optional[_Helper] = None
+
+
+def _init_helper(counter, stop, table:str, tablebase:Optional[str], evaluation:Callable[[Position], int]):
+    global _helper
+    with counter.get_lock():
+        index = counter.value
+        counter.value += 1
+    _helper = _Helper(index, SharedTranspositionTable.attach(table), None if tablebase is None else Tablebase(tablebase), evaluation)
+    _helper.stop = lambda: stop.value
+
+
+def _helper_search(position:Position, max_depth:int, time_limit:Optional[float]) -> SearchResult:
+    """Search the position as a helper, until the main search sets the stop flag."""
+    return _helper.search(position, max_depth=max_depth, time_limit=time_limit)
+
+
+class LazySMPSearch:
+    """An iterative deepening search of the same position by `workers` processes sharing a transposition table
+    of `table_mb` MB (see the module doc), with the same `search` as `AlphaBeta`.
+
+    The main search runs in the calling process, and `workers - 1` helpers in a pool: when the main search
+    completes, the helpers stop, and the deepest complete iteration wins (the main search's on a tie).
+    `evaluation` must be picklable (a function of a module, not a lambda).
+    Call `close()` (or use a `with` block) to stop the workers and free the table.
+    """
+
+    def __init__(self, workers:Optional[int]=None, table_mb:float=16, tablebase:Optional[Union[Tablebase, str]]=None,
+                 evaluation:Callable[[Position], int]=evaluate, info:Optional[Callable[[SearchResult], None]]=None):
+        if workers is None:
+            workers = os.cpu_count() or 1
+        if workers < 1:
+            raise ValueError(f"The number of workers must be positive, not {workers} !")
+        if isinstance(tablebase, str):
+            tablebase = Tablebase(tablebase)
+        self.workers: int = workers
+        self.transposition_table: SharedTranspositionTable = SharedTranspositionTable(table_mb)
+        # the main search reads the generation, as the helpers do: only `search` starts a new one
+        self._searcher: AlphaBeta = AlphaBeta(SharedTranspositionTable.attach(self.transposition_table.name),
+                                              tablebase, evaluation, info)
+        self._stop = mp.Value('b', 0)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        if workers > 1:
+            self._pool = ProcessPoolExecutor(workers - 1, initializer=_init_helper,
+                                             initargs=(mp.Value('i', 1), self._stop, self.transposition_table.name,
+                                                       None if tablebase is None else tablebase.directory, evaluation))
+            for future in [self._pool.submit(_ready) for _ in range(workers - 1)]:  # start the workers now
+                future.result()
+        self._finalizer: weakref.finalize = weakref.finalize(self, _shutdown, self._pool)
+
+    @property
+    def info(self) -> Optional[Callable[[SearchResult], None]]:
+        return self._searcher.info
+
+    @info.setter
+    def info(self, info:Optional[Callable[[SearchResult], None]]):
+        self._searcher.info = info
+
+    def search(self, position:Union[Position, Board, BitBoard], player:Optional[Union[NamedPlayer, str]]=None,
+               max_depth:int=MAX_PLY, time_limit:Optional[float]=None) -> SearchResult:
+        """Search a `Position`, or a `Board` / `BitBoard` with `player` to move, until `max_depth`
+        or until `time_limit` seconds have passed (whichever comes first)."""
+        position = root_position(position, player, max_depth)
+        start = time.perf_counter()
+        self.transposition_table.new_search()
+        self._stop.value = 0
+        futures: List[Future] = [] if self._pool is None else \
+                                [self._pool.submit(_helper_search, position, max_depth, time_limit)
+                                 for _ in range(self.workers - 1)]
+        try:
+            result = self._searcher.search(position, max_depth=max_depth, time_limit=time_limit)
+        finally:
+            self._stop.value = 1
+            results = [future.result() for future in futures]
+        best = max([result] + results, key=lambda r: r.depth)
+        return best._replace(nodes=result.nodes + sum(r.nodes for r in results), seconds=time.perf_counter() - start)
+
+    def close(self):
+        self._finalizer()
+        self._searcher.transposition_table.close()
+        self.transposition_table.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def _shutdown(pool:Optional[ProcessPoolExecutor]):
+    """Stop the workers of a pool (the finalizer of the parallel searches)."""
+    if pool is not None:
+        pool.shutdown(cancel_futures=True)
+
+
+def _playouts(position:Position, count:int, seed:int) -> float:
+    return random_playouts(position, count, np.random.default_rng(seed))
+
+
+class ParallelMCTS(MCTS):
+    """A Monte Carlo tree search with the random games of the leaves played by `workers` processes
+    (see the module doc), with the same `search` as `MCTS`.
+
+    Up to `workers` leaves are evaluated at once, each with a virtual loss of `virtual_loss` visits.
+    By default a new leaf is selected as soon as one is evaluated, so the search depends on the timing
+    of the workers. With `deterministic`, the leaves are selected and backed up in batches of `workers`
+    (waiting for the whole batch), and the games of every leaf are seeded from `seed` in order:
+    a new `ParallelMCTS` with the same `seed` and `workers` grows the same tree (for debugging).
+    Call `close()` (or use a `with` block) to stop the workers.
+    """
+
+    def __init__(self, workers:Optional[int]=None, formula:str='uct', exploration:float=1.4, playouts:int=32,
+                 max_nodes:int=1 << 18, prior:Optional[Callable[[Position, List[int]], Sequence[float]]]=None,
+                 seed:Optional[int]=None, virtual_loss:int=1, deterministic:bool=False):
+        super().__init__(formula, exploration, playouts, max_nodes, prior, seed)
+        if workers is None:
+            workers = os.cpu_count() or 1
+        if workers < 1:
+            raise ValueError(f"The number of workers must be positive, not {workers} !")
+        if virtual_loss < 1:
+            raise ValueError(f"The virtual loss must be positive, not {virtual_loss} !")
+        self.workers: int = workers
+        self.virtual_loss: int = virtual_loss
+        self.deterministic: bool = deterministic
+        self._pool: ProcessPoolExecutor = ProcessPoolExecutor(workers)
+        self._finalizer: weakref.finalize = weakref.finalize(self, _shutdown, self._pool)
+        for future in [self._pool.submit(_ready) for _ in range(workers)]:  # start the workers now
+            future.result()
+
+    def search(self, position:Position, iterations:Optional[int]=None, time_limit:Optional[float]=None) -> MCTSResult:
+        if iterations is None and time_limit is None:
+            raise ValueError("An iteration or time budget is needed !")
+        start = time.perf_counter()
+        deadline = float('inf') if time_limit is None else start + time_limit
+        self._set_root(position)
+        pending: Dict[Future, Tuple[List[int], List[int], int]] = {}
+        started = 0
+        while True:
+            while len(pending) < self.workers and (iterations is None or started < iterations) \
+                  and (started == 0 or time.perf_counter() < deadline):
+                leaf = position.copy()
+                path, movers = self._descend(leaf, self.virtual_loss)
+                started += 1
+                if self._lost(path[-1]):
+                    self._backup(path, movers, leaf.side, 0.0, self.virtual_loss)
+                    continue
+                seed = int(self.rng.integers(2 ** 63))
+                pending[self._pool.submit(_playouts, leaf, self.playouts, seed)] = (path, movers, leaf.side)
+            if not pending:
+                break
+            if self.deterministic:  # the whole batch, in the order of the selections
+                done = list(pending)
+                wait(done)
+            else:
+                done = wait(pending, return_when=FIRST_COMPLETED).done
+            for future in done:
+                path, movers, side = pending.pop(future)
+                self._backup(path, movers, side, future.result(), self.virtual_loss)
+        return self._result(started, time.perf_counter() - start)
+
+    def close(self):
+        self._finalizer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+PARALLEL_SEARCHES: Dict[str, Type[Union[LazySMPSearch, RootSplitSearch]]] = {'lazy_smp': LazySMPSearch,
+                                                                              'root_split': RootSplitSearch}
@@ -1,7 +1,6 @@
 from __future__ import annotations
-import copy
 from enum import Enum
-from typing import Optional, Union
+from typing import Optional, Union, Iterable, Dict
 from nmm import Cell
 from nmm.dtypes import NamedPlayer
 
@@ -32,6 +31,8 @@ class Piece():
     A piece can be cloned using the `clone` method, which returns a deep copy of the piece.
 
     """
+    __slots__ = ('_id', '_owner', '_state', '_cell')
+
     def __init__(self, 
                  owner:str, 
                  _id:int, 
@@ -76,10 +77,9 @@ class Piece():
         """Return a deep copy of the piece.
         *Warning: The cell is not cloned, it is set to the given cell (or `None` if not provided).*
         """
-        piece = copy.deepcopy(self)
-        return Piece(owner=piece.owner, 
-                     _id=piece._id, 
-                     state=piece.state, 
+        return Piece(owner=self._owner, 
+                     _id=self._id, 
+                     state=self._state, 
                      cell=cell)
 
     def __repr__(self):
@@ -95,4 +95,74 @@ class Piece():
         return hash((self.owner, self._id))
         
     def __eq__(self, other):
-        return hash(self) == hash(other)
\ No newline at end of file
+        return hash(self) == hash(other)
+
+
+class PieceList(list):
+    """A list of pieces with constant-time membership tests, lookups and removals.
+
+    Every piece remembers its position in the list, and removing a piece moves the last 
+    piece of the list into the freed position (so the order of the pieces is not preserved).
+    `restore(position, piece)` takes back such a removal, restoring the exact previous order.
+
+    The list is modified with `append`, `extend` (or `+=`), `pop` (from the end), `remove`, `restore`
+    and `clear`, which keep the positions of the pieces: the other mutations of a list (`insert`,
+    item assignment and deletion, `sort`, ...) would not, so they raise a `TypeError`.
+    """
+    def __init__(self, pieces:Iterable[Piece]=()):
+        super().__init__(pieces)
+        self._positions: Dict[Piece, int] = {piece: i for i, piece in enumerate(self)}
+
+    def append(self, piece:Piece):
+        self._positions[piece] = len(self)
+        super().append(piece)
+
+    def extend(self, pieces:Iterable[Piece]):
+        for piece in pieces:
+            self.append(piece)
+
+    def __iadd__(self, pieces:Iterable[Piece]) -> 'PieceList':
+        self.extend(pieces)
+        return self
+
+    def pop(self, index:int=-1) -> Piece:
+        if index not in (-1, len(self) - 1):
+            raise TypeError(f"A PieceList only pops its last piece, not the piece at {index} !")
+        piece = super().pop()
+        del self._positions[piece]
+        return piece
+
+    def remove(self, piece:Piece):
+        position = self._positions.pop(piece)
+        last = super().pop()
+        if last is not piece:
+            super().__setitem__(position, last)
+            self._positions[last] = position
+
+    def restore(self, position:int, piece:Piece):
+        """Put back a piece removed from `position` (the inverse of `remove`)."""
+        if position == len(self):
+            self.append(piece)
+            return
+        moved = self[position]
+        super().__setitem__(position, piece)
+        self._positions[piece] = position
+        self.append(moved)
+
+    def clear(self):
+        super().clear()
+        self._positions.clear()
+
+    def __reduce__(self):
+        return PieceList, (list(self),)
+
+    def _unsupported(self, *args, **kwargs):
+        raise TypeError("A PieceList is only modified with append, extend, pop, remove, restore and clear !")
+
+    insert = __setitem__ = __delitem__ = __imul__ = sort = reverse = _unsupported
+
+    def index(self, piece:Piece) -> int:
+        return self._positions[piece]
+
+    def __contains__(self, piece:Piece) -> bool:
+        return piece in self._positions
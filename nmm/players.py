@@ -8,6 +8,7 @@ from abc import ABC, abstractmethod
 from nmm.dtypes import NamedPlayer
 from nmm.boards import Board, Cell
 from nmm.dtypes import PlayerState
+from nmm.tablebase.probe import Tablebase
 
 
 
@@ -106,4 +107,35 @@ class CMDPlayer(Player):
 
 
 class AIPlayer(Player, ABC):
-    ...
\ No newline at end of file
+    """An automated player.
+
+    An AI player can be given a `Tablebase` (or the directory of its files, see `python -m nmm.tablebase build`)
+    to play perfectly once all pieces are placed: `tablebase_play` returns the tablebase's choice
+    (or `None` when the position is not in the tablebase), which `play` can return before searching.
+    `close()` (or the end of a `with` block) releases what the player holds, e.g. the workers of a parallel search.
+    """
+
+    def __init__(self, name:str, tablebase:Optional[Union[Tablebase, str]]=None):
+        super().__init__(name)
+        self.tablebase: Optional[Tablebase] = Tablebase(tablebase) if isinstance(tablebase, str) else tablebase
+
+    def tablebase_play(self, board:Board, state:PlayerState) -> Optional[Union[Cell, Tuple[Cell, Cell]]]:
+        if self.tablebase is None:
+            return None
+        if state == PlayerState.MOVING or state == PlayerState.FLYING:
+            return self.tablebase.best_move(board, self)
+        if state == PlayerState.KILLING:
+            return self.tablebase.best_kill(board, self)
+        return None
+
+    def clone(self) -> Self:
+        return self.__class__(self._name, tablebase=self.tablebase)
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
\ No newline at end of file
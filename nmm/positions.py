@@ -0,0 +1,280 @@
+"""A mutable position for search: the board, the pieces still to place and the side to move, in a few integers.
+
+Unlike `Board` and `BitBoard`, a `Position` knows whose turn it is, so it can generate the legal
+actions of the side to move and play them (`apply` / `undo`) without any check. Actions are
+the integers of `nmm.actions`: placements, moves (or flights, for a side with 3 pieces) and kills.
+A placement or a move that closes mills leaves the turn to the same side, which then kills once per mill
+(the mills waiting for their kill are `pending`), like `PlayerState.KILLING` in the game.
+
+A search counts whole turns instead: a turn is a placement or a move together with the kills of the
+mills it closes (`turns` / `play`), so the side to move changes at every turn. Turns are integers too,
+`encode_turn(action, victims)` with the mask of the killed cells (at most two, when two mills close at once);
+the action of a turn is `NO_ACTION` when the turn only makes the kills left `pending`.
+
+The key of a position is its Zobrist key (see `nmm.zobrist`), kept up to date by `apply`:
+that's `Board.zobrist` of the same position, with `SIDE_KEY` when the second player is to move.
+"""
+from typing import Dict, List, Optional, Tuple, Union
+from itertools import combinations
+
+from nmm.topology import NUM_CELLS, FULL_MASK, ADJACENT_MASKS, MILL_MASKS, CELL_MILLS, PIECES_PER_PLAYER, \
+                         mask_to_ids
+from nmm.zobrist import CELL_KEYS, READY_KEYS, PENDING_KEYS, SIDE_KEY
+from nmm.dtypes import NamedPlayer, PlayerState
+from nmm.boards import Board
+from nmm.bitboards import BitBoard
+from nmm.actions import PLACE, MOVE, KILL, ACTION_SOURCES, ACTION_TARGETS, MOVE_ACTIONS, FLY_ACTIONS
+
+
+MIN_PIECES: int = 3  # a side with fewer pieces (on the board and to place) has lost
+
+Snapshot = Tuple[int, int, int, int, int, int, int]
+
+NO_ACTION: int = KILL  # the action of a turn that only kills (the actions of the turns are placements and moves)
+TURN_ACTIONS: int = KILL + 1
+MAX_KILLS: int = 2     # a cell is on two mills, so a turn closes two mills at most
+# the masks of the cells killed by a turn (none, one or two cells), and their codes
+VICTIMS: Tuple[int, ...] = tuple(sum(1 << c for c in cells) for k in range(MAX_KILLS + 1)
+                                 for cells in combinations(range(NUM_CELLS), k))
+VICTIM_CODES: Dict[int, int] = {mask: code for code, mask in enumerate(VICTIMS)}
+NUM_TURNS: int = TURN_ACTIONS * len(VICTIMS)
+
+
+def encode_turn(action:int, victims:int=0) -> int:
+    """The turn made of an action (a placement, a move, or `NO_ACTION`) and the kills of the cells of `victims`."""
+    if not PLACE <= action <= NO_ACTION:
+        raise ValueError(f"Invalid action of a turn: {action} !")
+    if victims not in VICTIM_CODES:
+        raise ValueError(f"Invalid victims of a turn: {victims:#x} !")
+    return VICTIM_CODES[victims] * TURN_ACTIONS + action
+
+
+def decode_turn(turn:int) -> Tuple[int, int]:
+    """The action of a turn and the mask of the cells it kills."""
+    if not 0 <= turn < NUM_TURNS:
+        raise ValueError(f"Invalid turn: {turn} !")
+    code, action = divmod(turn, TURN_ACTIONS)
+    return action, VICTIMS[code]
+
+
+class Position:
+    """The state of a game between two sides (0: first player, 1: second player), see the module doc."""
+    __slots__ = ('occupancy', 'ready', 'side', 'pending', 'key')
+
+    def __init__(self, occupancy:Tuple[int, int]=(0, 0), ready:Tuple[int, int]=(PIECES_PER_PLAYER, PIECES_PER_PLAYER),
+                 side:int=0, pending:int=0):
+        if occupancy[0] & occupancy[1]:
+            raise ValueError(f"A cell cannot be occupied by both sides: {occupancy[0] & occupancy[1]:#x} !")
+        if side not in (0, 1):
+            raise ValueError(f"Invalid side to move: {side} !")
+        self.occupancy: List[int] = list(occupancy)
+        self.ready: List[int] = list(ready)
+        self.side: int = side
+        self.pending: int = pending  # the mask of the mills of the side to move waiting for their kill
+        self.key: int = self._compute_key()
+
+    @classmethod
+    def from_board(cls, board:Union[Board, BitBoard], player:Union[NamedPlayer, str]) -> 'Position':
+        """The position of a `Board` or a `BitBoard` with `player` to move."""
+        if isinstance(board, BitBoard):
+            side = board.check_player(player)
+            occupancy, ready = tuple(board.occupancy), tuple(board._ready)
+            pending = board._formed_mills(side) & ~board._utilized[side]
+        else:
+            side = board._sides[board.check_player(player)]
+            masks = [0, 0]
+            for cell in board.cells:
+                if cell.occupant is not None:
+                    masks[board._sides[cell.occupant]] |= 1 << cell.id
+            occupancy = tuple(masks)
+            ready = tuple(len(board.get_my_ready_pieces(p)) for p in board.players)
+            pending = sum(1 << m for m, mill in enumerate(board._mills) if mill is not None and not mill.utilized
+                          and occupancy[side] & MILL_MASKS[m] == MILL_MASKS[m])
+        return cls(occupancy, ready, side, pending)
+
+    def _compute_key(self) -> int:
+        key = SIDE_KEY if self.side else 0
+        for side in (0, 1):
+            key ^= READY_KEYS[side][self.ready[side]]
+            for c in mask_to_ids(self.occupancy[side]):
+                key ^= CELL_KEYS[side][c]
+        for m in mask_to_ids(self.pending):
+            key ^= PENDING_KEYS[m]
+        return key
+
+    @property
+    def state(self) -> PlayerState:
+        """The state of the side to move (as `Board.get_player_state`)."""
+        if self.pending:
+            return PlayerState.KILLING
+        if self.ready[self.side]:
+            return PlayerState.PLACING
+        placed = self.occupancy[self.side].bit_count()
+        if placed > MIN_PIECES:
+            return PlayerState.MOVING
+        return PlayerState.FLYING if placed == MIN_PIECES else PlayerState.LOOSING
+
+    def pieces(self, side:int) -> int:
+        """The pieces of a side on the board and still to place."""
+        return self.occupancy[side].bit_count() + self.ready[side]
+
+    def is_lost(self) -> bool:
+        """Whether the side to move has lost on pieces (it may also have lost by having no action)."""
+        return not self.pending and self.pieces(self.side) < MIN_PIECES
+
+    def actions(self) -> List[int]:
+        """The legal actions of the side to move."""
+        side = self.side
+        if self.pending:
+            return [KILL + c for c in mask_to_ids(self.occupancy[1 - side])]
+        empty = FULL_MASK & ~(self.occupancy[0] | self.occupancy[1])
+        if self.ready[side]:
+            return [PLACE + c for c in mask_to_ids(empty)]
+        mine = self.occupancy[side]
+        if mine.bit_count() == MIN_PIECES:
+            return [FLY_ACTIONS[source][destination] for source in mask_to_ids(mine) for destination in mask_to_ids(empty)]
+        return [MOVE_ACTIONS[source][destination] for source in mask_to_ids(mine)
+                for destination in mask_to_ids(empty & ADJACENT_MASKS[source])]
+
+    def turns(self) -> List[int]:
+        """The legal turns of the side to move (see `encode_turn`)."""
+        side = self.side
+        theirs = self.occupancy[1 - side]
+        if self.pending:
+            return [encode_turn(NO_ACTION, victims) for victims in _victims(theirs, self.pending.bit_count())]
+        turns = []
+        mine = self.occupancy[side]
+        for action in self.actions():
+            destination = ACTION_TARGETS[action]
+            moved = mine | 1 << destination
+            if action >= MOVE:
+                moved ^= 1 << ACTION_SOURCES[action]
+            closed = sum(moved & MILL_MASKS[m] == MILL_MASKS[m] for m in CELL_MILLS[destination])
+            if closed and theirs:
+                turns.extend(VICTIM_CODES[victims] * TURN_ACTIONS + action for victims in _victims(theirs, closed))
+            else:
+                turns.append(action)
+        return turns
+
+    def play(self, turn:int) -> Snapshot:
+        """Play a legal turn of the side to move (see `turns`) at once, and return what `undo` needs to take it back."""
+        snapshot = self.snapshot()
+        side = self.side
+        code, action = divmod(turn, TURN_ACTIONS)
+        keys = CELL_KEYS[side]
+        if action >= MOVE and action != NO_ACTION:
+            source, destination = ACTION_SOURCES[action], ACTION_TARGETS[action]
+            self.occupancy[side] ^= (1 << source) | (1 << destination)
+            self.key ^= keys[source] ^ keys[destination]
+        elif action != NO_ACTION:
+            self.occupancy[side] |= 1 << action
+            self.key ^= keys[action] ^ READY_KEYS[side][self.ready[side]] ^ READY_KEYS[side][self.ready[side] - 1]
+            self.ready[side] -= 1
+        victims = VICTIMS[code]
+        if victims:
+            self.occupancy[1 - side] &= ~victims
+            for c in mask_to_ids(victims):
+                self.key ^= CELL_KEYS[1 - side][c]
+        self._end_turn()
+        return snapshot
+
+    def snapshot(self) -> Snapshot:
+        return (self.occupancy[0], self.occupancy[1], self.ready[0], self.ready[1], self.side, self.pending, self.key)
+
+    def apply(self, action:int) -> Snapshot:
+        """Play a legal action of the side to move, and return what `undo` needs to take it back."""
+        snapshot = self.snapshot()
+        side = self.side
+        keys = CELL_KEYS[side]
+        if action >= KILL:
+            c = action - KILL
+            self.occupancy[1 - side] &= ~(1 << c)
+            m = (self.pending & -self.pending).bit_length() - 1  # the pending mills are used in order
+            self.pending ^= 1 << m
+            self.key ^= CELL_KEYS[1 - side][c] ^ PENDING_KEYS[m]
+            if not self.pending or not self.occupancy[1 - side]:
+                self._end_turn()
+            return snapshot
+        if action >= MOVE:
+            source, destination = ACTION_SOURCES[action], ACTION_TARGETS[action]
+            self.occupancy[side] ^= (1 << source) | (1 << destination)
+            self.key ^= keys[source] ^ keys[destination]
+        else:
+            destination = action - PLACE
+            self.occupancy[side] |= 1 << destination
+            self.key ^= keys[destination] ^ READY_KEYS[side][self.ready[side]] ^ READY_KEYS[side][self.ready[side] - 1]
+            self.ready[side] -= 1
+        mine = self.occupancy[side]
+        for m in CELL_MILLS[destination]:
+            if mine & MILL_MASKS[m] == MILL_MASKS[m]:
+                self.pending |= 1 << m
+                self.key ^= PENDING_KEYS[m]
+        if not self.pending or not self.occupancy[1 - side]:  # nothing to kill
+            self._end_turn()
+        return snapshot
+
+    def actions_to(self, other:'Position') -> Optional[List[int]]:
+        """The actions of the side to move leading to `other` within its turn (e.g. the reply of the opponent,
+        seen by comparing the boards before and after it): a placement or a move and its kills, only kills if
+        some are `pending`, or none if `other` is this position. `None` if no such actions lead to `other`."""
+        if other == self:
+            return []
+        side = self.side
+        mine, theirs = self.occupancy[side], self.occupancy[1 - side]
+        added, removed = other.occupancy[side] & ~mine, mine & ~other.occupancy[side]
+        actions = []
+        if not self.pending:
+            if added.bit_count() != 1:
+                return None
+            destination = added.bit_length() - 1
+            if self.ready[side]:
+                actions.append(PLACE + destination)
+            elif removed.bit_count() == 1:
+                source = removed.bit_length() - 1
+                table = FLY_ACTIONS if mine.bit_count() == MIN_PIECES else MOVE_ACTIONS
+                actions.append(table[source][destination])
+            else:
+                return None
+        actions.extend(KILL + c for c in mask_to_ids(theirs & ~other.occupancy[1 - side]))
+        if min(actions, default=0) < 0:
+            return None
+        position = self.copy()
+        for action in actions:
+            if action not in position.actions():
+                return None
+            position.apply(action)
+        return actions if position == other else None
+
+    def _end_turn(self):
+        for m in mask_to_ids(self.pending):
+            self.key ^= PENDING_KEYS[m]
+        self.pending = 0
+        self.side ^= 1
+        self.key ^= SIDE_KEY
+
+    def undo(self, snapshot:Snapshot):
+        """Take back the action that returned `snapshot`."""
+        self.occupancy[0], self.occupancy[1], self.ready[0], self.ready[1], self.side, self.pending, self.key = snapshot
+
+    def copy(self) -> 'Position':
+        position = Position.__new__(Position)
+        position.occupancy, position.ready = self.occupancy[:], self.ready[:]
+        position.side, position.pending, position.key = self.side, self.pending, self.key
+        return position
+
+    def __eq__(self, other:object) -> bool:
+        return isinstance(other, Position) and self.snapshot() == other.snapshot()
+
+    def __hash__(self) -> int:
+        return self.key
+
+    def __repr__(self) -> str:
+        return (f"Position(occupancy=({self.occupancy[0]:#08x}, {self.occupancy[1]:#08x}), "
+                f"ready={tuple(self.ready)}, side={self.side}, pending={self.pending:#06x})")
+
+
+def _victims(theirs:int, kills:int) -> List[int]:
+    """The masks of the cells that `kills` kills can take among the cells of `theirs`."""
+    cells = mask_to_ids(theirs)
+    kills = min(kills, len(cells), MAX_KILLS)
+    return [sum(1 << c for c in victims) for victims in combinations(cells, kills)]
@@ -0,0 +1,241 @@
+"""Dense ranking of nine men's morris positions (position <-> integer index).
+
+A position is made of the occupancy of the 24 cells, the side to move (0: first player, 1: second
+player) and the number of ready (not yet placed) and dead pieces of each side. Positions are grouped
+in classes of the same piece counts (see `PositionClass`); in a class of `p0` placed pieces against `p1`:
+- the cells of the first player are ranked among the `C(24, p0)` subsets of the board,
+- the cells of the second player are ranked among the `C(24 - p0, p1)` subsets of the remaining cells,
+- the side to move is the lowest digit,
+which numbers the positions of the class from 0 to `class_size(cls) - 1`, without holes.
+Subsets are ranked with the combinatorial number system: the subset `c_1 < c_2 < ... < c_k` of cell ids
+has the rank `C(c_1, 1) + C(c_2, 2) + ... + C(c_k, k)`.
+
+The index of a position in its class is what per-class flat arrays (e.g. the tablebase files) are indexed by.
+`CLASSES` and `CLASS_OFFSETS` chain all the classes into a single dense index (see `global_rank`).
+The `*_array` functions rank and unrank many positions of a class at once, on NumPy arrays.
+"""
+from typing import NamedTuple, Tuple, Dict, Union, List
+from math import comb
+import numpy as np
+
+from nmm.topology import NUM_CELLS, FULL_MASK, PIECES_PER_PLAYER, mask_to_ids
+from nmm.boards import Board
+from nmm.bitboards import BitBoard
+
+
+BINOMIALS: Tuple[Tuple[int, ...], ...] = tuple(tuple(comb(n, k) for k in range(NUM_CELLS + 1))
+                                               for n in range(NUM_CELLS + 1))
+_BINOMIALS: np.ndarray = np.array(BINOMIALS, dtype=np.int64)
+
+
+class PositionClass(NamedTuple):
+    """The piece counts shared by the positions of a class: the placed and ready pieces of each side
+    (the dead pieces are the rest of the 9 pieces of a side)."""
+    placed0: int
+    placed1: int
+    ready0: int = 0
+    ready1: int = 0
+
+    @property
+    def dead0(self) -> int:
+        return PIECES_PER_PLAYER - self.placed0 - self.ready0
+
+    @property
+    def dead1(self) -> int:
+        return PIECES_PER_PLAYER - self.placed1 - self.ready1
+
+    @property
+    def name(self) -> str:
+        """E.g. '8v7' once all pieces are placed, or '2+7v1+8' (placed + ready) while placing."""
+        if self.ready0 == self.ready1 == 0:
+            return f"{self.placed0}v{self.placed1}"
+        return f"{self.placed0}+{self.ready0}v{self.placed1}+{self.ready1}"
+
+    @property
+    def size(self) -> int:
+        return class_size(self)
+
+
+def _build_classes() -> Tuple[PositionClass, ...]:
+    classes = []
+    for placed0 in range(PIECES_PER_PLAYER + 1):
+        for placed1 in range(PIECES_PER_PLAYER + 1):
+            for ready0 in range(PIECES_PER_PLAYER - placed0 + 1):
+                for ready1 in range(PIECES_PER_PLAYER - placed1 + 1):
+                    classes.append(PositionClass(placed0, placed1, ready0, ready1))
+    return tuple(classes)
+
+
+def class_size(cls:PositionClass) -> int:
+    """The number of positions in a class (both sides to move)."""
+    return BINOMIALS[NUM_CELLS][cls.placed0] * BINOMIALS[NUM_CELLS - cls.placed0][cls.placed1] * 2
+
+
+CLASSES: Tuple[PositionClass, ...] = _build_classes()
+CLASS_OFFSETS: Dict[PositionClass, int] = dict(zip(CLASSES, np.cumsum([0] + [class_size(c) for c in CLASSES]).tolist()))
+NUM_POSITIONS: int = sum(class_size(c) for c in CLASSES)
+
+
+def _rank_subset(ids:List[int]) -> int:
+    return sum(BINOMIALS[c][i] for i, c in enumerate(ids, start=1))
+
+
+def _unrank_subset(rank:int, k:int) -> List[int]:
+    ids = []
+    for i in range(k, 0, -1):
+        c = i - 1
+        while BINOMIALS[c + 1][i] <= rank:
+            c += 1
+        rank -= BINOMIALS[c][i]
+        ids.append(c)
+    return ids[::-1]
+
+
+def _compress(mask:int, occupied:int) -> List[int]:
+    """The positions of the cells of `mask` among the cells that are not `occupied`."""
+    return [c - (occupied & ((1 << c) - 1)).bit_count() for c in mask_to_ids(mask)]
+
+
+def _expand(positions:List[int], occupied:int) -> int:
+    free = [c for c in range(NUM_CELLS) if not occupied >> c & 1]
+    return sum(1 << free[j] for j in positions)
+
+
+def rank(mask0:int, mask1:int, side:int) -> int:
+    """Return the index of a position in its class, given the masks of the cells of both sides
+    and the side to move (the class follows from the number of cells in the masks)."""
+    if mask0 & mask1:
+        raise ValueError(f"A cell cannot be occupied by both sides: {mask0 & mask1:#x} !")
+    if side not in (0, 1):
+        raise ValueError(f"Invalid side to move: {side} !")
+    rank0 = _rank_subset(mask_to_ids(mask0))
+    rank1 = _rank_subset(_compress(mask1, mask0))
+    return (rank0 * BINOMIALS[NUM_CELLS - mask0.bit_count()][mask1.bit_count()] + rank1) * 2 + side
+
+
+def unrank(index:int, cls:PositionClass) -> Tuple[int, int, int]:
+    """Return the position of the given index in a class, as `(mask0, mask1, side)`."""
+    if not 0 <= index < class_size(cls):
+        raise ValueError(f"Index out of range for class {cls.name}: {index} !")
+    index, side = divmod(index, 2)
+    rank0, rank1 = divmod(index, BINOMIALS[NUM_CELLS - cls.placed0][cls.placed1])
+    mask0 = sum(1 << c for c in _unrank_subset(rank0, cls.placed0))
+    mask1 = _expand(_unrank_subset(rank1, cls.placed1), mask0)
+    return mask0, mask1, side
+
+
+def _masks_and_counts(board:Union[Board, BitBoard]) -> Tuple[int, int, int, int]:
+    if isinstance(board, BitBoard):
+        return (*board.occupancy, *board._ready)
+    masks = [0, 0]
+    for cell in board.cells:
+        if cell.occupant is not None:
+            masks[board._sides[cell.occupant]] |= 1 << cell.id
+    return (*masks, *[len(board.get_my_ready_pieces(player)) for player in board.players])
+
+
+def position_class(board:Union[Board, BitBoard]) -> PositionClass:
+    """Return the class of the position of a `Board` or a `BitBoard`."""
+    mask0, mask1, ready0, ready1 = _masks_and_counts(board)
+    return PositionClass(mask0.bit_count(), mask1.bit_count(), ready0, ready1)
+
+
+def rank_board(board:Union[Board, BitBoard], side:int) -> Tuple[PositionClass, int]:
+    """Return the class of the position of a `Board` or a `BitBoard` with `side` to move,
+    and the index of the position in its class."""
+    mask0, mask1, ready0, ready1 = _masks_and_counts(board)
+    return PositionClass(mask0.bit_count(), mask1.bit_count(), ready0, ready1), rank(mask0, mask1, side)
+
+
+def global_rank(board:Union[Board, BitBoard], side:int) -> int:
+    """Return the index of a position among all the positions of all the classes (see `CLASSES`)."""
+    cls, index = rank_board(board, side)
+    return CLASS_OFFSETS[cls] + index
+
+
+def global_unrank(index:int) -> Tuple[PositionClass, int, int, int]:
+    """Return the position of a global index (see `global_rank`), as `(cls, mask0, mask1, side)`."""
+    if not 0 <= index < NUM_POSITIONS:
+        raise ValueError(f"Index out of range: {index} !")
+    offsets = list(CLASS_OFFSETS.values())
+    cls = CLASSES[int(np.searchsorted(offsets, index, side='right')) - 1]
+    return (cls, *unrank(index - CLASS_OFFSETS[cls], cls))
+
+
+def _build_rank_tables() -> np.ndarray:
+    """`tables[k, p, byte]`: the part of the rank of a subset coming from its cells in the k-th byte,
+    when `p` cells of the subset come before that byte."""
+    tables = np.zeros((3, NUM_CELLS + 1, 256), dtype=np.int64)
+    for k in range(3):
+        for p in range(NUM_CELLS + 1):
+            for byte in range(256):
+                bits = [8 * k + j for j in range(8) if byte >> j & 1]
+                tables[k, p, byte] = sum(BINOMIALS[c][p + i] for i, c in enumerate(bits, start=1)
+                                         if p + i <= NUM_CELLS)
+    return tables
+
+
+def _build_extract_table() -> np.ndarray:
+    """`table[free, byte]`: the bits of `byte` at the positions of the bits of `free`, packed together."""
+    table = np.zeros((256, 256), dtype=np.int64)
+    for free in range(256):
+        positions = [j for j in range(8) if free >> j & 1]
+        for byte in range(256):
+            table[free, byte] = sum(1 << i for i, j in enumerate(positions) if byte >> j & 1)
+    return table
+
+
+_RANK_TABLES: np.ndarray = _build_rank_tables().reshape(3, -1)    # indexed by `p << 8 | byte`
+_EXTRACT_TABLE: np.ndarray = _build_extract_table().reshape(-1)  # indexed by `free << 8 | byte`
+
+
+def _rank_subset_array(masks:np.ndarray) -> np.ndarray:
+    low, middle, high = masks & 255, (masks >> 8) & 255, masks >> 16
+    before_middle = np.bitwise_count(low).astype(np.int64)
+    before_high = before_middle + np.bitwise_count(middle)
+    return (np.take(_RANK_TABLES[0], low) + np.take(_RANK_TABLES[1], (before_middle << 8) | middle)
+            + np.take(_RANK_TABLES[2], (before_high << 8) | high))
+
+
+def rank_array(masks0:np.ndarray, masks1:np.ndarray, sides:Union[np.ndarray, int]) -> np.ndarray:
+    """Vectorized `rank` of positions of a class (all masks0 have the same number of cells,
+    and so do all masks1). Returns an `int64` array of indices.
+    Subsets are ranked a byte at a time, through precomputed tables."""
+    masks0, masks1 = np.asarray(masks0, dtype=np.int64), np.asarray(masks1, dtype=np.int64)
+    if len(masks0) == 0:
+        return np.zeros(0, dtype=np.int64)
+    placed0, placed1 = int(np.bitwise_count(masks0[0])), int(np.bitwise_count(masks1[0]))
+    free = FULL_MASK & ~masks0  # the second side is ranked by the positions of its cells among the free cells
+    compressed = np.zeros_like(masks1)
+    shift = np.zeros_like(masks1)
+    for k in range(3):
+        free_byte = (free >> (8 * k)) & 255
+        compressed |= np.take(_EXTRACT_TABLE, (free_byte << 8) | ((masks1 >> (8 * k)) & 255)) << shift
+        shift += np.bitwise_count(free_byte)
+    rank0, rank1 = _rank_subset_array(masks0), _rank_subset_array(compressed)
+    return (rank0 * BINOMIALS[NUM_CELLS - placed0][placed1] + rank1) * 2 + np.asarray(sides, dtype=np.int64)
+
+
+def _unrank_subset_array(ranks:np.ndarray, k:int) -> np.ndarray:
+    """The masks (over `0..NUM_CELLS-1` positions) of the subsets of the given ranks."""
+    masks = np.zeros_like(ranks)
+    for i in range(k, 0, -1):
+        c = np.searchsorted(_BINOMIALS[:, i], ranks, side='right') - 1
+        ranks = ranks - _BINOMIALS[c, i]
+        masks |= np.int64(1) << c
+    return masks
+
+
+def unrank_array(indices:np.ndarray, cls:PositionClass) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Vectorized `unrank` of indices of a class. Returns the `int64` arrays `(masks0, masks1, sides)`."""
+    indices = np.asarray(indices, dtype=np.int64)
+    sides = indices & 1
+    rank0, rank1 = np.divmod(indices >> 1, BINOMIALS[NUM_CELLS - cls.placed0][cls.placed1])
+    masks0 = _unrank_subset_array(rank0, cls.placed0)
+    compressed = _unrank_subset_array(rank1, cls.placed1)
+    masks1, j = np.zeros_like(masks0), np.zeros_like(masks0)
+    for c in range(NUM_CELLS):
+        free = 1 - ((masks0 >> c) & 1)
+        masks1 |= ((compressed >> j) & free) << c
+        j += free
+    return masks0, masks1, sides
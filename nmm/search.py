@@ -0,0 +1,490 @@
+"""Search utilities for the nine men's morris agents.
+
+`AlphaBeta` is a negamax alpha-beta search over `nmm.positions.Position`, covering all the states
+of a turn (placing, moving, flying and killing): a ply is a whole turn, a placement or a move together
+with the kills of the mills it closes (see `Position.turns`), so the depth counts real turns and the
+side to move changes at every ply. The search is driven by iterative deepening:
+- every iteration searches one turn deeper, with the best turn of the previous iteration first
+  (through the `TranspositionTable`), and the other turns in the order of `MoveOrdering`,
+- from the third iteration on, the window is narrowed around the previous score (aspiration window),
+  and widened when the score falls out of it,
+- every move after the first is searched with a null window (principal variation search), and searched
+  again with the full window only when it turns out better,
+- the search stops at a hard wall-clock deadline; the result is the one of the last complete iteration.
+
+Scores are in centipawn-like units for the side to move (see `evaluate`); a won position scores
+`MATE - plies to the win`, and a position found in a `Tablebase` scores as its value and depth.
+"""
+from typing import Callable, Iterable, List, NamedTuple, Optional, Tuple, Union
+from enum import IntEnum
+import time
+import numpy as np
+
+from nmm.topology import NUM_CELLS, FULL_MASK, ADJACENT_MASKS, MILL_MASKS, CELL_MILLS, mask_to_ids
+from nmm.dtypes import NamedPlayer
+from nmm.positions import Position, NO_ACTION, TURN_ACTIONS, VICTIMS
+from nmm.actions import NUM_ACTIONS, ACTION_SOURCES, ACTION_TARGETS
+from nmm.boards import Board
+from nmm.bitboards import BitBoard
+from nmm.tablebase.storage import WDL
+from nmm.tablebase.probe import Tablebase
+
+
+class Bound(IntEnum):
+    """The kind of score stored in a transposition table entry.
+    EXACT: the score is exact (it fell inside the search window).
+    LOWER: the score is a lower bound (the search failed high, e.g. a beta cutoff).
+    UPPER: the score is an upper bound (the search failed low, no move raised alpha).
+    """
+    EXACT = 0
+    LOWER = 1
+    UPPER = 2
+
+
+class TTEntry(NamedTuple):
+    depth: int
+    bound: Bound
+    score: int
+    move: Optional[int]
+    generation: int
+
+
+class TranspositionTable:
+    """A fixed-size hash table of search results, keyed by 64-bit position keys (e.g. `board.zobrist`).
+
+    The table is two preallocated `uint64` NumPy arrays (keys and packed data) sized by a memory
+    budget in MB, so its memory never grows during a game. The entries are grouped in buckets of two:
+    - the first entry is depth-preferred: it is only replaced by a deeper (or as deep) search of any
+      position, by a new search of the same position, or when it was stored by an older search,
+    - the second entry is always-replace: it takes whatever the first entry refused.
+
+    The table can be shared across the moves of a game: call `new_search()` before every move, which
+    ages the entries of the previous searches, so they are replaced first (but still probed).
+
+    An entry packs into a single 64-bit word:
+    - bits  0-17: the best move + 1 (0 if there is no move), moves are integers in [0, 262142]
+      (e.g. the turns of `nmm.positions.encode_turn`),
+    - bits 18-33: the score + 32768, scores are integers in [-32768, 32767],
+    - bits 34-41: the depth + 1 (0 marks an empty entry), depths are integers in [0, 254],
+    - bits 42-43: the bound (see `Bound`),
+    - bits 44-49: the generation of the search that stored the entry.
+    The key of an entry is stored XOR its data, so a probe only finds an entry whose two words were
+    written by the same store: processes sharing a table (see `nmm.parallel.SharedTranspositionTable`)
+    need no lock, an entry torn by two concurrent stores is simply not found.
+    """
+    ENTRY_SIZE: int = 16  # bytes per entry (key + data)
+    MAX_DEPTH: int = 254
+    MIN_SCORE: int = -32768
+    MAX_SCORE: int = 32767
+    GENERATIONS: int = 64
+    MAX_MOVE: int = (1 << 18) - 2
+
+    def __init__(self, size_mb:float=16):
+        if size_mb <= 0:
+            raise ValueError(f"The size of the transposition table must be positive, not {size_mb} !")
+        buckets = max(1, int(size_mb * 2 ** 20) // (2 * self.ENTRY_SIZE))
+        self._buckets: int = 1 << (buckets.bit_length() - 1)  # a power of two, to index with a mask
+        self._keys, self._data = self._allocate(2 * self._buckets)
+        self._generation: int = 0
+
+    def _allocate(self, entries:int) -> Tuple[np.ndarray, np.ndarray]:
+        """The arrays of the keys (XOR the data) and of the data of the entries, zeroed."""
+        return np.zeros(entries, dtype=np.uint64), np.zeros(entries, dtype=np.uint64)
+
+    @property
+    def capacity(self) -> int:
+        """The number of entries the table can hold."""
+        return len(self._keys)
+
+    @property
+    def size_mb(self) -> float:
+        return (self._keys.nbytes + self._data.nbytes) / 2 ** 20
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def new_search(self):
+        """Start a new search (e.g. the next move of the game): the entries stored so far become old."""
+        self._generation = (self._generation + 1) % self.GENERATIONS
+
+    def clear(self):
+        self._keys.fill(0)
+        self._data.fill(0)
+        self._generation = 0
+
+    def probe(self, key:int) -> Optional[TTEntry]:
+        """Return the entry stored for the position `key`, or `None` if there is none."""
+        i = (key & (self._buckets - 1)) << 1
+        for slot in (i, i + 1):
+            data = int(self._data[slot])
+            if data and int(self._keys[slot]) ^ data == key:
+                return self._unpack(data)
+        return None
+
+    def store(self, key:int, depth:int, bound:Bound, score:int, move:Optional[int]=None):
+        """Store the result of a search of the position `key` to the given `depth`."""
+        if not 0 <= depth <= self.MAX_DEPTH:
+            raise ValueError(f"Depth out of range: {depth} !")
+        if not self.MIN_SCORE <= score <= self.MAX_SCORE:
+            raise ValueError(f"Score out of range: {score} !")
+        data = self._pack(depth, bound, score, move)
+        i = (key & (self._buckets - 1)) << 1
+        stored, preferred = int(self._keys[i]), int(self._data[i])
+        if not preferred or stored ^ preferred == key \
+           or (preferred >> 44) & 63 != self._generation \
+           or depth >= ((preferred >> 34) & 255) - 1:
+            if preferred and stored ^ preferred != key:  # keep the replaced entry in the second slot
+                self._keys[i + 1], self._data[i + 1] = stored, preferred
+            elif int(self._keys[i + 1]) ^ int(self._data[i + 1]) == key:  # do not keep a stale copy of it
+                self._data[i + 1] = 0
+            self._keys[i], self._data[i] = key ^ data, data
+        else:
+            self._keys[i + 1], self._data[i + 1] = key ^ data, data
+
+    def hashfull(self, sample:int=1000) -> int:
+        """The permille of (sampled) entries used by the current search."""
+        data = self._data[:sample]
+        used = (data != 0) & (((data >> np.uint64(44)) & np.uint64(63)) == self._generation)
+        return int(used.sum()) * 1000 // len(data)
+
+    def _pack(self, depth:int, bound:Bound, score:int, move:Optional[int]) -> int:
+        move = 0 if move is None else move + 1
+        if not 0 <= move <= self.MAX_MOVE + 1:
+            raise ValueError(f"Move out of range: {move - 1} !")
+        return move | (score + 32768) << 18 | (depth + 1) << 34 | int(bound) << 42 | self._generation << 44
+
+    @staticmethod
+    def _unpack(data:int) -> TTEntry:
+        move = data & 0x3FFFF
+        return TTEntry(depth=((data >> 34) & 255) - 1,
+                       bound=Bound((data >> 42) & 3),
+                       score=((data >> 18) & 0xFFFF) - 32768,
+                       move=move - 1 if move else None,
+                       generation=(data >> 44) & 63)
+
+    def __len__(self):
+        """The number of entries in use."""
+        return int(np.count_nonzero(self._data))
+
+    def __contains__(self, key:int):
+        return self.probe(key) is not None
+
+
+MATE: int = 30000
+MAX_PLY: int = 128
+INFINITY: int = MATE + 1
+PIECE: int = 100          # the value of a piece (on the board or to place)
+PENDING_KILL: int = 90    # a kill to make (that's almost a piece)
+MILL: int = 12            # a formed mill
+OPEN_MILL: int = 18       # two pieces of a mill with its third cell empty
+MOBILITY: int = 4         # a move (when neither side places nor flies)
+ASPIRATION: int = 35      # the half-width of the first aspiration window
+
+
+def evaluate(position:Position) -> int:
+    """A static evaluation of a position for the side to move: the pieces, the kills to make, the formed
+    and open mills, and the mobility of both sides once they move."""
+    side, other = position.side, 1 - position.side
+    mine, theirs = position.occupancy[side], position.occupancy[other]
+    score = PIECE * (position.pieces(side) - position.pieces(other)) + PENDING_KILL * position.pending.bit_count()
+    empty = FULL_MASK & ~(mine | theirs)
+    for mill in MILL_MASKS:
+        if mill & theirs == 0:
+            count = (mine & mill).bit_count()
+            score += MILL if count == 3 else OPEN_MILL if count == 2 else 0
+        elif mill & mine == 0:
+            count = (theirs & mill).bit_count()
+            score -= MILL if count == 3 else OPEN_MILL if count == 2 else 0
+    if not position.ready[0] and not position.ready[1] and mine.bit_count() > 3 and theirs.bit_count() > 3:
+        score += MOBILITY * (_mobility(mine, empty) - _mobility(theirs, empty))
+    return score
+
+
+def _mobility(mask:int, empty:int) -> int:
+    return sum((ADJACENT_MASKS[c] & empty).bit_count() for c in mask_to_ids(mask))
+
+
+# the mask of the source cell of every action (0 for a placement or a kill)
+_SOURCES: Tuple[int, ...] = tuple(0 if source < 0 else 1 << source for source in ACTION_SOURCES)
+# the masks of the two other cells of every mill through a cell
+_PAIRS: Tuple[Tuple[int, ...], ...] = tuple(tuple(MILL_MASKS[m] & ~(1 << c) for m in CELL_MILLS[c])
+                                            for c in range(NUM_CELLS))
+
+
+class MoveOrdering:
+    """The order in which the search tries the turns of a position, best first:
+    1. the best turn stored in the transposition table,
+    2. the turns that close a mill (first those killing a piece on a mill that the opponent can still close,
+       or has closed),
+    3. the placements and moves that block a mill of the opponent (its two other cells are the opponent's),
+    4. the killer turns: the last two quiet turns (not closing a mill) that made a cutoff at the same ply,
+    5. the other turns, by the history of their action: how often (and how deep) each placement or move
+       of each side made a cutoff.
+    Turns are scored with precomputed tables (the source and target cell of each action, and the pairs
+    of cells completing a mill through each cell), and the ties keep the order of the cells.
+    The killers and the history are kept across the iterations of a search, and aged across searches.
+    """
+    TT: int = 1 << 30
+    CLOSE: int = 1 << 26
+    BLOCK: int = 1 << 24
+    KILLERS: Tuple[int, int] = (1 << 23, 1 << 22)
+    HISTORY_MAX: int = 1 << 21
+
+    def __init__(self):
+        self.killers: List[List[Optional[int]]] = [[None, None] for _ in range(MAX_PLY + 1)]
+        self.history: List[List[int]] = [[0] * NUM_ACTIONS, [0] * NUM_ACTIONS]
+
+    def new_search(self):
+        """Forget the killers, and halve the history (the previous position is still a good guide)."""
+        for killers in self.killers:
+            killers[0] = killers[1] = None
+        for history in self.history:
+            history[:] = [value >> 1 for value in history]
+
+    def order(self, position:Position, turns:List[int], tt_turn:Optional[int], ply:int) -> List[int]:
+        """Sort the turns of the side to move in place (and return them)."""
+        mine, theirs = position.occupancy[position.side], position.occupancy[1 - position.side]
+        first, second = self.killers[ply]
+        history = self.history[position.side]
+
+        def score(turn:int) -> int:
+            if turn == tt_turn:
+                return self.TT
+            code, action = divmod(turn, TURN_ACTIONS)
+            if code:
+                moved = mine if action == NO_ACTION else mine & ~_SOURCES[action] | 1 << ACTION_TARGETS[action]
+                if any(pair & moved == 0 and pair & theirs for c in mask_to_ids(VICTIMS[code]) for pair in _PAIRS[c]):
+                    return self.CLOSE + self.BLOCK + history[action]
+                return self.CLOSE + history[action]
+            if any(theirs & pair == pair for pair in _PAIRS[ACTION_TARGETS[action]]):
+                return self.BLOCK + history[action]
+            if turn == first:
+                return self.KILLERS[0]
+            if turn == second:
+                return self.KILLERS[1]
+            return history[action]
+
+        turns.sort(key=score, reverse=True)
+        return turns
+
+    def cutoff(self, side:int, turn:int, depth:int, ply:int):
+        """Record the turn that made a beta cutoff (a quiet turn becomes a killer of its ply)."""
+        code, action = divmod(turn, TURN_ACTIONS)
+        history = self.history[side]
+        history[action] += depth * depth
+        if history[action] > self.HISTORY_MAX:
+            history[:] = [value >> 1 for value in history]
+        killers = self.killers[ply]
+        if not code and killers[0] != turn:
+            killers[0], killers[1] = turn, killers[0]
+
+
+class SearchResult(NamedTuple):
+    """The outcome of a search: the best turn (see `nmm.positions.encode_turn`), its score for the side
+    to move, the depth (in turns) of the last complete iteration, the principal variation, and the work done."""
+    turn: Optional[int]
+    score: int
+    depth: int
+    pv: List[int]
+    nodes: int
+    seconds: float
+
+    @property
+    def nps(self) -> float:
+        """Nodes searched per second."""
+        return self.nodes / self.seconds if self.seconds > 0 else 0.0
+
+    @property
+    def mate(self) -> bool:
+        return abs(self.score) >= MATE - MAX_PLY
+
+
+class _Timeout(Exception):
+    pass
+
+
+class AlphaBeta:
+    """An iterative deepening alpha-beta search (see the module doc).
+
+    The transposition table (and the tablebase, if any) are kept across searches, so an agent can
+    create one `AlphaBeta` and call `search` on every turn. `info` is called after every complete
+    iteration with its `SearchResult` (e.g. to print the depth, score and nodes per second).
+    `stop`, if set, is called along with the clock: the search stops when it returns True
+    (e.g. a flag set by another process).
+    """
+    CHECK_EVERY: int = 1024  # nodes between two looks at the clock
+
+    def __init__(self, transposition_table:Optional[TranspositionTable]=None, tablebase:Optional[Tablebase]=None,
+                 evaluation:Callable[[Position], int]=evaluate, info:Optional[Callable[[SearchResult], None]]=None):
+        self.transposition_table: TranspositionTable = TranspositionTable() if transposition_table is None \
+                                                       else transposition_table
+        self.tablebase: Optional[Tablebase] = tablebase
+        self.evaluation: Callable[[Position], int] = evaluation
+        self.info: Optional[Callable[[SearchResult], None]] = info
+        self.stop: Optional[Callable[[], bool]] = None
+        self.nodes: int = 0
+        self._deadline: float = float('inf')
+        self.ordering: MoveOrdering = MoveOrdering()
+        self._path: List[int] = []
+        self._pv: List[List[int]] = [[] for _ in range(MAX_PLY + 1)]
+
+    def search(self, position:Union[Position, Board, BitBoard], player:Optional[Union[NamedPlayer, str]]=None,
+               max_depth:int=MAX_PLY, time_limit:Optional[float]=None) -> SearchResult:
+        """Search a `Position`, or a `Board` / `BitBoard` with `player` to move, until `max_depth`
+        or until `time_limit` seconds have passed (whichever comes first)."""
+        position = root_position(position, player, max_depth)
+        start = time.perf_counter()
+        self._deadline = float('inf') if time_limit is None else start + time_limit
+        self.nodes = 0
+        self._path = []
+        self.transposition_table.new_search()
+        self.ordering.new_search()
+        turns = position.turns()
+        result = SearchResult(turns[0] if turns else None, self.evaluation(position), 0, turns[:1], 0, 0.0)
+        if len(turns) <= 1 or position.is_lost():
+            return result
+        score = result.score
+        for depth in self._depths(max_depth):
+            try:
+                score = self._aspiration(position, depth, score)
+            except _Timeout:
+                break
+            pv = self._pv[0][:]
+            result = SearchResult(pv[0], score, depth, pv, self.nodes, time.perf_counter() - start)
+            if self.info is not None:
+                self.info(result)
+            if result.mate or (time_limit is not None and result.seconds > time_limit / 2):
+                break  # the next iteration would most likely not complete in time
+        return result._replace(nodes=self.nodes, seconds=time.perf_counter() - start)
+
+    def search_window(self, position:Position, depth:int, alpha:int=-INFINITY, beta:int=INFINITY, ply:int=0,
+                      time_limit:Optional[float]=None) -> Optional[Tuple[int, List[int]]]:
+        """A single search of a position to a fixed depth, with the window `(alpha, beta)` and no iterative
+        deepening (e.g. a subtree of a parallel search). `ply` is the number of turns from the root
+        of the whole search to the position, for the mate scores.
+        Return the score and the principal variation, or `None` if the time ran out."""
+        self._deadline = float('inf') if time_limit is None else time.perf_counter() + time_limit
+        self.nodes = 0
+        self._path = []
+        try:
+            score = self._search(position, depth, alpha, beta, ply)
+        except _Timeout:
+            return None
+        return score, self._pv[ply][:]
+
+    def _depths(self, max_depth:int) -> Iterable[int]:
+        """The depths of the iterations."""
+        return range(1, max_depth + 1)
+
+    def _aspiration(self, position:Position, depth:int, previous:int) -> int:
+        if depth < 3 or abs(previous) >= MATE - MAX_PLY:
+            return self._search(position, depth, -INFINITY, INFINITY, 0)
+        width = ASPIRATION
+        alpha, beta = previous - width, previous + width
+        while True:
+            score = self._search(position, depth, alpha, beta, 0)
+            if score <= alpha:
+                alpha = max(-INFINITY, alpha - width)
+            elif score >= beta:
+                beta = min(INFINITY, beta + width)
+            else:
+                return score
+            width *= 2
+
+    def _search(self, position:Position, depth:int, alpha:int, beta:int, ply:int) -> int:
+        self.nodes += 1
+        if self.nodes % self.CHECK_EVERY == 0 and (time.perf_counter() > self._deadline
+                                                   or self.stop is not None and self.stop()):
+            raise _Timeout()
+        self._pv[ply] = []
+        if position.is_lost():
+            return -MATE + ply
+        key = position.key
+        if ply and key in self._path:  # a repetition
+            return 0
+        if self.tablebase is not None and ply and not position.pending and not position.ready[0] \
+           and not position.ready[1]:
+            found = self.tablebase.probe_masks(position.occupancy[position.side], position.occupancy[1 - position.side])
+            if found is not None:
+                return _tablebase_score(*found, ply)
+        if depth <= 0 or ply >= MAX_PLY:
+            return self.evaluation(position)
+        table = self.transposition_table
+        entry = table.probe(key)
+        best_turn = None
+        if entry is not None:
+            best_turn = entry.move
+            if ply and entry.depth >= depth:
+                score = _score_from_table(entry.score, ply)
+                if entry.bound == Bound.EXACT or (entry.bound == Bound.LOWER and score >= beta) \
+                   or (entry.bound == Bound.UPPER and score <= alpha):
+                    return score
+        turns = position.turns()
+        if not turns:
+            return -MATE + ply
+        self.ordering.order(position, turns, best_turn, ply)
+        side, original_alpha = position.side, alpha
+        best_score, best_turn = -INFINITY, None
+        self._path.append(key)
+        try:
+            for i, turn in enumerate(turns):
+                snapshot = position.play(turn)
+                try:
+                    if i == 0:
+                        score = -self._search(position, depth - 1, -beta, -alpha, ply + 1)
+                    else:
+                        score = -self._search(position, depth - 1, -alpha - 1, -alpha, ply + 1)
+                        if alpha < score < beta:
+                            score = -self._search(position, depth - 1, -beta, -alpha, ply + 1)
+                finally:
+                    position.undo(snapshot)
+                if score > best_score:
+                    best_score, best_turn = score, turn
+                    if score > alpha:
+                        alpha = score
+                        self._pv[ply] = [turn] + self._pv[ply + 1]
+                        if alpha >= beta:
+                            self.ordering.cutoff(side, turn, depth, ply)
+                            break
+        finally:
+            self._path.pop()
+        bound = Bound.LOWER if best_score >= beta else Bound.EXACT if best_score > original_alpha else Bound.UPPER
+        table.store(key, min(depth, table.MAX_DEPTH), bound, _score_to_table(best_score, ply), best_turn)
+        return best_score
+
+
+def root_position(position:Union[Position, Board, BitBoard], player:Optional[Union[NamedPlayer, str]],
+                  max_depth:int) -> Position:
+    """Check the arguments of a search, and return the position to search."""
+    if not 1 <= max_depth <= MAX_PLY:
+        raise ValueError(f"The depth must be between 1 and {MAX_PLY}, not {max_depth} !")
+    if isinstance(position, Position):
+        return position
+    if player is None:
+        raise ValueError("The player to move is needed to search a board !")
+    return Position.from_board(position, player)
+
+
+def _score_to_table(score:int, ply:int) -> int:
+    """Mate scores are stored relative to the position (plies to the mate from it), not to the root."""
+    if score >= MATE - MAX_PLY:
+        return score + ply
+    if score <= -MATE + MAX_PLY:
+        return score - ply
+    return score
+
+
+def _score_from_table(score:int, ply:int) -> int:
+    if score >= MATE - MAX_PLY:
+        return score - ply
+    if score <= -MATE + MAX_PLY:
+        return score + ply
+    return score
+
+
+def _tablebase_score(value:WDL, plies:Optional[int], ply:int) -> int:
+    if value == WDL.DRAW:
+        return 0
+    plies = min(MAX_PLY, ply + (plies or 0))  # without the depths, a won position is a won position
+    return MATE - plies if value == WDL.WIN else -MATE + plies
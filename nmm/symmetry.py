@@ -0,0 +1,185 @@
+"""The 16 symmetries of the nine men's morris board.
+
+Each square of the board has the 8 symmetries of a square (4 rotations, each optionally mirrored),
+applied to the vertical and horizontal positions `(y, z)` of the cells. All squares turn together,
+and the inner and outer squares can also be swapped (`x -> 2 - x`), which keeps the neighborhood of
+every cell and maps mills to mills. That's 16 transforms, numbered `8 * swap + dihedral`
+(transform 0 is the identity).
+
+Every transform is a permutation of the cell ids (and of the mill ids), precomputed at import.
+Masks of cells (e.g. `BitBoard.occupancy`) are permuted a byte at a time through lookup tables.
+
+The canonical form of a position is its image by the transform with the smallest
+`(first player's mask, second player's mask, utilized mills mask)`; equivalent positions
+have the same canonical form, whichever of them it is computed from.
+"""
+from typing import Tuple, Union
+
+from nmm.topology import CELLS, CELL_IDS, NUM_CELLS, MILL_CELLS, mask_to_ids
+from nmm.zobrist import CELL_KEYS, READY_KEYS, PENDING_KEYS
+from nmm.pieces import PieceState
+from nmm.boards import Board
+from nmm.bitboards import BitBoard
+
+
+Permutation = Tuple[int, ...]
+
+# The 8 symmetries of a square, on the offsets (u, v) = (y - 1, z - 1) from its center.
+_DIHEDRAL = (lambda u, v: (u, v), lambda u, v: (v, -u), lambda u, v: (-u, -v), lambda u, v: (-v, u),
+             lambda u, v: (u, -v), lambda u, v: (-u, v), lambda u, v: (v, u), lambda u, v: (-v, -u))
+
+
+def _build_permutations() -> Tuple[Permutation, ...]:
+    permutations = []
+    for swap in (False, True):
+        for dihedral in _DIHEDRAL:
+            permutation = []
+            for x, y, z in CELLS:
+                u, v = dihedral(y - 1, z - 1)
+                permutation.append(CELL_IDS[(2 - x if swap else x, u + 1, v + 1)])
+            permutations.append(tuple(permutation))
+    return tuple(permutations)
+
+
+def _build_mill_permutations(permutations:Tuple[Permutation, ...]) -> Tuple[Permutation, ...]:
+    ids = {mill: m for m, mill in enumerate(MILL_CELLS)}
+    return tuple(tuple(ids[tuple(sorted(permutation[c] for c in mill))] for mill in MILL_CELLS)
+                 for permutation in permutations)
+
+
+def _build_byte_tables(permutation:Permutation) -> Tuple[Tuple[int, ...], ...]:
+    """For every byte of a mask, the image of its 256 values (as masks)."""
+    tables = []
+    for offset in range(0, len(permutation), 8):
+        bits = permutation[offset:offset + 8]
+        tables.append(tuple(sum(1 << bits[i] for i in range(len(bits)) if b >> i & 1) for b in range(256)))
+    return tuple(tables)
+
+
+PERMUTATIONS: Tuple[Permutation, ...] = _build_permutations()
+NUM_TRANSFORMS: int = len(PERMUTATIONS)
+INVERSE: Tuple[int, ...] = tuple(
+    next(s for s, other in enumerate(PERMUTATIONS) if all(other[permutation[c]] == c for c in range(NUM_CELLS)))
+    for permutation in PERMUTATIONS)
+MILL_PERMUTATIONS: Tuple[Permutation, ...] = _build_mill_permutations(PERMUTATIONS)
+_CELL_TABLES = tuple(_build_byte_tables(permutation) for permutation in PERMUTATIONS)
+_MILL_TABLES = tuple(_build_byte_tables(permutation) for permutation in MILL_PERMUTATIONS)
+
+
+def transform_cell(cell:Union[int, Tuple[int, int, int]], t:int) -> Union[int, Tuple[int, int, int]]:
+    """Return the image of a cell (given as an id or as coordinates, and returned the same way) by the transform `t`."""
+    if isinstance(cell, int):
+        return PERMUTATIONS[t][cell]
+    return CELLS[PERMUTATIONS[t][CELL_IDS[tuple(cell)]]]
+
+
+def transform_mask(mask:int, t:int) -> int:
+    """Return the image of a mask of cells by the transform `t`."""
+    low, middle, high = _CELL_TABLES[t]
+    return low[mask & 255] | middle[(mask >> 8) & 255] | high[mask >> 16]
+
+
+def transform_mill_mask(mask:int, t:int) -> int:
+    """Return the image of a mask of mills by the transform `t`."""
+    low, high = _MILL_TABLES[t]
+    return low[mask & 255] | high[mask >> 8]
+
+
+def canonical_masks(mask0:int, mask1:int, mills:int=0) -> Tuple[int, int, int, int]:
+    """Return the canonical form of a position given as the masks of the cells of both players
+    (and the mask of the utilized mills), and the transform that produces it: `(mask0, mask1, mills, t)`."""
+    best, best_t = (mask0, mask1, mills), 0
+    for t in range(1, NUM_TRANSFORMS):
+        low, middle, high = _CELL_TABLES[t]
+        image = low[mask0 & 255] | middle[(mask0 >> 8) & 255] | high[mask0 >> 16]
+        if image > best[0]:
+            continue
+        candidate = (image, transform_mask(mask1, t), transform_mill_mask(mills, t))
+        if candidate < best:
+            best, best_t = candidate, t
+    return (*best, best_t)
+
+
+def transform_bitboard(bitboard:BitBoard, t:int) -> BitBoard:
+    """Return the image of a `BitBoard` by the transform `t` (as a new `BitBoard`)."""
+    image = bitboard.clone()
+    image._occupancy = [transform_mask(mask, t) for mask in bitboard._occupancy]
+    image._utilized = [transform_mill_mask(mask, t) for mask in bitboard._utilized]
+    return image
+
+
+def transform_board(board:Board, t:int) -> Board:
+    """Return the image of a `Board` by the transform `t` (as a new `Board`, holding the same pieces
+    in the image cells, with the images of the utilized mills still utilized)."""
+    image = Board(board.players)
+    permutation = PERMUTATIONS[t]
+    for cell in board.cells:
+        if cell.occupant is not None:
+            image.place(image.cells[permutation[cell.id]], cell.occupant)
+    for player in board.players:
+        for _ in board.get_my_dead_pieces(player):
+            piece = image._pieces[PieceState.READY][player].pop()
+            piece.state = PieceState.DEAD
+            image._pieces[PieceState.DEAD][player].append(piece)
+    for m, mill in enumerate(board._mills):
+        if mill is not None and mill.utilized:
+            image._mills[MILL_PERMUTATIONS[t][m]].utilized = True
+    image._hash = image._compute_hash()
+    return image
+
+
+def _utilized_mills(board:Union[Board, BitBoard]) -> int:
+    if isinstance(board, BitBoard):
+        return board._utilized[0] | board._utilized[1]
+    return sum(1 << m for m, mill in enumerate(board._mills) if mill is not None and mill.utilized)
+
+
+def _occupancy(board:Union[Board, BitBoard]) -> Tuple[int, int]:
+    if isinstance(board, BitBoard):
+        return tuple(board._occupancy)
+    masks = [0, 0]
+    for cell in board.cells:
+        if cell.occupant is not None:
+            masks[board._sides[cell.occupant]] |= 1 << cell.id
+    return tuple(masks)
+
+
+def _pending_mills(board:Union[Board, BitBoard]) -> int:
+    if isinstance(board, BitBoard):
+        return sum(board._formed_mills(p) & ~board._utilized[p] for p in (0, 1))
+    return sum(1 << m for m, mill in enumerate(board._mills) if mill is not None and not mill.utilized)
+
+
+def _ready_counts(board:Union[Board, BitBoard]) -> Tuple[int, int]:
+    if isinstance(board, BitBoard):
+        return tuple(board._ready)
+    return tuple(len(board.get_my_ready_pieces(player)) for player in board.players)
+
+
+def canonical_transform(board:Union[Board, BitBoard]) -> int:
+    """Return the transform that takes a `Board` or a `BitBoard` to its canonical form."""
+    return canonical_masks(*_occupancy(board), _utilized_mills(board))[-1]
+
+
+def canonicalize(board:Union[Board, BitBoard]) -> Tuple[Union[Board, BitBoard], int]:
+    """Return the canonical form of a `Board` or a `BitBoard` (as a new board of the same type),
+    and the transform that produces it (apply `INVERSE[t]` to map it back, e.g. to map a move found
+    on the canonical form to the original board)."""
+    t = canonical_transform(board)
+    if isinstance(board, BitBoard):
+        return transform_bitboard(board, t), t
+    return transform_board(board, t), t
+
+
+def canonical_key(board:Union[Board, BitBoard]) -> int:
+    """Return the Zobrist key (see `nmm.zobrist`) of the canonical form of a `Board` or a `BitBoard`,
+    without building it: equivalent positions share one key (e.g. one transposition table entry)."""
+    mask0, mask1, _, t = canonical_masks(*_occupancy(board), _utilized_mills(board))
+    key = 0
+    for side, (mask, ready) in enumerate(zip((mask0, mask1), _ready_counts(board))):
+        key ^= READY_KEYS[side][ready]
+        for c in mask_to_ids(mask):
+            key ^= CELL_KEYS[side][c]
+    for m in mask_to_ids(transform_mill_mask(_pending_mills(board), t)):
+        key ^= PENDING_KEYS[m]
+    return key
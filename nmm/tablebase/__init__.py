@@ -0,0 +1,8 @@
+"""Endgame tablebases of the moving and flying phases (see `nmm.tablebase.generate`).
+
+Build them with `python -m nmm.tablebase build`.
+"""
+from nmm.tablebase.storage import WDL, Codec, ClassFile, class_file, num_positions, tablebase_index, \
+                                  read_class, write_class, read_depths, write_depths
+from nmm.tablebase.generate import MIN_PIECES, solve_order, solve_group, predecessors, build
+from nmm.tablebase.probe import Tablebase, Probe
@@ -0,0 +1,38 @@
+import argparse
+
+from nmm.topology import PIECES_PER_PLAYER
+from nmm.tablebase.storage import BLOCK_SIZE, Codec
+from nmm.tablebase.generate import MIN_PIECES, CHUNK, build
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m nmm.tablebase',
+                                     description="Nine men's morris endgame tablebases.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    build_parser = commands.add_parser('build', help="Solve the moving and flying phases by retrograde analysis.")
+    build_parser.add_argument('-o', '--directory', default='tablebases',
+                              help="Where to write the class files (default: %(default)s).")
+    build_parser.add_argument('--max-pieces', type=int, default=PIECES_PER_PLAYER,
+                              help="Solve the classes with up to this many pieces per side (default: %(default)s).")
+    build_parser.add_argument('--chunk-size', type=int, default=CHUNK,
+                              help="The number of positions handled at once (default: %(default)s).")
+    build_parser.add_argument('--codec', choices=[codec.name.lower() for codec in Codec], default='zlib',
+                              help="The compression of the blocks of the files (default: %(default)s).")
+    build_parser.add_argument('--block-size', type=int, default=BLOCK_SIZE,
+                              help="The number of positions per compressed block (default: %(default)s).")
+    build_parser.add_argument('--dtm', action='store_true',
+                              help="Also write the depths of the positions (plies to the end of the game).")
+    build_parser.add_argument('--flying', action='store_true',
+                              help="Only solve the classes where a side has 3 pieces (3vN and Nv3), which is much faster.")
+    args = parser.parse_args(argv)
+    if args.command == 'build':
+        if not MIN_PIECES <= args.max_pieces <= PIECES_PER_PLAYER:
+            parser.error(f"--max-pieces must be between {MIN_PIECES} and {PIECES_PER_PLAYER}")
+        if args.block_size <= 0 or args.block_size % 4:
+            parser.error("--block-size must be a positive multiple of 4")
+        build(args.directory, args.max_pieces, args.chunk_size, Codec[args.codec.upper()], args.block_size,
+              args.dtm, args.flying)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+"""Retrograde analysis of the positions after the placement phase (moving and flying).
+
+The classes of positions are solved from the fewest pieces up. A turn is a move (or a flight, with three
+pieces), followed by a kill for every mill the move closes. The kills take the game to a class with one piece
+less (or two, if the move closes the two mills of its destination), already solved; every other move stays within
+the pair of classes `a v b` / `b v a`, which are solved together:
+- a side that cannot move has lost (in 0 plies), and so has a side left with two pieces after the kills,
+- going back from the positions lost in `n` plies, the positions one move before them are won in `n + 1` plies,
+- going back from the positions won in `n` plies, the positions whose moves are now all known to lose
+  are lost in `n + 1` plies (or later, if one of their kills loses later),
+- the positions left when there is nothing to go back from are draws.
+
+The positions are handled in NumPy arrays, one class (or chunk of a class) at a time: moves are generated
+for all the positions of a chunk by looping over the destination cells, and the positions one move before
+(the un-moves) are generated for whole batches of positions solved at the same depth.
+
+The classes where a side has 3 pieces get a shortcut: most of their positions are won at once by the
+side that can close a mill, whatever the other side does. Rather than going back from each of them,
+the moves of the flying side that leave (or open) such a mill to the other side are found with masks
+when the moves are counted (see `_threats`), which leaves the un-moves to the fewer other positions.
+These classes can also be solved on their own (`build(flying=True)`, see `solve_order`): they go through
+the same retrograde solver as the others, with this shortcut.
+"""
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+import time
+import numpy as np
+
+from nmm.topology import NUM_CELLS, FULL_MASK, ADJACENT_MASKS, MILL_MASKS, CELL_MILLS, PIECES_PER_PLAYER, mask_to_ids
+from nmm.ranking import PositionClass, unrank_array
+from nmm.tablebase.storage import WDL, BLOCK_SIZE, Codec, num_positions, tablebase_index, write_class, write_depths
+
+
+MIN_PIECES: int = 3  # a side with fewer pieces has lost
+UNKNOWN: int = 3
+NO_WIN: int = np.iinfo(np.uint16).max
+CHUNK: int = 1 << 18
+
+ClassKey = Tuple[int, int]  # (pieces of the side to move, pieces of the other side)
+Solution = Tuple[np.ndarray, np.ndarray]  # (values, depths in plies)
+
+
+def solve_order(max_pieces:int=PIECES_PER_PLAYER, flying:bool=False) -> List[List[ClassKey]]:
+    """The groups of classes to solve, in order: every group is a class `a v b` with its mirror `b v a`.
+    With `flying`, only the classes where a side has 3 pieces (and flies): they do not depend on the others,
+    since a kill takes `3 v b` to `b-1 v 3`, and `b v 3` to the end of the game."""
+    if flying:
+        return [[(MIN_PIECES, MIN_PIECES)]] + [[(MIN_PIECES, b), (b, MIN_PIECES)]
+                                               for b in range(MIN_PIECES + 1, max_pieces + 1)]
+    groups = []
+    for total in range(2 * MIN_PIECES, 2 * max_pieces + 1):
+        for a in range(MIN_PIECES, max_pieces + 1):
+            b = total - a
+            if a <= b <= max_pieces:
+                groups.append([(a, b)] if a == b else [(a, b), (b, a)])
+    return groups
+
+
+def _positions(a:int, b:int, indices:np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """The masks of the side to move and of the other side of the positions of a class."""
+    mover, other, _ = unrank_array(indices * 2, PositionClass(a, b))
+    return mover, other
+
+
+def _split_bits(rows:np.ndarray, bits:np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Expand every row into one row per bit set in its mask: returns `(rows, single-bit masks)`."""
+    all_rows, all_bits = [], []
+    rows, bits = rows[bits != 0], bits[bits != 0]
+    while rows.size:
+        low = bits & -bits
+        all_rows.append(rows)
+        all_bits.append(low)
+        bits = bits ^ low
+        left = bits != 0
+        rows, bits = rows[left], bits[left]
+    if not all_rows:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    return np.concatenate(all_rows), np.concatenate(all_bits)
+
+
+def _victim_sets(others:np.ndarray, count:int, kills:int) -> Iterator[np.ndarray]:
+    """Yield the masks of every choice of `kills` victims among the `count` pieces of every row of `others`."""
+    if kills == 0:
+        yield np.zeros_like(others)
+        return
+    left = others
+    for i in range(count - kills + 1):
+        victim = left & -left
+        left = left ^ victim
+        for rest in _victim_sets(left, count - i - 1, kills - 1):
+            yield victim | rest
+
+
+def _threats(masks:np.ndarray, flying:bool) -> np.ndarray:
+    """The cells where the side of `masks` would close a mill with one move if the cell was empty."""
+    threats = np.zeros_like(masks)
+    for m, mill in enumerate(MILL_MASKS):
+        for c in mask_to_ids(mill):
+            rest = mill & ~(1 << c)
+            sources = masks & ~rest if flying else masks & ~rest & ADJACENT_MASKS[c]
+            threats |= np.where(((masks & rest) == rest) & (sources != 0), 1 << c, 0)
+    return threats
+
+
+def predecessors(a:int, b:int, indices:np.ndarray) -> np.ndarray:
+    """The positions (in the class `b v a`) one move before the given positions of the class `a v b`,
+    through moves that do not close a mill (the positions after a kill are in another class)."""
+    mover, other = _positions(a, b, indices)
+    empty = FULL_MASK & ~(mover | other)
+    movers, others = [], []
+    for dst in range(NUM_CELLS):
+        moved = (other >> dst) & 1 == 1
+        for m in CELL_MILLS[dst]:
+            moved &= (other & MILL_MASKS[m]) != MILL_MASKS[m]
+        rows = np.nonzero(moved)[0]
+        sources = empty[rows] if b == MIN_PIECES else empty[rows] & ADJACENT_MASKS[dst]
+        rows, sources = _split_bits(rows, sources)
+        movers.append(other[rows] ^ (1 << dst) ^ sources)
+        others.append(mover[rows])
+    return tablebase_index(np.concatenate(movers), np.concatenate(others))
+
+
+class _ClassState:
+    """The arrays of a class being solved."""
+
+    def __init__(self, a:int, b:int, size:Optional[int]=None):
+        self.a, self.b = a, b
+        size = num_positions(a, b) if size is None else size
+        self.value: np.ndarray = np.full(size, UNKNOWN, dtype=np.uint8)
+        self.depth: np.ndarray = np.zeros(size, dtype=np.uint16)
+        self.count: np.ndarray = np.zeros(size, dtype=np.int16)          # moves (without kill) not known to lose
+        self.win: np.ndarray = np.full(size, NO_WIN, dtype=np.uint16)    # the quickest win through a kill
+        self.floor: np.ndarray = np.zeros(size, dtype=np.uint16)         # the slowest loss through a kill
+        self.blocked: np.ndarray = np.zeros(size, dtype=bool)            # a kill leads to a draw
+
+    def initialize(self, solved:Dict[ClassKey, Solution], chunk:int):
+        """Count the moves of every position, and look up the positions after every move that kills."""
+        for start in range(0, len(self.value), chunk):
+            indices = np.arange(start, min(start + chunk, len(self.value)), dtype=np.int64)
+            self.initialize_rows(indices, *_positions(self.a, self.b, indices), solved)
+
+    def initialize_rows(self, rows:np.ndarray, mover:np.ndarray, other:np.ndarray, solved:Dict[ClassKey, Solution]):
+        """Count the moves of the positions given by their masks (stored at `rows`), and look up the positions
+        after every move that kills, with one kill per mill closed by the move.
+        When the side to move flies, the moves after which the other side can close a mill (and win,
+        leaving two pieces) are known to lose: they are not counted (see `_threats`)."""
+        a, b = self.a, self.b
+        empty = FULL_MASK & ~(mover | other)
+        count = np.zeros(len(rows), dtype=np.int64)
+        lost = np.zeros(len(rows), dtype=np.int64)
+        if a == MIN_PIECES:
+            threats = _threats(other, b == MIN_PIECES)
+            open_threats = threats & empty
+        kills: Dict[int, Tuple[list, list]] = {1: ([], []), 2: ([], [])}  # the moves closing one mill, or two
+        killing = np.zeros(len(rows), dtype=bool)  # a move leaves the other side with two pieces
+        for dst in range(NUM_CELLS):
+            sources = mover if a == MIN_PIECES else mover & ADJACENT_MASKS[dst]
+            sources = sources & -((empty >> dst) & 1)  # no sources if the destination is not empty
+            closing = np.zeros(len(rows), dtype=np.int64)        # the sources that close a mill
+            double = np.full(len(rows), FULL_MASK, dtype=np.int64)  # the sources that close both mills
+            for m in CELL_MILLS[dst]:
+                rest = MILL_MASKS[m] & ~(1 << dst)
+                closes = np.where((mover & rest) == rest, FULL_MASK & ~MILL_MASKS[m], 0)
+                closing |= closes
+                double &= closes
+            keep = sources & ~closing
+            count += np.bitwise_count(keep)
+            if a == MIN_PIECES:  # a threat is left open, or opened by the source
+                lost += np.bitwise_count(np.where(open_threats & ~(1 << dst) != 0, sources, sources & threats) & keep)
+            double &= sources
+            for closed, closers in ((1, sources & closing & ~double), (2, double)):
+                if b - closed < MIN_PIECES:
+                    killing |= closers != 0
+                    continue
+                moves, closers = _split_bits(np.arange(len(rows)), closers)
+                kills[closed][0].append(moves)
+                kills[closed][1].append(mover[moves] ^ closers ^ (1 << dst))
+        self.count[rows] = count - lost
+        self.floor[rows] = np.where(lost > 0, 2, 0)
+        self.win[rows[killing]] = 1
+        for closed, (moves, movers) in kills.items():
+            moves = np.concatenate(moves) if moves else np.zeros(0, dtype=np.int64)
+            if moves.size:
+                self._look_up_kills(rows[moves], np.concatenate(movers), other[moves], solved[(b - closed, a)], closed)
+
+    def _look_up_kills(self, positions:np.ndarray, movers:np.ndarray, others:np.ndarray, solution:Solution,
+                       kills:int):
+        values, depths = solution
+        for victims in _victim_sets(others, self.b, kills):
+            children = tablebase_index(others ^ victims, movers)  # the other side is to move
+            value, depth = values[children], depths[children].astype(np.int64) + 1
+            lost = value == WDL.LOSS
+            np.minimum.at(self.win, positions[lost], depth[lost].astype(np.uint16))
+            won = value == WDL.WIN
+            np.maximum.at(self.floor, positions[won], depth[won].astype(np.uint16))
+            self.blocked[positions[value == WDL.DRAW]] = True
+
+    def initial_candidates(self) -> List[Tuple[np.ndarray, np.ndarray, WDL]]:
+        wins = np.nonzero(self.win != NO_WIN)[0]
+        losses = np.nonzero((self.count == 0) & ~self.blocked & (self.win == NO_WIN))[0]
+        return [(wins, self.win[wins], WDL.WIN), (losses, self.floor[losses], WDL.LOSS)]
+
+
+def _push(buckets:Dict[int, list], key:ClassKey, positions:np.ndarray, depths:np.ndarray, value:WDL):
+    if not positions.size:
+        return
+    for depth in np.unique(depths).tolist():
+        buckets.setdefault(depth, []).append((key, positions[depths == depth], value))
+
+
+def solve_group(group:List[ClassKey], solved:Dict[ClassKey, Solution], chunk:int=CHUNK) -> Dict[ClassKey, Solution]:
+    """Solve a class with its mirror (see `solve_order`), given the solutions of the classes with one piece less."""
+    states = {key: _ClassState(*key) for key in group}
+    buckets: Dict[int, list] = {}
+    for key, state in states.items():
+        state.initialize(solved, chunk)
+        for positions, depths, value in state.initial_candidates():
+            _push(buckets, key, positions, depths, value)
+    depth = 0
+    while buckets:
+        for key, positions, value in buckets.pop(depth, []):
+            state = states[key]
+            fresh = np.zeros(len(state.value), dtype=bool)  # the positions not solved yet (without duplicates)
+            fresh[positions] = True
+            positions = np.flatnonzero(fresh & (state.value == UNKNOWN))
+            state.value[positions] = value
+            state.depth[positions] = depth
+            parent = states[(state.b, state.a)]
+            if value == WDL.WIN and state.b == MIN_PIECES:
+                positions = positions[state.win[positions] != 1]  # already left out of the counts of the parents
+            for start in range(0, len(positions), chunk):
+                before = predecessors(state.a, state.b, positions[start:start + chunk])
+                if value == WDL.LOSS:
+                    _push(buckets, (parent.a, parent.b), before, np.full(len(before), depth + 1), WDL.WIN)
+                    continue
+                hits = np.bincount(before, minlength=len(parent.count))
+                parent.count -= hits.astype(np.int16)
+                lost = np.flatnonzero((hits > 0) & (parent.count == 0) & (parent.value == UNKNOWN)
+                                      & ~parent.blocked & (parent.win == NO_WIN))
+                _push(buckets, (parent.a, parent.b), lost,
+                      np.maximum(depth + 1, parent.floor[lost].astype(np.int64)), WDL.LOSS)
+        depth += 1
+    solutions = {}
+    for key, state in states.items():
+        state.value[state.value == UNKNOWN] = WDL.DRAW
+        solutions[key] = (state.value, state.depth)
+    return solutions
+
+
+def build(directory:str, max_pieces:int=PIECES_PER_PLAYER, chunk:int=CHUNK, codec:Codec=Codec.ZLIB,
+          block_size:int=BLOCK_SIZE, depths:bool=False, flying:bool=False,
+          log:Callable[[str], None]=print) -> Dict[ClassKey, Tuple[int, int, int]]:
+    """Solve all the classes with up to `max_pieces` pieces per side (only those where a side flies
+    if `flying`, see `solve_order`) and write them to `directory` (with the depths of the positions if `depths`).
+    Returns the number of losses, draws and wins of every class."""
+    if not MIN_PIECES <= max_pieces <= PIECES_PER_PLAYER:
+        raise ValueError(f"The number of pieces must be between {MIN_PIECES} and {PIECES_PER_PLAYER}, not {max_pieces} !")
+    solved: Dict[ClassKey, Solution] = {}
+    summary = {}
+    for group in solve_order(max_pieces, flying):
+        start = time.time()
+        solutions = solve_group(group, solved, chunk)
+        for (a, b), (values, plies) in solutions.items():
+            write_class(directory, a, b, values, codec, block_size)
+            if depths:
+                write_depths(directory, a, b, plies, codec, block_size)
+            summary[(a, b)] = tuple(np.bincount(values, minlength=3)[:3].tolist())
+            loss, draw, win = summary[(a, b)]
+            log(f"{a}v{b}: {len(values)} positions, {win} wins, {draw} draws, {loss} losses "
+                f"({time.time() - start:.1f}s)")
+        total = sum(group[0])  # the kills of the next groups lead to this total or to the two previous ones
+        solved = {key: solution for key, solution in solved.items() if sum(key) >= total - 2}
+        solved.update(solutions)
+    return summary
@@ -0,0 +1,189 @@
+"""Probing the tablebase files during a game (see `Tablebase`)."""
+from typing import Any, Dict, List, Optional, Tuple, Union
+from collections import OrderedDict
+import os
+
+from nmm.topology import CellIndex, PIECES_PER_PLAYER
+from nmm.dtypes import NamedPlayer, PlayerState
+from nmm.cells import Cell
+from nmm.ranking import rank
+from nmm.boards import Board
+from nmm.bitboards import BitBoard
+from nmm.actions import KILL, decode_action
+from nmm.positions import Position, NO_ACTION, decode_turn
+from nmm.tablebase.storage import WDL, ClassFile, class_file, num_positions
+from nmm.tablebase.generate import MIN_PIECES, ClassKey
+
+
+Probe = Tuple[WDL, Optional[int]]  # (value for the side to move, plies to the end of the game if stored)
+
+
+class Tablebase:
+    """Read access to the tablebase files of a directory (as written by `python -m nmm.tablebase build`).
+
+    The class files are opened on first use and memory-mapped (read-only), so all the processes probing
+    the same files share one copy of them in the page cache. A probe decompresses the block holding
+    its value (see `nmm.tablebase.storage`), and keeps it in a least-recently-used cache of blocks
+    bounded to `cache_mb` MB, so the probes of the same region of a class only index into a cached block.
+    A missing class file is not an error: its positions are just not probed.
+
+    `probe` looks up a `Board` or a `BitBoard` with `player` to move; `probe_masks` looks up
+    a position given by the masks of the cells of the side to move and of the other side,
+    which is what a search working on bitboards calls at its leaves.
+    Both return `(value, depth)`, the depth being the number of plies to the end of the game if the
+    class was built with its depths (`build --dtm`), `None` otherwise, or `None` for the positions
+    the tablebase does not hold (pieces still to place, a kill to make, or a class that was not built).
+    With the depths, `best_move` wins in the fewest plies, and loses in the most.
+    """
+
+    def __init__(self, directory:str, cache_mb:float=64):
+        if not os.path.isdir(directory):
+            raise ValueError(f"Tablebase directory not found: {directory} !")
+        if cache_mb < 0:
+            raise ValueError(f"The size of the block cache cannot be negative: {cache_mb} !")
+        self.directory: str = directory
+        self.cache_size: int = int(cache_mb * 2 ** 20)  # bytes
+        self._files: Dict[Tuple[int, int, str], Optional[ClassFile]] = {}
+        self._cache: OrderedDict[Tuple[int, int, str, int], bytes] = OrderedDict()
+        self._cached: int = 0  # bytes in the cache
+
+    @property
+    def classes(self) -> List[ClassKey]:
+        """The classes found in the directory."""
+        pieces = range(MIN_PIECES, PIECES_PER_PLAYER + 1)
+        return [(a, b) for a in pieces for b in pieces if os.path.exists(class_file(self.directory, a, b))]
+
+    def _open(self, a:int, b:int, extension:str) -> Optional[ClassFile]:
+        if (a, b, extension) in self._files:
+            return self._files[(a, b, extension)]
+        path = class_file(self.directory, a, b, extension)
+        data = None
+        if os.path.exists(path):
+            data = ClassFile(path)
+            if data.header[:3] != (a, b, num_positions(a, b)):
+                data.close()
+                raise ValueError(f"The header of {path} does not match class {a}v{b} !")
+        self._files[(a, b, extension)] = data
+        return data
+
+    def _read(self, a:int, b:int, extension:str, data:ClassFile, index:int) -> int:
+        i, position = data.locate(index)
+        key = (a, b, extension, i)
+        block = self._cache.get(key)
+        if block is not None:
+            self._cache.move_to_end(key)
+            return data.extract(block, position)
+        block = data.block(i)
+        self._cache[key] = block
+        self._cached += len(block)
+        while self._cached > self.cache_size:
+            self._cached -= len(self._cache.popitem(last=False)[1])
+        return data.extract(block, position)
+
+    def probe_masks(self, mover:int, other:int) -> Optional[Probe]:
+        """Probe the position given by the masks of the cells of the side to move and of the other side."""
+        a, b = mover.bit_count(), other.bit_count()
+        if not (MIN_PIECES <= a <= PIECES_PER_PLAYER and MIN_PIECES <= b <= PIECES_PER_PLAYER):
+            return None
+        data = self._open(a, b, 'wdl')
+        if data is None:
+            return None
+        index = rank(mover, other, 0) >> 1
+        depths = self._open(a, b, 'dtm')
+        return (WDL(self._read(a, b, 'wdl', data, index)),
+                None if depths is None else self._read(a, b, 'dtm', depths, index))
+
+    def probe(self, board:Union[Board, BitBoard], player:Union[NamedPlayer, str]) -> Optional[Probe]:
+        """Probe the position of a board with `player` to move."""
+        if board.get_player_state(player) not in (PlayerState.MOVING, PlayerState.FLYING) \
+           or board.get_player_state(board.get_opponent(player)) not in (PlayerState.MOVING, PlayerState.FLYING):
+            return None
+        return self.probe_masks(*_masks(board, player))
+
+    def best_move(self, board:Union[Board, BitBoard], player:Union[NamedPlayer, str]) \
+            -> Optional[Tuple[Union[Cell, CellIndex], Union[Cell, CellIndex]]]:
+        """Return the best move (or flight) of `player` as `(source, destination)` cells of the board,
+        or `None` if one of the positions it leads to is not in the tablebase (and no move is known to win).
+        A move that closes mills is valued with the best kills after it, one per mill (see `best_kill`)."""
+        if board.get_player_state(player) not in (PlayerState.MOVING, PlayerState.FLYING):
+            return None
+        action, _ = _best({action: _best(kills)[1] for action, kills in self._turns(board, player).items()})
+        return None if action is None else decode_action(board, action)
+
+    def best_kill(self, board:Union[Board, BitBoard], player:Union[NamedPlayer, str]) -> Optional[Union[Cell, CellIndex]]:
+        """Return the best opponent cell for `player` to kill (once all pieces are placed),
+        or `None` if one of the positions it leads to is not in the tablebase (and no kill is known to win).
+        When the turn closed two mills, the two kills are valued together: the first of the best pair
+        is returned, and the second is the best kill left (as found again by the next call)."""
+        if board.get_player_state(player) != PlayerState.KILLING or not board.all_placed:
+            return None
+        kills = self._turns(board, player).get(NO_ACTION, {})
+        victims, _ = _best(kills)
+        return None if victims is None else decode_action(board, KILL + (victims & -victims).bit_length() - 1)
+
+    def _turns(self, board:Union[Board, BitBoard], player:Union[NamedPlayer, str]) -> Dict[int, Dict[int, Optional[Probe]]]:
+        """The scores of the turns of `player`, by action (`NO_ACTION` for the kills left of a turn) and victims."""
+        position = Position.from_board(board, player)
+        turns: Dict[int, Dict[int, Optional[Probe]]] = {}
+        for turn in position.turns():
+            action, victims = decode_turn(turn)
+            child = position.copy()
+            child.play(turn)
+            turns.setdefault(action, {})[victims] = self._score(child.occupancy[child.side], child.occupancy[1 - child.side])
+        return turns
+
+    def _score(self, mover:int, other:int) -> Optional[Probe]:
+        """The value, for the side that just played, of the position with `mover` to move."""
+        if mover.bit_count() < MIN_PIECES:
+            return WDL.WIN, 1
+        found = self.probe_masks(mover, other)
+        if found is None:
+            return None
+        value, plies = found
+        return WDL(2 - value), None if plies is None else plies + 1
+
+    def close(self):
+        for data in self._files.values():
+            if data is not None:
+                data.close()
+        self._files.clear()
+        self._cache.clear()
+        self._cached = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def _order(score:Probe) -> Tuple[int, int]:
+    """Order the results of the moves: the quickest win first, the slowest loss last."""
+    value, plies = score
+    plies = 0 if plies is None else plies
+    return int(value), -plies if value == WDL.WIN else plies
+
+
+def _best(scores:Dict[Any, Optional[Probe]]) -> Tuple[Any, Optional[Probe]]:
+    """The best of the choices, with its score, or `(None, None)` if there is no choice, or if some of them
+    could not be probed and none of the others is known to win."""
+    known = {choice: score for choice, score in scores.items() if score is not None}
+    if not known:
+        return None, None
+    choice = max(known, key=lambda c: _order(known[c]))
+    if len(known) < len(scores) and known[choice][0] != WDL.WIN:
+        return None, None
+    return choice, known[choice]
+
+
+def _masks(board:Union[Board, BitBoard], player:Union[NamedPlayer, str]) -> Tuple[int, int]:
+    """The masks of the cells of `player` and of its opponent."""
+    if isinstance(board, BitBoard):
+        side = board.check_player(player)
+        return board.occupancy[side], board.occupancy[1 - side]
+    side = board._sides[board.check_player(player)]
+    masks = [0, 0]
+    for cell in board.cells:
+        if cell.occupant is not None:
+            masks[board._sides[cell.occupant]] |= 1 << cell.id
+    return masks[side], masks[1 - side]
@@ -0,0 +1,197 @@
+"""The tablebase files: one file per class of positions, holding one value per position.
+
+A file `<a>v<b>.wdl` holds the class of the positions where the side to move has `a` pieces on the
+board and the other side `b` pieces (all pieces placed), in the order of `tablebase_index`, that's the
+rank (see `nmm.ranking`) of the position seen from the side to move, divided by two (the side to move
+is always the first side of the rank). An optional file `<a>v<b>.dtm` holds the depths of the same
+positions: the number of plies to the end of the game (to win, or to lose with the longest defence),
+0 for the draws.
+
+The values are packed at 2 bits per position (4 positions per byte, the first one in the lowest bits),
+the depths at 8 bits, or 16 bits (little-endian) when a depth of the class does not fit in a byte.
+The packed bytes are compressed in blocks of a fixed number of positions, so reading a value only
+decompresses its block. A file is made of:
+- a 24-bytes header: magic, format version, `a`, `b`, number of positions, codec (see `Codec`),
+  bits per position and number of positions per block,
+- the block index: the offsets of the blocks (and of the end of the last block) from the end
+  of the index, as `uint64`,
+- the compressed blocks.
+"""
+from typing import List, NamedTuple, Tuple
+from enum import IntEnum
+import lzma
+import mmap
+import os
+import struct
+import zlib
+import numpy as np
+
+from nmm.ranking import PositionClass, class_size, rank_array
+
+
+MAGIC: bytes = b'NMMTB'
+VERSION: int = 3
+HEADER: struct.Struct = struct.Struct('<5sBBBQBBxxI')
+BLOCK_SIZE: int = 1 << 16  # positions per block (16 KB once packed)
+
+
+class WDL(IntEnum):
+    """The value of a position for the side to move."""
+    LOSS = 0
+    DRAW = 1
+    WIN = 2
+
+
+class Codec(IntEnum):
+    """The compression of the blocks: `zlib` decompresses faster, `lzma` compresses better."""
+    ZLIB = 0
+    LZMA = 1
+
+
+_COMPRESS = {Codec.ZLIB: lambda data: zlib.compress(data, 9), Codec.LZMA: lzma.compress}
+_DECOMPRESS = {Codec.ZLIB: zlib.decompress, Codec.LZMA: lzma.decompress}
+
+
+class ClassHeader(NamedTuple):
+    a: int
+    b: int
+    positions: int
+    codec: Codec
+    bits: int
+    block_size: int
+
+    @property
+    def blocks(self) -> int:
+        return -(-self.positions // self.block_size)
+
+
+def class_file(directory:str, a:int, b:int, extension:str='wdl') -> str:
+    """The path of the values (`wdl`) or of the depths (`dtm`) of a class."""
+    return os.path.join(directory, f"{a}v{b}.{extension}")
+
+
+def num_positions(a:int, b:int) -> int:
+    """The number of positions (with the side to move having `a` pieces) stored in the file of a class."""
+    return class_size(PositionClass(a, b)) // 2
+
+
+def tablebase_index(mover:np.ndarray, other:np.ndarray) -> np.ndarray:
+    """The indices in a class file of the positions given by the masks of the side to move and of the other side."""
+    return rank_array(mover, other, 0) >> 1
+
+
+def pack(values:np.ndarray, bits:int=2) -> np.ndarray:
+    """Pack values at 2 bits per value (the array is padded with zeros to a multiple of 4),
+    or at 8 or 16 bits per value."""
+    if bits in (8, 16):
+        return np.frombuffer(np.asarray(values, dtype=f'<u{bits // 8}').tobytes(), dtype=np.uint8)
+    values = np.asarray(values, dtype=np.uint8)
+    padded = np.zeros(-(-len(values) // 4) * 4, dtype=np.uint8)
+    padded[:len(values)] = values
+    padded = padded.reshape(-1, 4)
+    return padded[:, 0] | padded[:, 1] << 2 | padded[:, 2] << 4 | padded[:, 3] << 6
+
+
+def unpack(packed:np.ndarray, count:int, bits:int=2) -> np.ndarray:
+    """The first `count` values of a packed array (see `pack`)."""
+    packed = np.frombuffer(packed, dtype=np.uint8) if isinstance(packed, bytes) else packed
+    if bits in (8, 16):
+        return packed.view(f'<u{bits // 8}')[:count].astype(np.uint8 if bits == 8 else np.uint16)
+    return ((packed[:, None] >> np.array([0, 2, 4, 6], dtype=np.uint8)) & 3).reshape(-1)[:count]
+
+
+def _write(path:str, a:int, b:int, values:np.ndarray, bits:int, codec:Codec, block_size:int):
+    if len(values) != num_positions(a, b):
+        raise ValueError(f"Expected {num_positions(a, b)} values for class {a}v{b}, got {len(values)} !")
+    if block_size <= 0 or block_size % 4:
+        raise ValueError(f"The block size must be a positive multiple of 4, not {block_size} !")
+    packed = pack(values, bits)
+    step = block_size * bits // 8
+    blocks = [_COMPRESS[codec](packed[start:start + step].tobytes()) for start in range(0, len(packed), step)]
+    offsets = np.cumsum([0] + [len(block) for block in blocks], dtype=np.uint64)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, VERSION, a, b, len(values), codec, bits, block_size))
+        file.write(offsets.tobytes())
+        for block in blocks:
+            file.write(block)
+
+
+def write_class(directory:str, a:int, b:int, values:np.ndarray, codec:Codec=Codec.ZLIB, block_size:int=BLOCK_SIZE):
+    _write(class_file(directory, a, b), a, b, values, 2, codec, block_size)
+
+
+def write_depths(directory:str, a:int, b:int, depths:np.ndarray, codec:Codec=Codec.ZLIB, block_size:int=BLOCK_SIZE):
+    """Write the depths of a class, at 8 bits per position if they all fit in a byte, 16 bits otherwise."""
+    bits = 8 if len(depths) == 0 or int(np.max(depths)) <= 0xFF else 16
+    _write(class_file(directory, a, b, 'dtm'), a, b, depths, bits, codec, block_size)
+
+
+def _parse_header(data:bytes, path:str) -> ClassHeader:
+    magic, version, a, b, positions, codec, bits, block_size = HEADER.unpack(data[:HEADER.size])
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"Not a tablebase file (or an unsupported version): {path} !")
+    return ClassHeader(a, b, positions, Codec(codec), bits, block_size)
+
+
+def read_header(path:str) -> ClassHeader:
+    """Check the header of a class file and return it."""
+    with open(path, 'rb') as file:
+        return _parse_header(file.read(HEADER.size), path)
+
+
+class ClassFile:
+    """A class file opened for reading: the file is memory-mapped (read-only), and only the blocks
+    that are read are decompressed (see `nmm.tablebase.probe.Tablebase` for a cache of blocks)."""
+
+    def __init__(self, path:str):
+        with open(path, 'rb') as file:
+            self._data: mmap.mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.header: ClassHeader = _parse_header(self._data, path)
+        start = HEADER.size + 8 * (self.header.blocks + 1)
+        self._offsets: List[int] = [start + offset for offset in
+                                    np.frombuffer(self._data, dtype=np.uint64, count=self.header.blocks + 1,
+                                                  offset=HEADER.size).tolist()]
+
+    def block(self, i:int) -> bytes:
+        """The packed values of the i-th block (see `pack`)."""
+        return _DECOMPRESS[self.header.codec](self._data[self._offsets[i]:self._offsets[i + 1]])
+
+    def locate(self, index:int) -> Tuple[int, int]:
+        """Where the value of a position is: `(block, position in the block)`."""
+        return divmod(index, self.header.block_size)
+
+    def extract(self, block:bytes, position:int) -> int:
+        """The value at a position of a block (see `block`)."""
+        bits = self.header.bits
+        if bits == 2:
+            return block[position >> 2] >> ((position & 3) << 1) & 3
+        if bits == 8:
+            return block[position]
+        return block[2 * position] | block[2 * position + 1] << 8
+
+    def read(self) -> np.ndarray:
+        """All the values of the class."""
+        packed = b''.join(self.block(i) for i in range(self.header.blocks))
+        return unpack(packed, self.header.positions, self.header.bits)
+
+    def close(self):
+        self._data.close()
+
+
+def _read(path:str) -> np.ndarray:
+    data = ClassFile(path)
+    try:
+        return data.read()
+    finally:
+        data.close()
+
+
+def read_class(directory:str, a:int, b:int) -> np.ndarray:
+    """Load all the values of a class."""
+    return _read(class_file(directory, a, b))
+
+
+def read_depths(directory:str, a:int, b:int) -> np.ndarray:
+    """Load all the depths of a class."""
+    return _read(class_file(directory, a, b, 'dtm'))
@@ -0,0 +1,77 @@
+"""The topology of the nine men's morris board, computed once at import and shared by all boards.
+
+Every valid cell has an integer id (0..23), following the order of the cell coordinates
+`(x, y, z)`. The tables below map coordinates to ids (and back), and list, for every cell,
+its neighbors and the mills passing through it. Sets of cells are also available as masks,
+where bit `i` stands for the cell of id `i`.
+"""
+from typing import Dict, Tuple
+from itertools import product
+
+
+CellIndex = Tuple[int, int, int]
+
+PIECES_PER_PLAYER: int = 9
+
+NEIGHBOR_KEYS: Tuple[str, ...] = ('right', 'left', 'upper', 'lower', 'outer', 'inner')
+_OFFSETS: Dict[str, CellIndex] = dict(right=(0, 0, 1), left=(0, 0, -1), upper=(0, -1, 0),
+                                      lower=(0, 1, 0), outer=(-1, 0, 0), inner=(1, 0, 0))
+
+
+def _build_cells() -> Tuple[CellIndex, ...]:
+    """List the coordinates of the 24 valid cells (the middle of every square is not a cell)."""
+    return tuple((x, y, z) for x, y, z in product([0, 1, 2], repeat=3) if (y, z) != (1, 1))
+
+
+def _build_neighbors(cells:Tuple[CellIndex, ...], ids:Dict[CellIndex, int]) -> Tuple[Tuple[int, ...], ...]:
+    """For every cell, the ids of its six neighbors (in the order of `NEIGHBOR_KEYS`), or -1 where there is none.
+    Only the cells in the middle of a side are connected to the other squares (outer/inner)."""
+    neighbors = []
+    for x, y, z in cells:
+        row = []
+        for key in NEIGHBOR_KEYS:
+            dx, dy, dz = _OFFSETS[key]
+            neighbor = (x + dx, y + dy, z + dz)
+            if key in ('outer', 'inner') and 1 not in (y, z):
+                neighbor = None
+            row.append(ids.get(neighbor, -1))
+        neighbors.append(tuple(row))
+    return tuple(neighbors)
+
+
+def _build_mills(ids:Dict[CellIndex, int]) -> Tuple[Tuple[int, int, int], ...]:
+    """List the ids of the cells of the 16 mills (each sorted by id, that's by coordinates)."""
+    mills = []
+    for x in range(3):
+        for y in (0, 2):
+            mills.append([(x, y, z) for z in range(3)])   # top/bottom rows of a square
+        for z in (0, 2):
+            mills.append([(x, y, z) for y in range(3)])   # left/right columns of a square
+    for y, z in [(0, 1), (2, 1), (1, 0), (1, 2)]:
+        mills.append([(x, y, z) for x in range(3)])       # lines crossing the squares
+    return tuple(tuple(sorted(ids[cell] for cell in mill)) for mill in mills)
+
+
+def mask_to_ids(mask:int) -> Tuple[int, ...]:
+    """Return the ids of the cells in a mask (in increasing order)."""
+    ids = []
+    while mask:
+        low = mask & -mask
+        ids.append(low.bit_length() - 1)
+        mask ^= low
+    return tuple(ids)
+
+
+CELLS: Tuple[CellIndex, ...] = _build_cells()
+CELL_IDS: Dict[CellIndex, int] = {cell: c for c, cell in enumerate(CELLS)}
+NUM_CELLS: int = len(CELLS)
+FULL_MASK: int = (1 << NUM_CELLS) - 1
+
+NEIGHBORS: Tuple[Tuple[int, ...], ...] = _build_neighbors(CELLS, CELL_IDS)
+ADJACENT: Tuple[Tuple[int, ...], ...] = tuple(tuple(n for n in row if n >= 0) for row in NEIGHBORS)
+ADJACENT_MASKS: Tuple[int, ...] = tuple(sum(1 << n for n in adjacent) for adjacent in ADJACENT)
+
+MILL_CELLS: Tuple[Tuple[int, int, int], ...] = _build_mills(CELL_IDS)
+MILL_MASKS: Tuple[int, ...] = tuple(sum(1 << c for c in mill) for mill in MILL_CELLS)
+CELL_MILLS: Tuple[Tuple[int, ...], ...] = tuple(
+    tuple(m for m, mill in enumerate(MILL_CELLS) if c in mill) for c in range(NUM_CELLS))
@@ -2,7 +2,7 @@
 import sys
 import random 
 import time
-from typing import Optional
+from typing import Optional, Tuple, Union
 
 import pygame as pg
 
@@ -16,6 +16,7 @@ from nmm.ui.uiconfig import UIConfig
 from nmm.ui.players import PlayerUI
 from nmm.agent import EasyAgent, HardAgent, RandomAgent
 from nmm.players import AIPlayer
+from nmm.actions import ACTION_STATES, ACTION_SOURCES, ACTION_TARGETS, check_action, encode_action, action_name
 
 class GameUI():
     def __init__(self):
@@ -249,8 +250,7 @@ class GameUI():
         mills = self.board.get_my_mills(self.current_player)
         mills = [mill for mill in mills if not mill.utilized]
         assert len(mills) > 0, f'{self.current_player.name} has no mills to utilize'
-        self.board.kill(move)
-        mills[0].utilized = True
+        self.board.kill(move, mills[0])
         print(f'{self.current_player.name} killed a piece at {move}')
         new_state = self.get_player_state(self.current_player)
         if new_state != PlayerState.KILLING:
@@ -300,51 +300,40 @@ class GameUI():
         
         return state
 
-    def _handle_ai_action(self, move:Cell, state:PlayerState):
+    def _handle_ai_action(self, move:Union[int, Cell, Tuple[Cell, Cell]], state:PlayerState):
+        """Play the move of an AI player: an action of `nmm.actions`, or the cells of the action in `state`."""
         assert isinstance(self.current_player, AIPlayer), f'Current player must be an AI player to handle AI move'
         time.sleep(0.1)
+        action = check_action(move) if isinstance(move, int) else encode_action(self.board, move, state)
+        if ACTION_STATES[action] != state:
+            raise ValueError(f'Cannot {action_name(action)} while {state.value.lower()} !')
+        cells = self.board.cells
+        source, target = ACTION_SOURCES[action], cells[ACTION_TARGETS[action]]
+
         if state == PlayerState.PLACING:
-            self.board.place(move, self.current_player)
-            new_state = self.get_player_state(self.current_player)
-            print(f'{self.current_player.name} placed a piece at {move}')
-            if new_state != PlayerState.KILLING:
-                self.switch_player()
-            return new_state
+            self.board.place(target, self.current_player)
+            print(f'{self.current_player.name} placed a piece at {target}')
 
-        if state == PlayerState.MOVING:
-            assert isinstance(move, tuple) and len(move) == 2, f'Move must be a tuple of two cells'
-            source, destination = move
-            self.board.move(source, destination)
-            print(f'{self.current_player.name} moved a piece from {source} to {destination}')
-            new_state = self.get_player_state(self.current_player)
-            if new_state != PlayerState.KILLING:
-                self.switch_player()
-            return new_state
+        elif state == PlayerState.MOVING:
+            self.board.move(cells[source], target)
+            print(f'{self.current_player.name} moved a piece from {cells[source]} to {target}')
 
-        if state == PlayerState.FLYING:
-            assert isinstance(move, tuple) and len(move) == 2, f'Move must be a tuple of two cells'
-            source, destination = move
-            self.board.fly(source, destination)
-            print(f'{self.current_player.name} flew a piece from {source} to {destination}')
-            new_state = self.get_player_state(self.current_player)
-            if new_state != PlayerState.KILLING:
-                self.switch_player()
-            return new_state
+        elif state == PlayerState.FLYING:
+            self.board.fly(cells[source], target)
+            print(f'{self.current_player.name} flew a piece from {cells[source]} to {target}')
 
-        if state == PlayerState.KILLING:
-            assert move in self.board.get_opponent_cells(self.current_player), f'Cannot kill a piece at {move} because it is not an opponent\'s piece'
+        elif state == PlayerState.KILLING:
+            assert target in self.board.get_opponent_cells(self.current_player), f'Cannot kill a piece at {target} because it is not an opponent\'s piece'
             mills = self.board.get_my_mills(self.current_player)
             mills = [mill for mill in mills if not mill.utilized]
             assert len(mills) > 0, f'{self.current_player.name} has no mills to utilize'
-            self.board.kill(move)
-            mills[0].utilized = True
-            new_state = self.get_player_state(self.current_player)
-            print(f'{self.current_player.name} killed a piece at {move}')
-            if new_state != PlayerState.KILLING:
-                self.switch_player()
-            return new_state
-        
-        return state
+            self.board.kill(target, mills[0])
+            print(f'{self.current_player.name} killed a piece at {target}')
+
+        new_state = self.get_player_state(self.current_player)
+        if new_state != PlayerState.KILLING:
+            self.switch_player()
+        return new_state
 
 
     def run(self):
@@ -390,6 +379,13 @@ class GameUI():
                             self._handle_ui_move_or_fly(move)
                         elif state == PlayerState.KILLING:
                             self._handle_ui_killing(move)
+        self.close()
+
+    def close(self):
+        """Release the AI players (the workers of their parallel searches)."""
+        for player in self.players:
+            if isinstance(player, AIPlayer):
+                player.close()
 
 # #                    raise NotImplementedError('Not implemented')
 #                     if selected_idx is not None:
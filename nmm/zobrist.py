@@ -0,0 +1,33 @@
+"""Zobrist keys of the nine men's morris positions.
+
+The key of a position is the XOR of one random 64-bit key per feature of the position:
+- every occupied cell, by the side occupying it (0: first player, 1: second player),
+- the number of ready (not yet placed) pieces of each side,
+- every formed mill that is not utilized yet (that's a pending kill of its owner),
+- the side to move, for the keys of the search (`SIDE_KEY` when the second player is to move;
+  `Board.zobrist` leaves it out).
+
+XOR is its own inverse, so a mutation updates the key by XOR-ing out the features it removes
+and XOR-ing in the features it adds. The keys are drawn from a fixed seed, so a position
+has the same key in every process (which makes keys usable in files and across workers).
+"""
+from typing import Tuple
+import random
+
+from nmm.topology import NUM_CELLS, MILL_CELLS, PIECES_PER_PLAYER
+
+
+ZOBRIST_SEED: int = 0x9E3779B97F4A7C15
+
+
+def _draw_keys(rng:random.Random, count:int) -> Tuple[int, ...]:
+    return tuple(rng.getrandbits(64) for _ in range(count))
+
+
+_rng = random.Random(ZOBRIST_SEED)
+CELL_KEYS: Tuple[Tuple[int, ...], Tuple[int, ...]] = (_draw_keys(_rng, NUM_CELLS), _draw_keys(_rng, NUM_CELLS))
+READY_KEYS: Tuple[Tuple[int, ...], Tuple[int, ...]] = (_draw_keys(_rng, PIECES_PER_PLAYER + 1),
+                                                       _draw_keys(_rng, PIECES_PER_PLAYER + 1))
+PENDING_KEYS: Tuple[int, ...] = _draw_keys(_rng, len(MILL_CELLS))
+SIDE_KEY: int = _rng.getrandbits(64)
+del _rng
@@ -0,0 +1,71 @@
+import unittest
+import random
+from hypothesis import given, settings
+import hypothesis.strategies as st
+from nmm.topology import NUM_CELLS, ADJACENT_MASKS
+from nmm.actions import PLACE, MOVE, FLY, KILL, NUM_ACTIONS, ACTION_STATES, ACTION_SOURCES, ACTION_TARGETS, \
+                        MOVE_ACTIONS, FLY_ACTIONS, legal_mask, mask_to_actions, encode_action, decode_action, \
+                        check_action, action_name
+from nmm.positions import Position
+from nmm.dtypes import PlayerState
+from nmm.boards import Board
+from nmm.bitboards import BitBoard
+
+
+class TestActions(unittest.TestCase):
+
+    def test_sizes(self):
+        self.assertEqual((MOVE - PLACE, FLY - MOVE, KILL - FLY, NUM_ACTIONS - KILL), (24, 64, 552, 24))
+        self.assertEqual(len(ACTION_STATES), NUM_ACTIONS)
+        self.assertEqual(len(ACTION_SOURCES), NUM_ACTIONS)
+        self.assertEqual(len(ACTION_TARGETS), NUM_ACTIONS)
+        self.assertEqual(sum(a >= 0 for row in MOVE_ACTIONS for a in row), 64)
+        self.assertEqual(sorted(a for row in FLY_ACTIONS for a in row if a >= 0), list(range(FLY, KILL)))
+
+    def test_tables(self):
+        for source in range(NUM_CELLS):
+            for destination in range(NUM_CELLS):
+                move = MOVE_ACTIONS[source][destination]
+                self.assertEqual(move >= 0, bool(ADJACENT_MASKS[source] >> destination & 1))
+                if move >= 0:
+                    self.assertEqual((ACTION_SOURCES[move], ACTION_TARGETS[move]), (source, destination))
+                fly = FLY_ACTIONS[source][destination]
+                self.assertEqual(fly >= 0, source != destination)
+                if fly >= 0:
+                    self.assertEqual((ACTION_SOURCES[fly], ACTION_TARGETS[fly]), (source, destination))
+
+    def test_encode_and_decode(self):
+        for board in (Board(('x', 'y')), BitBoard(('x', 'y'))):
+            for action in range(NUM_ACTIONS):
+                cells = decode_action(board, action)
+                self.assertEqual(encode_action(board, cells, ACTION_STATES[action]), action)
+            with self.assertRaises(ValueError):
+                encode_action(board, (board.cells[0], board.cells[23]), PlayerState.MOVING)
+            with self.assertRaises(ValueError):
+                encode_action(board, board.cells[0], PlayerState.MOVING)
+            with self.assertRaises(ValueError):
+                encode_action(board, board.cells[0], PlayerState.LOOSING)
+        for action in (-1, NUM_ACTIONS, 1.0):
+            with self.assertRaises(ValueError):
+                check_action(action)
+        self.assertEqual(action_name(PLACE + 3), 'place 3')
+        self.assertEqual(action_name(FLY_ACTIONS[0][23]), 'fly 0-23')
+        self.assertEqual(action_name(KILL + 7), 'kill 7')
+
+    @settings(max_examples=30, deadline=None)
+    @given(seed=st.integers(min_value=0, max_value=2 ** 16))
+    def test_legal_mask(self, seed):
+        rng = random.Random(seed)
+        position = Position()
+        for _ in range(150):
+            actions = position.actions()
+            mask = legal_mask(position)
+            self.assertEqual(mask_to_actions(mask), sorted(actions))
+            if position.is_lost() or not actions:
+                break
+            self.assertTrue(all(ACTION_STATES[a] == position.state for a in actions))
+            position.apply(rng.choice(actions))
+
+
+if __name__ == '__main__':
+    unittest.main()
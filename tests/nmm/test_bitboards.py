@@ -0,0 +1,150 @@
+import unittest
+import random
+from itertools import product
+from hypothesis import given, assume, settings
+import hypothesis.strategies as st
+from nmm.bitboards import BitBoard
+from nmm.boards import Board
+from nmm.cells import Cell
+from nmm.players import Player as AbstractPlayer
+from nmm.dtypes import PlayerState
+
+
+valid_cells = list(filter(lambda x: x[1:] != (1, 1), product([0, 1, 2], repeat=3)))
+
+
+class Player(AbstractPlayer):
+    def play(self, board, state):
+        return None
+
+
+class TestBitBoard(unittest.TestCase):
+
+    def setUp(self):
+        self.players = (Player('Easy'), Player('Challenging'))
+
+    def test_initialization(self):
+        board = BitBoard(self.players)
+        self.assertTupleEqual(board.players, ('Easy', 'Challenging'))
+        self.assertTrue(board.is_empty)
+        self.assertEqual(len(board.get_empty_cells()), 24)
+        self.assertEqual(len(board.mills), 0)
+        for p in self.players:
+            self.assertEqual(board.get_ready_count(p), 9)
+            self.assertEqual(board.get_dead_count(p), 0)
+            self.assertEqual(board.get_player_state(p), PlayerState.PLACING)
+
+    @given(cell=st.sampled_from(valid_cells))
+    def test_place(self, cell):
+        board = BitBoard(self.players)
+        self.assertEqual(board.place(Cell(*cell), self.players[0]), cell)
+        self.assertEqual(board[cell], self.players[0])
+        self.assertListEqual(board.get_my_cells(self.players[0]), [cell])
+        self.assertListEqual(board.get_opponent_cells(self.players[1]), [cell])
+        self.assertNotIn(cell, board.get_empty_cells())
+        self.assertEqual(board.get_ready_count(self.players[0]), 8)
+        with self.assertRaises(ValueError):
+            board.place(cell, self.players[1])
+
+    def test_place_out_of_pieces(self):
+        board = BitBoard(self.players)
+        for cell in valid_cells[:9]:
+            board.place(cell, self.players[0])
+        with self.assertRaises(ValueError):
+            board.place(valid_cells[9], self.players[0])
+
+    @given(cell=st.sampled_from(valid_cells))
+    def test_remove_and_kill(self, cell):
+        board = BitBoard(self.players)
+        board.place(cell, self.players[0])
+        board.remove(cell)
+        self.assertTrue(board.is_empty)
+        self.assertEqual(board.get_ready_count(self.players[0]), 9)
+        board.place(cell, self.players[0])
+        board.kill(cell)
+        self.assertTrue(board.is_empty)
+        self.assertEqual(board.get_ready_count(self.players[0]), 8)
+        self.assertEqual(board.get_dead_count(self.players[0]), 1)
+        with self.assertRaises(ValueError):
+            board.kill(cell)
+        with self.assertRaises(ValueError):
+            board.remove(cell)
+
+    @given(from_cell=st.sampled_from(valid_cells),
+           to_cell=st.sampled_from(valid_cells))
+    def test_move_and_fly(self, from_cell, to_cell):
+        assume(from_cell != to_cell)
+        board = BitBoard(self.players)
+        board.place(from_cell, self.players[0])
+        if to_cell in board.get_possible_moves_from_cell(from_cell):
+            board.move(from_cell, to_cell)
+        else:
+            with self.assertRaises(ValueError):
+                board.move(from_cell, to_cell)
+            board.fly(from_cell, to_cell)
+        self.assertListEqual(board.get_my_cells(self.players[0]), [to_cell])
+        with self.assertRaises(ValueError):
+            board.fly(from_cell, to_cell)
+
+    def test_mills_and_killing(self):
+        board = BitBoard(self.players)
+        for cell in [(0, 0, 0), (0, 1, 0), (0, 2, 0)]:
+            board.place(cell, self.players[0])
+        mill = ((0, 0, 0), (0, 1, 0), (0, 2, 0))
+        self.assertSetEqual(board.get_my_mills(self.players[0]), {mill})
+        self.assertSetEqual(board.get_opponent_mills(self.players[1]), {mill})
+        self.assertEqual(board.get_player_state(self.players[0]), PlayerState.KILLING)
+        board.place((1, 1, 0), self.players[1])
+        board.kill((1, 1, 0), mill)
+        self.assertEqual(board.get_player_state(self.players[0]), PlayerState.PLACING)
+        self.assertSetEqual(board.get_pending_mills(self.players[0]), set())
+        board.fly((0, 0, 0), (0, 0, 1))
+        board.fly((0, 0, 1), (0, 0, 0))
+        self.assertEqual(board.get_player_state(self.players[0]), PlayerState.KILLING)
+
+    @settings(max_examples=20, deadline=None)
+    @given(seed=st.integers(min_value=0, max_value=2 ** 16))
+    def test_same_as_board(self, seed):
+        rng = random.Random(seed)
+        board = Board(self.players)
+        bitboard = BitBoard(self.players)
+        player = self.players[0]
+        while not board.all_placed:
+            cell = rng.choice(board.get_empty_cells())
+            board.place(cell, player)
+            bitboard.place(cell, player)
+            if board.get_player_state(player) == PlayerState.KILLING:
+                mill = [m for m in board.get_my_mills(player) if not m.utilized][0]
+                victim = rng.choice(board.get_opponent_cells(player))
+                board.kill(victim, mill)
+                bitboard.kill(victim, mill)
+            player = board.get_opponent(player)
+            self.assertSetEqual(set(board.get_empty_cells()), set(bitboard.get_empty_cells()))
+            self.assertSetEqual({tuple(c.index for c in m) for m in board.mills}, bitboard.mills)
+            for p in self.players:
+                self.assertEqual(board.get_player_state(p), bitboard.get_player_state(p))
+                self.assertSetEqual({(s.index, d.index) for s, d in board.get_possible_moves(p)},
+                                    set(bitboard.get_possible_moves(p)))
+        self.assertTupleEqual(board.game_over(1), bitboard.game_over(1))
+        self.assertTupleEqual(board.game_over(2), bitboard.game_over(2))
+        converted = BitBoard.from_board(board)
+        self.assertTupleEqual(converted.occupancy, bitboard.occupancy)
+        self.assertEqual(str(board), str(bitboard))
+
+    def test_clone(self):
+        board = BitBoard(self.players)
+        board.place((0, 0, 0), self.players[0])
+        cloned = board.clone()
+        cloned.place((0, 0, 1), self.players[1])
+        self.assertIsNone(board[(0, 0, 1)])
+        self.assertEqual(cloned[(0, 0, 1)], self.players[1])
+        self.assertEqual(cloned[(0, 0, 0)], self.players[0])
+
+    @given(cell=st.sampled_from(valid_cells))
+    def test_contains(self, cell):
+        board = BitBoard(self.players)
+        self.assertIn(cell, board)
+        self.assertIn(Cell(*cell), board)
+        self.assertNotIn((0, 1, 1), board)
+        self.assertEqual(len(board), 24)
+        self.assertListEqual(list(board), valid_cells)
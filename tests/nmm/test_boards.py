@@ -82,6 +82,11 @@ class TestBoard(unittest.TestCase):
         self.assertIs(board._board[0, 0, 0].neighbors['lower'], board._board[0, 1, 0])
         self.assertIs(board._board[1, 0, 1].neighbors['outer'], board._board[0, 0, 1])
         self.assertIs(board._board[2, 2, 1].neighbors['right'], board._board[2, 2, 2])
+        cell = board._board[0, 0, 0]
+        self.assertIs(cell.neighbors, cell.neighbors)  # built once, when the board attaches its cells
+        self.assertIsNone(cell.neighbors['upper'])
+        self.assertNotIn('upper', cell.neighbors)
+        self.assertEqual(set(cell.neighbors.values()), {board._board[0, 1, 0], board._board[0, 0, 1]})
 
     def test_initialization_mills(self):
         board = Board(self.players)
@@ -569,6 +574,178 @@ class TestBoard(unittest.TestCase):
         self.assertTrue(over)
         self.assertEqual(winner, board.get_opponent(player))
             
+    def test_last_formed_and_broken_mills(self):
+        board = Board(self.players)
+        board.place((0, 0, 0), self.players[0])
+        board.place((0, 1, 0), self.players[0])
+        self.assertListEqual(board.last_formed_mills, [])
+        board.place((0, 2, 0), self.players[0])
+        mill, = board.last_formed_mills
+        self.assertIn(mill, board.get_my_mills(self.players[0]))
+        self.assertListEqual(board.last_broken_mills, [])
+        board.move((0, 2, 0), (0, 2, 1))
+        self.assertListEqual(board.last_formed_mills, [])
+        self.assertListEqual(board.last_broken_mills, [mill])
+        board.move((0, 2, 1), (0, 2, 0))
+        self.assertEqual(len(board.last_formed_mills), 1)
+        board.kill((0, 1, 0))
+        self.assertEqual(len(board.last_broken_mills), 1)
+        self.assertEqual(len(board.mills), 0)
+
+    @given(seed=st.integers(min_value=0, max_value=2 ** 16))
+    def test_incremental_mills(self, seed):
+        rng = random.Random(seed)
+        board = Board(self.players)
+        player = self.players[0]
+        for _ in range(18):
+            board.place(rng.choice(board.get_empty_cells()), player)
+            if rng.random() < 0.3:
+                board.kill(rng.choice(board.get_occupied_cells()))
+            player = board.get_opponent(player)
+        for _ in range(10):
+            source = rng.choice(board.get_occupied_cells())
+            board.fly(source, rng.choice(board.get_empty_cells()))
+        incremental = set(board.mills)
+        board.check_mills()
+        self.assertSetEqual(incremental, board.mills)
+
+    def _snapshot(self, board):
+        return ([cell.occupant for cell in board.cells],
+                {(state, p): [(piece, piece.cell) for piece in board._pieces[state][p]]
+                 for state in PieceState for p in board.players},
+                [(mill, mill.utilized) if mill is not None else None for mill in board._mills],
+                board.last_formed_mills, board.last_broken_mills, board.zobrist)
+
+    @settings(max_examples=30)
+    @given(seed=st.integers(min_value=0, max_value=2 ** 16))
+    def test_apply_undo(self, seed):
+        rng = random.Random(seed)
+        board = Board(self.players)
+        player, tokens, snapshots = self.players[0], [], []
+        while len(tokens) < 40:
+            state = board.get_player_state(player)
+            if state == PlayerState.PLACING:
+                action = rng.choice(board.get_empty_cells())
+            elif state == PlayerState.KILLING:
+                action = rng.choice(board.get_opponent_cells(player))
+            elif state == PlayerState.MOVING and board.get_possible_moves(player):
+                action = rng.choice(board.get_possible_moves(player))
+            elif state == PlayerState.FLYING:
+                action = (rng.choice(board.get_my_cells(player)), rng.choice(board.get_empty_cells()))
+            else:
+                break
+            snapshots.append(self._snapshot(board))
+            tokens.append(board.apply(action, player))
+            if board.get_player_state(player) != PlayerState.KILLING:
+                player = board.get_opponent(player)
+        final = self._snapshot(board)
+        while tokens:
+            board.undo(tokens.pop())
+            self.assertEqual(self._snapshot(board), snapshots.pop())
+        self.assertTrue(board.is_empty)
+        self.assertEqual(len(board.ready_pieces), 18)
+
+    def test_apply_kinds(self):
+        board = Board(self.players)
+        p1, p2 = self.players
+        for cell in [(0, 0, 0), (0, 1, 0), (0, 2, 0)]:
+            token = board.apply(cell, p1)
+            self.assertEqual(token.kind, 'place')
+        self.assertEqual(board.get_player_state(p1), PlayerState.KILLING)
+        board.apply((1, 1, 0), p2)
+        with self.assertRaises(ValueError):
+            board.apply((1, 1, 0), p2)
+        token = board.apply((1, 1, 0), p1)
+        self.assertEqual(token.kind, 'kill')
+        self.assertIs(token.mill, board.get_my_mills(p1).pop())
+        self.assertTrue(token.mill.utilized)
+        self.assertEqual(board.get_player_state(p1), PlayerState.PLACING)
+        board.undo(token)
+        self.assertFalse(token.mill.utilized)
+        self.assertEqual(board.get_player_state(p1), PlayerState.KILLING)
+        with self.assertRaises(ValueError):
+            board.apply((2, 2, 2))
+        token = board.apply(((0, 0, 0), (0, 0, 1)))
+        self.assertEqual(token.kind, 'move')
+        self.assertEqual(len(board.last_broken_mills), 1)
+        board.undo(token)
+        self.assertEqual(len(board.get_my_mills(p1)), 1)
+
+    @given(seed=st.integers(min_value=0, max_value=2 ** 16))
+    def test_piece_index(self, seed):
+        rng = random.Random(seed)
+        board = Board(self.players)
+        player = self.players[0]
+        for _ in range(18):
+            board.place(rng.choice(board.get_empty_cells()), player)
+            if rng.random() < 0.3:
+                board.kill(rng.choice(board.get_occupied_cells()))
+            player = board.get_opponent(player)
+        board.remove(rng.choice(board.get_occupied_cells()))
+        board.fly(rng.choice(board.get_occupied_cells()), rng.choice(board.get_empty_cells()))
+        for board in [board, board.clone()]:
+            placed = [(cell, board._piece_at[cell.id]) for cell in board.cells if board._piece_at[cell.id] is not None]
+            self.assertEqual(len(placed), len(board.placed_pieces))
+            for cell, piece in placed:
+                self.assertIs(piece.cell, cell)
+                self.assertEqual(piece.owner, cell.occupant)
+                self.assertIn(piece, board.get_my_placed_pieces(piece.owner))
+        board.reset()
+        self.assertTrue(board.is_empty)
+        self.assertListEqual(board._piece_at, [None] * 24)
+        for p in self.players:
+            self.assertEqual(len(board.get_my_ready_pieces(p)), 9)
+
+    @settings(max_examples=30)
+    @given(seed=st.integers(min_value=0, max_value=2 ** 16))
+    def test_zobrist(self, seed):
+        rng = random.Random(seed)
+        board = Board(self.players)
+        empty = board.clone()
+        player = self.players[0]
+        for _ in range(30):
+            if board.get_my_ready_pieces(player):
+                board.place(rng.choice(board.get_empty_cells()), player)
+            elif board.get_possible_moves(player):
+                board.move(*rng.choice(board.get_possible_moves(player)))
+            if board.get_player_state(player) == PlayerState.KILLING and rng.random() < 0.7:
+                mill = [mill for mill in board.get_my_mills(player) if not mill.utilized][0]
+                board.kill(rng.choice(board.get_opponent_cells(player)), mill)
+            self.assertEqual(board.zobrist, board._compute_hash())
+            cloned = board.clone()
+            self.assertEqual(cloned, board)
+            self.assertEqual(hash(cloned), hash(board))
+            player = board.get_opponent(player)
+        self.assertNotEqual(board, empty)
+        board.remove(rng.choice(board.get_occupied_cells()))
+        self.assertEqual(board.zobrist, board._compute_hash())
+        board.reset()
+        self.assertEqual(board, empty)
+        self.assertEqual(hash(board), hash(empty))
+
+    def test_zobrist_transpositions(self):
+        p1, p2 = self.players
+        board1, board2 = Board(self.players), Board(self.players)
+        for cell, player in [((0, 0, 0), p1), ((1, 0, 0), p2), ((0, 0, 1), p1), ((1, 0, 1), p2)]:
+            board1.place(cell, player)
+        for cell, player in [((0, 0, 1), p1), ((1, 0, 1), p2), ((0, 0, 0), p1), ((1, 0, 0), p2)]:
+            board2.place(cell, player)
+        self.assertEqual(board1, board2)
+        self.assertEqual(len({board1, board2}), 1)
+        board1.place((0, 0, 2), p1)
+        board2.place((0, 0, 2), p1)
+        self.assertEqual(board1, board2)
+        board1.kill((1, 0, 0), board1.get_my_mills(p1).pop())
+        board2.remove((1, 0, 0))
+        self.assertNotEqual(board1, board2)
+        self.assertNotEqual(hash(board1), hash(board2))
+        board2.place((2, 0, 0), p2)
+        board2.kill((2, 0, 0))
+        self.assertNotEqual(board1, board2)  # the mill of p1 is still pending on board2
+        board2.get_my_mills(p1).pop().utilized = True
+        self.assertEqual(board1, board2)
+        self.assertEqual(board2.zobrist, board2._compute_hash())
+
     # def test_fly_not_placed_piece(self):
     #     board = Board(self.players)
     #     board.check_mills = MagicMock(return_value=None)
@@ -28,7 +28,9 @@ class TestCell(unittest.TestCase):
         self.assertEqual(cell.z, z)
         self.assertEqual(cell.occupant, None)
         self.assertEqual(len(cell.neighbors), 0)
-        self.assertEqual(len(cell._neighbors), 6)
+        self.assertIsNone(cell.neighbors['outer'])
+        with self.assertRaises(TypeError):
+            cell.neighbors['right'] = Cell(0, 0, 0)
         self.assertTupleEqual(cell.index, (x, y, z))
         self.assertTrue(np.array_equal(cell.npindex, np.array([x, y, z])))
         self.assertEqual(cell.square_position, x)
@@ -271,3 +273,15 @@ class TestCell(unittest.TestCase):
         cell = Cell(*cell)
         self.assertListEqual(list(cell), list(cell.index))
 
+    @given(cell=st.sampled_from(valid_cells))
+    def test_slots(self, cell:tuple[int, int, int]):
+        cell = Cell(*cell)
+        self.assertFalse(hasattr(cell, '__dict__'))
+        with self.assertRaises(AttributeError):
+            cell.foo = 'bar'
+
+    @given(cell=st.sampled_from(valid_cells))
+    def test_id(self, cell:tuple[int, int, int]):
+        self.assertEqual(Cell(*cell).id, valid_cells.index(cell))
+        self.assertEqual(Cell(*cell), Cell(*cell))
+        self.assertNotEqual(Cell(*cell), (0, 1, 1))
@@ -0,0 +1,122 @@
+import unittest
+import numpy as np
+from nmm.topology import MILL_MASKS, mask_to_ids
+from nmm.mcts import MCTS, random_playouts
+from nmm.positions import Position
+from nmm.actions import PLACE, KILL, NUM_ACTIONS
+from nmm.dtypes import PlayerState
+from nmm.boards import Board
+from nmm.agent import MCTSAgent
+
+
+def mill_position():
+    """The first player closes a mill by placing on `c`, then kills one of the 3 pieces of the second player."""
+    a, b, c = mask_to_ids(MILL_MASKS[0])
+    return Position(((1 << a) | (1 << b), (1 << 20) | (1 << 22) | (1 << 23)), (1, 0), side=0), c
+
+
+class TestPlayouts(unittest.TestCase):
+
+    def test_results(self):
+        rng = np.random.default_rng(0)
+        position, c = mill_position()
+        self.assertEqual(random_playouts(Position((0, 0b111), (2, 0), side=0), 8, rng), 0.0)  # lost on pieces
+        position.apply(PLACE + c)
+        self.assertEqual(position.state, PlayerState.KILLING)
+        self.assertEqual(random_playouts(position, 8, rng), 1.0)  # any kill wins
+        self.assertEqual(random_playouts(Position(), 8, rng, max_turns=3), 0.5)  # too short to end
+        value = random_playouts(Position(), 256, rng)
+        self.assertTrue(0.3 < value < 0.7)
+
+
+class TestMCTS(unittest.TestCase):
+
+    def test_mill(self):
+        for formula in MCTS.FORMULAS:
+            mcts = MCTS(formula, playouts=8, seed=1)
+            position, c = mill_position()
+            result = mcts.search(position, iterations=300)
+            self.assertEqual(result.action, PLACE + c)
+            self.assertGreater(result.value, 0.9)
+            self.assertEqual(result.iterations, 300)
+            visits = mcts.root_visits()
+            self.assertEqual(visits.shape, (NUM_ACTIONS,))
+            self.assertEqual(visits.argmax(), PLACE + c)
+            self.assertEqual(visits.sum(), 299)  # the first iteration only expands the root
+            self.assertEqual(position, mill_position()[0])
+
+    def test_reuse(self):
+        mcts = MCTS(playouts=4, seed=2)
+        position = Position()
+        action = mcts.search(position, iterations=150).action
+        first, count = int(mcts.first_child[0]), int(mcts.num_children[0])
+        child = first + int(np.flatnonzero(mcts.action[first:first + count] == action)[0])
+        visits, value = int(mcts.visits[child]), float(mcts.value[child])
+        self.assertTrue(mcts.advance([action]))
+        position.apply(action)
+        self.assertEqual(mcts.root, position)
+        self.assertEqual((int(mcts.visits[0]), float(mcts.value[0]), int(mcts.parent[0])), (visits, value, -1))
+        for node in range(1, mcts.nodes):  # the children of every node are together, right after it
+            parent = mcts.parent[node]
+            self.assertTrue(node < mcts.first_child[parent] + mcts.num_children[parent])
+            self.assertGreaterEqual(node, mcts.first_child[parent])
+        first, count = int(mcts.first_child[0]), int(mcts.num_children[0])
+        reply = int(mcts.action[first + mcts.visits[first:first + count].argmax()])
+        replied = position.copy()
+        replied.apply(reply)
+        kept = int(mcts.visits[first + mcts.visits[first:first + count].argmax()])
+        result = mcts.search(replied, iterations=20)  # the opponent's reply is found by comparing the positions
+        self.assertEqual((int(mcts.visits[0]), result.reused), (kept + 20, kept))
+        mcts.search(Position(), iterations=20)  # back to the start: a new tree
+        self.assertEqual(int(mcts.visits[0]), 20)
+        self.assertFalse(mcts.advance([KILL]))
+        self.assertEqual((mcts.root, mcts.nodes), (None, 0))
+
+    def test_bounded(self):
+        mcts = MCTS(playouts=4, max_nodes=100, seed=0)
+        result = mcts.search(Position(), time_limit=0.3)
+        self.assertLessEqual(result.nodes, 100)
+        self.assertIn(result.action, Position().actions())
+        self.assertGreater(result.ips, 0)
+        self.assertEqual(mcts.search(Position((0, 0b111), (2, 0), side=0), iterations=5).action, None)
+        with self.assertRaises(ValueError):
+            mcts.search(Position())
+        with self.assertRaises(ValueError):
+            MCTS('ucb')
+        with self.assertRaises(ValueError):
+            MCTS(playouts=0)
+
+    def test_agent(self):
+        agent = MCTSAgent('x', iterations=30, playouts=4, seed=0)
+        board = Board(('x', 'y'))
+        self.assertIn(agent.play(board, PlayerState.PLACING), board.get_empty_cells())
+        self.assertEqual(agent.last_search.iterations, 30)
+        self.assertIsNone(agent.time_limit)
+        clone = agent.clone()
+        self.assertEqual((clone.iterations, clone.mcts.playouts), (30, 4))
+        position, c = mill_position()
+        for cell in mask_to_ids(position.occupancy[1]):
+            board.place(board.cells[cell], 'y')
+        for cell in mask_to_ids(position.occupancy[0]) + (c,):  # the mill of 'x' is closed, it kills next
+            board.place(board.cells[cell], 'x')
+        self.assertEqual(MCTSAgent('x', time_limit=0.2).time_limit, 0.2)
+        kill = MCTSAgent('x', iterations=20, playouts=4).play(board, PlayerState.KILLING)
+        self.assertIn(kill, board.get_opponent_cells('x'))
+        with self.assertRaises(ValueError):
+            MCTSAgent('x', iterations=0)
+
+    def test_agent_reuse(self):
+        agent = MCTSAgent('x', iterations=300, playouts=2, seed=0)
+        board = Board(('x', 'y'))
+        board.place(agent.play(board, PlayerState.PLACING), 'x')
+        mcts = agent.mcts
+        first, count = int(mcts.first_child[0]), int(mcts.num_children[0])
+        best = first + int(mcts.visits[first:first + count].argmax())  # the most expected reply
+        board.place(board.cells[mcts.action[best] - PLACE], 'y')
+        kept = int(mcts.visits[best])
+        agent.play(board, PlayerState.PLACING)
+        self.assertEqual(agent.last_search.reused, kept)  # the search went on from the last one
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,11 +2,11 @@
 
 import unittest
 from unittest.mock import patch
-from itertools import product
+from itertools import product, combinations
 from hypothesis import given
 from hypothesis import strategies as st
 from nmm.cells import Cell
-from nmm.mills import Mill
+from nmm.mills import Mill, MILLS, MILL_IDS
 from nmm.boards import Board
 from nmm.players import Player as AbstractPlayer
 
@@ -23,42 +23,24 @@ class TestMill(unittest.TestCase):
 
     def setUp(self):
         self.cells = list(map(lambda cell: Cell(*cell), valid_cells))
+        grid = sorted(self.cells, key=lambda cell: cell.id)
+        for cell in self.cells:  # resolve the neighbors as the cells of a board do
+            cell.attach(grid)
         self.cells = {tuple(cell.index): cell for cell in self.cells}
-        for cell in self.cells.values():
-            neighbors = dict(right=cell.npindex + [0, 0, 1],
-                             left=cell.npindex + [0, 0, -1],
-                             upper=cell.npindex + [0, -1, 0],
-                             lower=cell.npindex + [0, 1, 0])
-            if 1 in cell.index[1:]:
-                neighbors['outer'] = cell.npindex + [-1, 0, 0]
-                neighbors['inner'] = cell.npindex + [1, 0, 0]
-            for key, value in neighbors.items():
-                if Cell.is_valid_index(*value):
-                    cell._neighbors[key] = self.cells[tuple(value)]
 
         self.cell1 = Cell(0, 0, 0)
         self.cell2 = Cell(0, 1, 0)
         self.cell3 = Cell(0, 2, 0)
-        self.cell1._neighbors['lower'] = self.cell2
-        self.cell2._neighbors['lower'] = self.cell3
-        self.cell2._neighbors['upper'] = self.cell1
-        self.cell3._neighbors['upper'] = self.cell2
         self.mill_cells_empty = [self.cell1, self.cell2, self.cell3]
 
         self.cell4 = Cell(0, 0, 1)
         self.cell5 = Cell(0, 2, 1)
         self.cell6 = Cell(0, 2, 2)
-        self.cell5._neighbors['right'] = self.cell6
-        self.cell6._neighbors['left'] = self.cell5
         self.invalid_cells = [self.cell4, self.cell5, self.cell6]
         
         self.cell7 = Cell(0, 0, 0)
         self.cell8 = Cell(0, 1, 0)
         self.cell9 = Cell(0, 2, 0)
-        self.cell7._neighbors['lower'] = self.cell8
-        self.cell8._neighbors['lower'] = self.cell9
-        self.cell8._neighbors['upper'] = self.cell7
-        self.cell9._neighbors['upper'] = self.cell8
         self.mill_cells_occupied = [self.cell7, self.cell8, self.cell9]
         for cell in self.mill_cells_occupied:
             cell.occupant = Player("Player 1")
@@ -91,6 +73,10 @@ class TestMill(unittest.TestCase):
         mill = Mill(self.mill_cells_occupied)
         self.assertEqual(len(mill), 3)
 
+    def test_slots(self):
+        mill = Mill(self.mill_cells_occupied)
+        self.assertFalse(hasattr(mill, '__dict__'))
+
     def test_indexing(self):
         mill = Mill(self.mill_cells_occupied)
         for idx in range(len(mill)):
@@ -145,6 +131,40 @@ class TestMill(unittest.TestCase):
             for m2 in b2.mills:
                 self.assertNotEqual(m1, m2)
 
+    def test_registry(self):
+        self.assertEqual(len(MILLS), 16)
+        for mill in MILLS:
+            self.assertTupleEqual(mill, tuple(sorted(mill)))
+            self.assertEqual(MILL_IDS[mill], MILLS.index(mill))
+        board = Board(['x', 'y'])
+        for subset in combinations(board.cells, 3):
+            for cell in subset:
+                cell.occupant = 'x'
+            in_registry = tuple(cell.index for cell in subset) in MILL_IDS
+            self.assertEqual(Mill.is_mill(list(subset)), in_registry)
+            self.assertEqual(Mill.registry_id(subset) is not None, in_registry)
+            for cell in subset:
+                cell.occupant = None
+
+    def test_board_mills_follow_registry(self):
+        board = Board(['x', 'y'])
+        board.place((0, 0, 0), 'x')
+        board.place((0, 1, 0), 'x')
+        board.place((0, 2, 0), 'x')
+        mill, = board.get_my_mills('x')
+        mill.utilized = True  # the pending kill leaves the Zobrist key of the board
+        self.assertEqual(board.zobrist, board._compute_hash())
+        with self.assertRaises(ValueError):
+            mill.utilized = True
+        board.place((1, 1, 2), 'y')
+        self.assertIs(board.get_my_mills('x').pop(), mill)
+        self.assertTrue(mill.utilized)
+        self.assertEqual(board.zobrist, board._compute_hash())
+        board.remove((0, 1, 0))
+        self.assertEqual(len(board.mills), 0)
+        board.place((0, 1, 0), 'x')
+        self.assertFalse(board.get_my_mills('x').pop().utilized)
+
     # def test_equality_1(self):
     #     with patch('nmm.mills.Mill.is_mill', return_value=True):        
     #         for cell in self.mill_cells_empty:
@@ -0,0 +1,238 @@
+import unittest
+import random
+import time
+from nmm.topology import MILL_MASKS, mask_to_ids
+import pickle
+import gc
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+import multiprocessing as mp
+import nmm.parallel
+from nmm.parallel import RootSplitSearch, LazySMPSearch, SharedTranspositionTable, ParallelMCTS
+from nmm.search import AlphaBeta, TranspositionTable, TTEntry, Bound, MATE, INFINITY, MoveOrdering
+from nmm.positions import Position, decode_turn
+from nmm.actions import PLACE
+from nmm.dtypes import PlayerState
+from nmm.boards import Board
+from nmm.agent import HardAgent, MCTSAgent
+
+
+def _store(table, key):
+    table.store(key, 5, Bound.LOWER, 42, 7)
+    return table.probe(key)
+
+
+class TestSharedTranspositionTable(unittest.TestCase):
+
+    def test_shared(self):
+        table = SharedTranspositionTable(1)
+        try:
+            self.assertEqual(table.capacity, TranspositionTable(1).capacity)
+            table.new_search()
+            with ProcessPoolExecutor(1) as pool:
+                self.assertEqual(pool.submit(_store, table, 12345).result(), TTEntry(5, Bound.LOWER, 42, 7, 1))
+            self.assertEqual(table.probe(12345), TTEntry(5, Bound.LOWER, 42, 7, 1))
+            other = pickle.loads(pickle.dumps(table))
+            other.new_search()  # only reads the generation of the table
+            self.assertEqual((other.generation, other.probe(12345)), (1, table.probe(12345)))
+            other.close()
+        finally:
+            table.close()
+
+    def test_torn_entry(self):
+        table = SharedTranspositionTable(1)
+        try:
+            table.store(99, 3, Bound.EXACT, 1, 2)
+            table.store(99 + table.capacity // 2, 4, Bound.EXACT, 5, 6)
+            self.assertEqual(table.probe(99).depth, 3)  # the replaced entry, in the second slot
+            i = 99 % (table.capacity // 2) * 2
+            table._data[i + 1] = table._data[i]  # the data of a store with the key of another
+            self.assertIsNone(table.probe(99))
+            self.assertEqual(table.probe(99 + table.capacity // 2).depth, 4)
+        finally:
+            table.close()
+
+
+class TestLazySMPSearch(unittest.TestCase):
+
+    def test_search(self):
+        rng = random.Random(3)
+        position = Position()
+        for _ in range(5):
+            position.play(rng.choice(position.turns()))
+        with LazySMPSearch(3, table_mb=1) as search:
+            for depth in (2, 3):
+                result = search.search(position.copy(), max_depth=depth)
+                self.assertEqual(result.depth, depth)
+                self.assertEqual(result.score, AlphaBeta().search(position.copy(), max_depth=depth).score)
+                self.assertIn(result.turn, position.turns())
+            self.assertGreater(len(search.transposition_table), 0)
+            start = time.time()
+            result = search.search(Board(('x', 'y')), 'y', time_limit=0.5)
+            self.assertLess(time.time() - start, 2.0)
+            self.assertIn(result.turn, Position().turns())
+        with LazySMPSearch(1, table_mb=1) as search:
+            self.assertEqual(search.search(position.copy(), max_depth=2).depth, 2)
+        with self.assertRaises(ValueError):
+            LazySMPSearch(0)
+
+
+class _RaisingSearcher:
+    """A stub of a worker's `AlphaBeta`, where another worker raises alpha during the first search."""
+
+    def __init__(self):
+        self.transposition_table, self.ordering = TranspositionTable(1), MoveOrdering()
+        self.stop = None
+        self.nodes = 0
+        self.windows = []
+
+    def search_window(self, position, depth, alpha, beta, ply, time_limit):
+        self.windows.append((alpha, beta))
+        self.nodes = 10
+        if len(self.windows) == 1:
+            nmm.parallel._alpha.value = 50
+            if self.stop():
+                return None
+        return -60, [1]  # the turn scores 60 for the root
+
+
+class TestSearchTurn(unittest.TestCase):
+
+    def setUp(self):
+        self.saved = nmm.parallel._searcher, nmm.parallel._alpha, nmm.parallel._root
+
+    def tearDown(self):
+        nmm.parallel._searcher, nmm.parallel._alpha, nmm.parallel._root = self.saved
+
+    def test_raised_alpha(self):
+        searcher = _RaisingSearcher()
+        nmm.parallel._searcher, nmm.parallel._alpha, nmm.parallel._root = searcher, mp.Value('i', 10), None
+        position = Position()
+        turn = position.turns()[0]
+        result = nmm.parallel._search_turn(position, 7, turn, 2, time.time() + 10)
+        self.assertEqual(searcher.windows, [(-11, -10), (-51, -50), (-INFINITY, -50)])  # searched again at 50
+        self.assertEqual(result, (turn, 60, True, [turn, 1], 30))
+        self.assertEqual(nmm.parallel._alpha.value, 60)
+        self.assertIsNone(searcher.stop)
+
+
+class TestRootSplitSearch(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.search = RootSplitSearch(2, table_mb=1)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.search.close()
+
+    def test_same_score(self):
+        rng = random.Random(2)
+        position = Position()
+        for _ in range(6):
+            position.play(rng.choice(position.turns()))
+        for depth in (1, 2, 3):
+            parallel = self.search.search(position.copy(), max_depth=depth)
+            serial = AlphaBeta().search(position.copy(), max_depth=depth)
+            self.assertEqual(parallel.depth, depth)
+            self.assertEqual(parallel.score, serial.score)
+            self.assertIn(parallel.turn, position.turns())
+            self.assertEqual(parallel.pv[0], parallel.turn)
+            self.assertGreater(parallel.nodes, 0)
+
+    def test_mill(self):
+        a, b, c = mask_to_ids(MILL_MASKS[0])
+        position = Position(((1 << a) | (1 << b), (1 << 20) | (1 << 22) | (1 << 23)), (1, 0), side=0)
+        result = self.search.search(position, max_depth=2)
+        self.assertEqual(decode_turn(result.turn)[0], PLACE + c)  # and the second player is left with 2 pieces
+        self.assertEqual(result.score, MATE - 1)
+        self.assertTrue(result.mate)
+
+    def test_deadline(self):
+        reports = []
+        self.search.info = reports.append
+        start = time.time()
+        result = self.search.search(Board(('x', 'y')), 'x', time_limit=0.5)
+        self.search.info = None
+        self.assertLess(time.time() - start, 2.0)
+        self.assertIn(result.turn, Position().turns())
+        self.assertGreaterEqual(result.depth, len(reports))
+        with self.assertRaises(ValueError):
+            RootSplitSearch(0)
+
+    def test_agent(self):
+        for parallel, kind in (('root_split', RootSplitSearch), ('lazy_smp', LazySMPSearch)):
+            agent = HardAgent('x', time_limit=0.3, workers=2, parallel=parallel)
+            try:
+                board = Board(('x', 'y'))
+                self.assertIn(agent.play(board, PlayerState.PLACING), board.get_empty_cells())
+                self.assertIsInstance(agent.searcher, kind)
+                self.assertIsNone(agent.transposition_table)
+            finally:
+                agent.close()
+        with self.assertRaises(ValueError):
+            HardAgent('x', workers=2, parallel='young_brothers')
+        with self.assertRaises(ValueError):  # the table would not be probed by the workers
+            HardAgent('x', TranspositionTable(1), workers=2)
+
+    def test_release(self):
+        with HardAgent('x', time_limit=0.2, workers=2) as agent:
+            name, pool = agent.searcher.transposition_table.name, agent.searcher._pool
+            self.assertIn(agent.play(Board(('x', 'y')), PlayerState.PLACING), Board(('x', 'y')).get_empty_cells())
+        with self.assertRaises(FileNotFoundError):  # freed by the end of the block
+            SharedMemory(name)
+        self.assertTrue(pool._shutdown_thread)
+        agent = HardAgent('x', workers=2)
+        name, pool = agent.searcher.transposition_table.name, agent.searcher._pool
+        del agent  # without closing it
+        gc.collect()
+        with self.assertRaises(FileNotFoundError):
+            SharedMemory(name)
+        self.assertTrue(pool._shutdown_thread)
+        agent = MCTSAgent('x', iterations=10, playouts=2, workers=2)
+        pool = agent.mcts._pool
+        del agent
+        gc.collect()
+        self.assertTrue(pool._shutdown_thread)
+
+
+class TestParallelMCTS(unittest.TestCase):
+
+    def test_deterministic(self):
+        trees = []
+        for _ in range(2):
+            with ParallelMCTS(3, playouts=4, seed=5, deterministic=True) as mcts:
+                result = mcts.search(Position(), iterations=40)
+                self.assertEqual((result.iterations, int(mcts.visits[0])), (40, 40))  # no virtual loss left
+                self.assertEqual(mcts.root_visits().sum(), 39)
+                trees.append((result, mcts.visits[:mcts.nodes].copy(), mcts.value[:mcts.nodes].copy()))
+        self.assertEqual(trees[0][0].action, trees[1][0].action)
+        self.assertTrue((trees[0][1] == trees[1][1]).all())
+        self.assertTrue((trees[0][2] == trees[1][2]).all())
+
+    def test_search(self):
+        a, b, c = mask_to_ids(MILL_MASKS[0])
+        position = Position(((1 << a) | (1 << b), (1 << 20) | (1 << 22) | (1 << 23)), (1, 0), side=0)
+        with ParallelMCTS(2, playouts=8, seed=1, virtual_loss=2) as mcts:
+            result = mcts.search(position, iterations=300)
+            self.assertEqual(result.action, PLACE + c)
+            self.assertEqual(int(mcts.visits[0]), 300)
+            result = mcts.search(Position(), time_limit=0.3)
+            self.assertIn(result.action, Position().actions())
+            with self.assertRaises(ValueError):
+                mcts.search(Position())
+        with self.assertRaises(ValueError):
+            ParallelMCTS(2, virtual_loss=0)
+
+    def test_agent(self):
+        agent = MCTSAgent('x', iterations=10, playouts=4, workers=2, deterministic=True, seed=0)
+        try:
+            board = Board(('x', 'y'))
+            self.assertIn(agent.play(board, PlayerState.PLACING), board.get_empty_cells())
+            self.assertIsInstance(agent.mcts, ParallelMCTS)
+        finally:
+            agent.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,7 +5,7 @@ from itertools import product
 from hypothesis import given
 import hypothesis.strategies as st
 
-from nmm.pieces import Piece, PieceState
+from nmm.pieces import Piece, PieceState, PieceList
 from nmm.boards import Cell
 from nmm.players import Player as AbstractPlayer
 
@@ -142,6 +142,10 @@ class TestPiece(unittest.TestCase):
         piece.cell = None
         self.assertIsNone(piece.cell)
 
+    def test_piece_slots(self):
+        piece = Piece(owner="Player 1", _id=0)
+        self.assertFalse(hasattr(piece, '__dict__'))
+
     def test_piece_state(self):
         piece = Piece(owner="Player 1", _id=0)
         self.assertEqual(piece.state, PieceState.READY)
@@ -151,3 +155,54 @@ class TestPiece(unittest.TestCase):
         
         piece.state = PieceState.DEAD
         self.assertEqual(piece.state, PieceState.DEAD)
+
+
+class TestPieceList(unittest.TestCase):
+
+    @given(size=st.integers(min_value=1, max_value=9), data=st.data())
+    def test_remove_restore(self, size, data):
+        pieces = [Piece(owner="Player 1", _id=i) for i in range(size)]
+        plist = PieceList(pieces)
+        self.assertListEqual(plist, pieces)
+        piece = data.draw(st.sampled_from(pieces))
+        position = plist.index(piece)
+        plist.remove(piece)
+        self.assertEqual(len(plist), size - 1)
+        self.assertNotIn(piece, plist)
+        self.assertSetEqual(set(plist), set(pieces) - {piece})
+        for i, other in enumerate(plist):
+            self.assertEqual(plist.index(other), i)
+        plist.restore(position, piece)
+        self.assertListEqual(plist, pieces)
+        for i, other in enumerate(plist):
+            self.assertEqual(plist.index(other), i)
+
+    def test_append_pop(self):
+        plist = PieceList()
+        piece = Piece(owner="Player 1", _id=0)
+        plist.append(piece)
+        self.assertIn(piece, plist)
+        self.assertIs(plist.pop(), piece)
+        self.assertNotIn(piece, plist)
+        self.assertEqual(len(plist), 0)
+
+    def test_positions_kept(self):
+        pieces = [Piece(owner="Player 1", _id=i) for i in range(6)]
+        plist = PieceList(pieces[:2])
+        plist += pieces[2:4]
+        plist.extend(pieces[4:5])
+        self.assertListEqual(plist, pieces[:5])
+        for i, piece in enumerate(plist):
+            self.assertEqual(plist.index(piece), i)
+        for mutate in (lambda: plist.insert(0, pieces[5]), lambda: plist.__setitem__(0, pieces[5]),
+                       lambda: plist.__delitem__(0), lambda: plist.pop(0), lambda: plist.sort(),
+                       lambda: plist.reverse()):
+            with self.assertRaises(TypeError):
+                mutate()
+        self.assertListEqual(plist, pieces[:5])
+        plist.remove(pieces[0])  # the last piece takes its position
+        self.assertEqual(plist.index(pieces[4]), 0)
+        self.assertIs(plist.pop(len(plist) - 1), pieces[3])
+        plist.clear()
+        self.assertNotIn(pieces[1], plist)
+        self.assertEqual(len(plist), 0)
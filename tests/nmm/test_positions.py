@@ -0,0 +1,148 @@
+import unittest
+import random
+from hypothesis import given, settings
+import hypothesis.strategies as st
+from nmm.topology import NUM_CELLS, MILL_MASKS, mask_to_ids
+from nmm.positions import Position, NO_ACTION, NUM_TURNS, VICTIMS, encode_turn, decode_turn
+from nmm.actions import PLACE, MOVE, KILL, NUM_ACTIONS, decode_action
+from nmm.zobrist import SIDE_KEY
+from nmm.dtypes import PlayerState
+from nmm.boards import Board
+from nmm.bitboards import BitBoard
+
+
+def play_on_board(board, position, action):
+    """Play an action of the side to move of `position` on a `Board` (the same way the game does)."""
+    player = board.players[position.side]
+    cells = decode_action(board, action)
+    if action >= KILL:
+        m = mask_to_ids(position.pending)[0]
+        board.kill(cells, board._mills[m])
+    elif action >= MOVE:
+        if board.get_player_state(player) == PlayerState.FLYING:
+            board.fly(*cells)
+        else:
+            board.move(*cells)
+    else:
+        board.place(cells, player)
+
+
+class TestPosition(unittest.TestCase):
+    def setUp(self):
+        self.players = ('x', 'y')
+
+    def test_initial(self):
+        position = Position()
+        self.assertEqual(position.state, PlayerState.PLACING)
+        self.assertEqual(position.actions(), list(range(PLACE, PLACE + NUM_CELLS)))
+        self.assertEqual(position.key, Board(self.players).zobrist)
+        self.assertEqual(Position.from_board(Board(self.players), 'x'), position)
+        self.assertEqual(Position.from_board(BitBoard(self.players), 'y').key, position.key ^ SIDE_KEY)
+        with self.assertRaises(ValueError):
+            Position((1, 1))
+        with self.assertRaises(ValueError):
+            Position(side=2)
+        with self.assertRaises(ValueError):
+            decode_action(Board(self.players), NUM_ACTIONS)
+
+    def test_kill(self):
+        position = Position((MILL_MASKS[0] & ~(MILL_MASKS[0] & -MILL_MASKS[0]), 0b111 << 9), (5, 6))
+        closing = PLACE + mask_to_ids(MILL_MASKS[0])[0]
+        snapshot = position.apply(closing)
+        self.assertEqual((position.side, position.state), (0, PlayerState.KILLING))
+        self.assertEqual(position.actions(), [KILL + c for c in (9, 10, 11)])
+        position.apply(KILL + 10)
+        self.assertEqual((position.side, position.pending, position.occupancy[1]), (1, 0, 0b101 << 9))
+        self.assertEqual(position.key, position._compute_key())
+        position.undo(snapshot)
+        self.assertEqual(position.state, PlayerState.PLACING)
+        self.assertEqual(position.key, position._compute_key())
+
+    @settings(max_examples=30, deadline=None)
+    @given(seed=st.integers(min_value=0, max_value=2 ** 16))
+    def test_random_game(self, seed):
+        rng = random.Random(seed)
+        board = Board(self.players)
+        position = Position()
+        for _ in range(120):
+            actions = position.actions()
+            if position.is_lost() or not actions:
+                break
+            action = rng.choice(actions)
+            before = position.copy()
+            snapshot = position.apply(action)
+            self.assertEqual(position.key, position._compute_key())
+            position.undo(snapshot)
+            self.assertEqual(position, before)
+            self.assertEqual(position.key, before.key)
+            play_on_board(board, position, action)
+            position.apply(action)
+            player = board.players[position.side]
+            self.assertEqual(position.key, board.zobrist ^ (SIDE_KEY if position.side else 0))
+            self.assertEqual(Position.from_board(board, player), position)
+            self.assertEqual(Position.from_board(BitBoard.from_board(board), player), position)
+            self.assertIn(position.copy(), {position})
+
+
+    def test_encode_turn(self):
+        self.assertEqual(len(VICTIMS), 1 + NUM_CELLS + NUM_CELLS * (NUM_CELLS - 1) // 2)
+        self.assertEqual(encode_turn(PLACE + 5), PLACE + 5)
+        for turn in range(0, NUM_TURNS, 97):
+            self.assertEqual(encode_turn(*decode_turn(turn)), turn)
+        for action, victims in [(NO_ACTION + 1, 0), (PLACE, 0b111)]:
+            with self.assertRaises(ValueError):
+                encode_turn(action, victims)
+        with self.assertRaises(ValueError):
+            decode_turn(NUM_TURNS)
+
+    @settings(max_examples=20, deadline=None)
+    @given(seed=st.integers(min_value=0, max_value=2 ** 16))
+    def test_turns(self, seed):
+        """A turn is its action followed by its kills, played at once."""
+        rng = random.Random(seed)
+        position = Position()
+        for _ in range(rng.randrange(40)):
+            if position.is_lost() or not position.actions():
+                return
+            position.apply(rng.choice(position.actions()))
+        turns, side = position.turns(), position.side
+        self.assertEqual(len(set(turns)), len(turns))
+        for turn in turns:
+            action, victims = decode_turn(turn)
+            expected = position.copy()
+            if action != NO_ACTION:
+                expected.apply(action)
+            self.assertEqual(bool(victims), bool(expected.pending) and expected.side == position.side)
+            for c in range(NUM_CELLS):
+                if victims >> c & 1:
+                    expected.apply(KILL + c)
+            snapshot = position.play(turn)
+            self.assertEqual(position, expected)
+            self.assertEqual(position.key, expected.key)
+            self.assertEqual(position.side, 1 - side)
+            position.undo(snapshot)
+
+    @settings(max_examples=20, deadline=None)
+    @given(seed=st.integers(min_value=0, max_value=2 ** 16))
+    def test_actions_to(self, seed):
+        rng = random.Random(seed)
+        position = Position()
+        for _ in range(rng.randrange(60)):
+            if position.is_lost() or not position.actions():
+                return
+            position.apply(rng.choice(position.actions()))
+        self.assertEqual(position.actions_to(position.copy()), [])
+        for turn in position.turns():
+            after = position.copy()
+            after.play(turn)
+            actions = position.actions_to(after)
+            played = position.copy()
+            for action in actions:
+                played.apply(action)
+            self.assertEqual(played, after)
+            self.assertIsNone(after.actions_to(position))
+        self.assertIsNone(Position().actions_to(Position(ready=(8, 9), side=1)))  # a placement from nowhere
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import unittest
+import random
+import numpy as np
+from math import comb
+from hypothesis import given, settings
+import hypothesis.strategies as st
+from nmm.ranking import PositionClass, CLASSES, CLASS_OFFSETS, NUM_POSITIONS, class_size, rank, unrank, \
+                        position_class, rank_board, global_rank, global_unrank, rank_array, unrank_array
+from nmm.boards import Board
+from nmm.bitboards import BitBoard
+
+
+def random_masks(rng, placed0, placed1):
+    cells = rng.sample(range(24), placed0 + placed1)
+    return sum(1 << c for c in cells[:placed0]), sum(1 << c for c in cells[placed0:])
+
+
+class TestRanking(unittest.TestCase):
+
+    def test_classes(self):
+        self.assertEqual(len(CLASSES), 55 * 55)
+        self.assertEqual(class_size(PositionClass(3, 3)), comb(24, 3) * comb(21, 3) * 2)
+        self.assertEqual(PositionClass(8, 7).name, '8v7')
+        self.assertEqual(PositionClass(2, 1, 7, 8).name, '2+7v1+8')
+        self.assertEqual(PositionClass(2, 1, 7, 8).dead1, 0)
+        self.assertEqual(CLASS_OFFSETS[CLASSES[-1]] + CLASSES[-1].size, NUM_POSITIONS)
+
+    def test_small_class_is_dense(self):
+        cls = PositionClass(2, 1)
+        indices = set()
+        for c0 in range(24):
+            for c1 in range(c0 + 1, 24):
+                for c2 in range(24):
+                    if c2 in (c0, c1):
+                        continue
+                    for side in (0, 1):
+                        indices.add(rank(1 << c0 | 1 << c1, 1 << c2, side))
+        self.assertSetEqual(indices, set(range(class_size(cls))))
+
+    @given(seed=st.integers(min_value=0, max_value=2 ** 32),
+           placed0=st.integers(min_value=0, max_value=9),
+           placed1=st.integers(min_value=0, max_value=9),
+           side=st.sampled_from([0, 1]))
+    def test_rank_unrank(self, seed, placed0, placed1, side):
+        cls = PositionClass(placed0, placed1)
+        mask0, mask1 = random_masks(random.Random(seed), placed0, placed1)
+        index = rank(mask0, mask1, side)
+        self.assertTrue(0 <= index < class_size(cls))
+        self.assertTupleEqual(unrank(index, cls), (mask0, mask1, side))
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            rank(1, 1, 0)
+        with self.assertRaises(ValueError):
+            rank(1, 2, 2)
+        with self.assertRaises(ValueError):
+            unrank(class_size(PositionClass(1, 1)), PositionClass(1, 1))
+        with self.assertRaises(ValueError):
+            global_unrank(NUM_POSITIONS)
+
+    @settings(max_examples=20)
+    @given(seed=st.integers(min_value=0, max_value=2 ** 32))
+    def test_boards(self, seed):
+        rng = random.Random(seed)
+        board = Board(['x', 'y'])
+        for _ in range(rng.randrange(1, 18)):
+            player = rng.choice(board.players)
+            if board.get_my_ready_pieces(player):
+                board.place(rng.choice(board.get_empty_cells()), player)
+        board.kill(rng.choice(board.get_occupied_cells()))
+        side = rng.randrange(2)
+        cls, index = rank_board(board, side)
+        self.assertEqual(cls, position_class(BitBoard.from_board(board)))
+        self.assertEqual(cls.dead0 + cls.dead1, 1)
+        self.assertEqual(rank_board(BitBoard.from_board(board), side), (cls, index))
+        cls, mask0, mask1, s = global_unrank(global_rank(board, side))
+        self.assertEqual(cls, position_class(board))
+        self.assertTupleEqual((mask0, mask1, s), (*BitBoard.from_board(board).occupancy, side))
+
+    @settings(max_examples=10)
+    @given(seed=st.integers(min_value=0, max_value=2 ** 32),
+           placed0=st.integers(min_value=0, max_value=9),
+           placed1=st.integers(min_value=0, max_value=9))
+    def test_arrays(self, seed, placed0, placed1):
+        rng = random.Random(seed)
+        cls = PositionClass(placed0, placed1)
+        indices = np.array([rng.randrange(class_size(cls)) for _ in range(100)], dtype=np.int64)
+        masks0, masks1, sides = unrank_array(indices, cls)
+        for i, index in enumerate(indices.tolist()):
+            self.assertTupleEqual((int(masks0[i]), int(masks1[i]), int(sides[i])), unrank(index, cls))
+        np.testing.assert_array_equal(rank_array(masks0, masks1, sides), indices)
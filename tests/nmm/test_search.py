@@ -0,0 +1,240 @@
+import unittest
+import random
+from hypothesis import given, settings
+import hypothesis.strategies as st
+import time
+from nmm.topology import NUM_CELLS, ADJACENT_MASKS, MILL_MASKS, CELL_MILLS, FULL_MASK, mask_to_ids
+from nmm.search import TranspositionTable, TTEntry, Bound, AlphaBeta, MoveOrdering, MATE, evaluate
+from nmm.positions import Position, NO_ACTION, encode_turn, decode_turn
+from nmm.actions import PLACE, MOVE_ACTIONS
+from nmm.dtypes import PlayerState
+from nmm.boards import Board
+from nmm.agent import HardAgent, EasyAgent
+
+
+class TestTranspositionTable(unittest.TestCase):
+
+    def test_size(self):
+        table = TranspositionTable(1)
+        self.assertEqual(table.capacity, 2 ** 20 // TranspositionTable.ENTRY_SIZE)
+        self.assertLessEqual(table.size_mb, 1)
+        self.assertEqual(TranspositionTable(3).capacity, table.capacity * 2)
+        self.assertEqual(len(table), 0)
+        with self.assertRaises(ValueError):
+            TranspositionTable(0)
+
+    @given(key=st.integers(min_value=0, max_value=2 ** 64 - 1),
+           depth=st.integers(min_value=0, max_value=254),
+           bound=st.sampled_from(Bound),
+           score=st.integers(min_value=-32768, max_value=32767),
+           move=st.one_of(st.none(), st.integers(min_value=0, max_value=TranspositionTable.MAX_MOVE)))
+    def test_store_and_probe(self, key, depth, bound, score, move):
+        table = TranspositionTable(0.01)
+        self.assertIsNone(table.probe(key))
+        table.store(key, depth, bound, score, move)
+        self.assertEqual(table.probe(key), TTEntry(depth, bound, score, move, 0))
+        self.assertIn(key, table)
+        self.assertNotIn(key ^ 1 << 63, table)
+        self.assertEqual(len(table), 1)
+
+    def test_out_of_range(self):
+        table = TranspositionTable(0.01)
+        for depth, score, move in [(-1, 0, None), (255, 0, None), (1, 2 ** 15, None), (1, 0, 2 ** 18 - 1)]:
+            with self.assertRaises(ValueError):
+                table.store(1, depth, Bound.EXACT, score, move)
+
+    def test_replacement(self):
+        table = TranspositionTable(0.001)
+        buckets = table.capacity // 2
+        deep, shallow, other = 5, 5 + buckets, 5 + 2 * buckets  # all in the same bucket
+        table.store(deep, 8, Bound.EXACT, 1)
+        table.store(shallow, 2, Bound.LOWER, 2)
+        self.assertEqual(table.probe(deep).depth, 8)
+        self.assertEqual(table.probe(shallow).depth, 2)
+        table.store(other, 3, Bound.UPPER, 3)  # always-replace slot
+        self.assertIsNone(table.probe(shallow))
+        self.assertEqual(table.probe(deep).depth, 8)
+        table.store(deep, 1, Bound.UPPER, 4)   # same position, replaced
+        self.assertEqual(table.probe(deep), TTEntry(1, Bound.UPPER, 4, None, 0))
+        self.assertEqual(len(table), 2)
+
+    def test_aging(self):
+        table = TranspositionTable(0.001)
+        buckets = table.capacity // 2
+        table.store(7, 10, Bound.EXACT, 1)
+        table.new_search()
+        self.assertEqual(table.probe(7).generation, 0)
+        table.store(7 + buckets, 1, Bound.EXACT, 2, 3)  # the old deep entry is replaced first
+        self.assertEqual(table.probe(7 + buckets), TTEntry(1, Bound.EXACT, 2, 3, 1))
+        self.assertEqual(table.probe(7).depth, 10)      # ... but kept in the always-replace slot
+        table.store(7 + 2 * buckets, 0, Bound.EXACT, 3)
+        self.assertIsNone(table.probe(7))
+
+    @settings(max_examples=10)
+    @given(seed=st.integers(min_value=0, max_value=2 ** 16))
+    def test_hashfull(self, seed):
+        rng = random.Random(seed)
+        table = TranspositionTable(0.01)
+        for _ in range(table.capacity * 4):
+            table.store(rng.getrandbits(64), rng.randrange(10), Bound.EXACT, 0)
+        self.assertGreater(table.hashfull(), 500)
+        table.new_search()
+        self.assertEqual(table.hashfull(), 0)
+        table.clear()
+        self.assertEqual(len(table), 0)
+
+    def test_shared_by_agents(self):
+        table = TranspositionTable(0.01)
+        agent = HardAgent('Hard', transposition_table=table)
+        self.assertIs(agent.transposition_table, table)
+        self.assertIsInstance(HardAgent('Other').transposition_table, TranspositionTable)
+
+
+def mate_in_one():
+    """A position where the first side (4 pieces) closes a mill by a move, and kills the third piece of the second side."""
+    for mill in MILL_MASKS:
+        a, b, c = mask_to_ids(mill)
+        for d in mask_to_ids(ADJACENT_MASKS[c] & ~mill):
+            mine = (1 << a) | (1 << b) | (1 << d)
+            free = [x for x in mask_to_ids(FULL_MASK & ~mine & ~(1 << c)) if not ADJACENT_MASKS[c] >> x & 1]
+            mine |= 1 << free[0]
+            return Position((mine, sum(1 << x for x in free[1:4])), (0, 0)), MOVE_ACTIONS[d][c]
+
+
+class TestAlphaBeta(unittest.TestCase):
+
+    def test_mate_in_one(self):
+        position, action = mate_in_one()
+        result = AlphaBeta().search(position, max_depth=4)
+        self.assertEqual(result.score, MATE - 1)
+        self.assertTrue(result.mate)
+        self.assertEqual(result.depth, 1)
+        self.assertEqual(decode_turn(result.turn)[0], action)
+        self.assertEqual(result.pv, [result.turn])
+        position.play(result.turn)
+        self.assertTrue(position.is_lost())
+
+    def test_deadline(self):
+        reports = []
+        searcher = AlphaBeta(info=reports.append)
+        start = time.perf_counter()
+        result = searcher.search(Position(), time_limit=0.3)
+        self.assertLess(time.perf_counter() - start, 1.0)
+        self.assertIn(result.turn, Position().turns())
+        self.assertGreaterEqual(result.depth, 1)
+        self.assertEqual(result.pv[0], result.turn)
+        self.assertGreater(result.nodes, 0)
+        self.assertGreater(result.nps, 0)
+        self.assertEqual([r.depth for r in reports], list(range(1, result.depth + 1)))
+        self.assertGreater(len(searcher.transposition_table), 0)
+
+    def test_depth(self):
+        result = AlphaBeta().search(Board(('x', 'y')), 'y', max_depth=2)
+        self.assertEqual(result.depth, 2)
+        self.assertEqual(len(result.pv), 2)
+        with self.assertRaises(ValueError):
+            AlphaBeta().search(Board(('x', 'y')))
+        with self.assertRaises(ValueError):
+            AlphaBeta().search(Position(), max_depth=0)
+
+    def test_evaluate(self):
+        position, action = mate_in_one()
+        self.assertGreater(evaluate(position), 0)
+        position.side = 1
+        self.assertLess(evaluate(position), 0)
+
+
+class TestMoveOrdering(unittest.TestCase):
+
+    def test_order(self):
+        mine, theirs = MILL_MASKS[0], MILL_MASKS[-1]
+        closing, blocking = mine & -mine, theirs & -theirs
+        position = Position((mine ^ closing, theirs ^ blocking), (5, 5))
+        closing, blocking = closing.bit_length() - 1, blocking.bit_length() - 1
+        kills = [encode_turn(PLACE + closing, 1 << victim) for victim in mask_to_ids(theirs & ~(1 << blocking))]
+        quiet = [t for t in position.turns() if t not in kills + [PLACE + blocking]]
+        tt_turn, killer, other = quiet[-1], quiet[-2], quiet[-3]
+        ordering = MoveOrdering()
+        ordering.cutoff(0, killer, 1, 2)
+        ordering.cutoff(0, other, 3, 3)
+        ordering.cutoff(1, quiet[0], 5, 4)
+        ordering.cutoff(0, kills[0], 1, 2)  # not a killer
+        self.assertEqual(ordering.history[0][other], 9)
+        ordering.order(position, turns := position.turns(), tt_turn, 2)
+        self.assertEqual(turns[:6], [tt_turn] + kills + [PLACE + blocking, killer, other])
+        self.assertEqual(turns[6:], sorted(turns[6:]))
+        ordering.new_search()
+        self.assertEqual(ordering.killers[2], [None, None])
+        self.assertEqual(ordering.history[0][other], 4)
+
+    def test_kills(self):
+        mine, theirs = MILL_MASKS[0], MILL_MASKS[-1] & ~(MILL_MASKS[-1] & -MILL_MASKS[-1])
+        alone = next(c for c in range(NUM_CELLS) if not (mine | theirs) >> c & 1
+                     and all(MILL_MASKS[m] & theirs == 0 for m in CELL_MILLS[c]))
+        position = Position((mine, theirs | 1 << alone), (0, 0), pending=1)
+        turns = MoveOrdering().order(position, position.turns(), None, 0)
+        self.assertEqual(len(turns), 3)
+        self.assertEqual(turns[-1], encode_turn(NO_ACTION, 1 << alone))  # the only piece not on a mill the opponent can close
+
+    def test_fewer_nodes(self):
+        class Unordered(MoveOrdering):
+            def order(self, position, turns, tt_turn, ply):
+                return turns
+        rng = random.Random(1)
+        position = Position()
+        for _ in range(12):
+            position.play(rng.choice(position.turns()))
+        nodes = []
+        for ordering in (MoveOrdering(), Unordered()):
+            searcher = AlphaBeta()
+            searcher.ordering = ordering
+            result = searcher.search(position.copy(), max_depth=5)
+            nodes.append(result.nodes)
+        self.assertLess(nodes[0], nodes[1])
+
+
+class TestSearchAgents(unittest.TestCase):
+
+    @settings(max_examples=5, deadline=None)
+    @given(seed=st.integers(min_value=0, max_value=2 ** 16))
+    def test_legal_actions(self, seed):
+        rng = random.Random(seed)
+        board = Board(('x', 'y'))
+        for _ in range(rng.randrange(6)):
+            for player in board.players:
+                board.place(rng.choice(board.get_empty_cells()), player)
+        state = board.get_player_state('x')  # the placements may have closed a mill of 'x'
+        legal = board.get_empty_cells() if state == PlayerState.PLACING else board.get_opponent_cells('x')
+        for agent in (EasyAgent('x', time_limit=0.1), HardAgent('x', time_limit=0.1)):
+            self.assertIn(agent.play(board.clone(), state), legal)
+            self.assertLessEqual(agent.last_search.depth, agent.max_depth)
+
+    def test_kill(self):
+        board = Board(('x', 'y'))
+        a, b, c = mask_to_ids(MILL_MASKS[0])
+        for x, y in ((a, 20), (b, 21), (c, 23)):
+            board.place(board.cells[x], 'x')
+            board.place(board.cells[y], 'y')
+        self.assertEqual(board.get_player_state('x'), PlayerState.KILLING)
+        agent = EasyAgent('x', time_limit=0.2)
+        self.assertIn(agent.play(board, PlayerState.KILLING), board.get_opponent_cells('x'))
+        self.assertEqual(decode_turn(agent.last_search.turn)[0], NO_ACTION)
+        self.assertEqual(agent.clone().time_limit, 0.2)
+        with self.assertRaises(ValueError):
+            EasyAgent('x', time_limit=0)
+
+    def test_kill_of_the_turn(self):
+        board = Board(('x', 'y'))
+        a, b, c = mask_to_ids(MILL_MASKS[0])
+        for x, y in ((a, 20), (b, 21)):
+            board.place(board.cells[x], 'x')
+            board.place(board.cells[y], 'y')
+        agent = HardAgent('x', max_depth=1)
+        cell = agent.play(board, PlayerState.PLACING)
+        self.assertEqual(cell, board.cells[c])
+        search = agent.last_search
+        board.place(cell, 'x')
+        self.assertEqual(board.get_player_state('x'), PlayerState.KILLING)
+        victim = agent.play(board, PlayerState.KILLING)
+        self.assertIs(agent.last_search, search)  # the kill of the searched turn
+        self.assertEqual(1 << victim.id, decode_turn(search.turn)[1])
@@ -0,0 +1,80 @@
+import unittest
+import random
+from hypothesis import given, settings
+import hypothesis.strategies as st
+from nmm.symmetry import PERMUTATIONS, INVERSE, MILL_PERMUTATIONS, NUM_TRANSFORMS, transform_cell, \
+                         transform_mask, transform_mill_mask, canonical_masks, transform_board, \
+                         canonicalize, canonical_key
+from nmm.topology import CELLS, ADJACENT_MASKS, MILL_CELLS, mask_to_ids
+from nmm.boards import Board
+from nmm.bitboards import BitBoard
+from nmm.dtypes import PlayerState
+
+
+def random_board(seed, plies=30):
+    rng = random.Random(seed)
+    board = Board(['x', 'y'])
+    player = 'x'
+    for _ in range(plies):
+        if board.get_my_ready_pieces(player):
+            board.place(rng.choice(board.get_empty_cells()), player)
+        elif board.get_possible_moves(player):
+            board.move(*rng.choice(board.get_possible_moves(player)))
+        if board.get_player_state(player) == PlayerState.KILLING and rng.random() < 0.7:
+            mill = [mill for mill in board.get_my_mills(player) if not mill.utilized][0]
+            board.kill(rng.choice(board.get_opponent_cells(player)), mill)
+        player = board.get_opponent(player)
+    return board
+
+
+class TestSymmetry(unittest.TestCase):
+
+    def test_permutations(self):
+        self.assertEqual(NUM_TRANSFORMS, 16)
+        self.assertEqual(len(set(PERMUTATIONS)), 16)
+        self.assertTupleEqual(PERMUTATIONS[0], tuple(range(24)))
+        for t, permutation in enumerate(PERMUTATIONS):
+            self.assertListEqual(sorted(permutation), list(range(24)))
+            for c in range(24):
+                self.assertEqual(PERMUTATIONS[INVERSE[t]][permutation[c]], c)
+                self.assertEqual(transform_mask(ADJACENT_MASKS[c], t), ADJACENT_MASKS[permutation[c]])
+                self.assertEqual(transform_cell(CELLS[c], t), CELLS[permutation[c]])
+            for m, mill in enumerate(MILL_CELLS):
+                self.assertSetEqual({permutation[c] for c in mill}, set(MILL_CELLS[MILL_PERMUTATIONS[t][m]]))
+
+    @given(mask=st.integers(min_value=0, max_value=2 ** 24 - 1), t=st.integers(min_value=0, max_value=15))
+    def test_transform_mask(self, mask, t):
+        self.assertSetEqual(set(mask_to_ids(transform_mask(mask, t))),
+                            {PERMUTATIONS[t][c] for c in mask_to_ids(mask)})
+        self.assertEqual(transform_mask(transform_mask(mask, t), INVERSE[t]), mask)
+        mills = mask & 0xFFFF
+        self.assertEqual(transform_mill_mask(transform_mill_mask(mills, t), INVERSE[t]), mills)
+
+    @given(mask0=st.integers(min_value=0, max_value=2 ** 24 - 1), t=st.integers(min_value=0, max_value=15))
+    def test_canonical_masks(self, mask0, t):
+        mask1 = (2 ** 24 - 1) & ~mask0 & 0x5A5A5A
+        canonical = canonical_masks(mask0, mask1)
+        self.assertTupleEqual(canonical_masks(transform_mask(mask0, t), transform_mask(mask1, t))[:3], canonical[:3])
+        self.assertTupleEqual(canonical[:2], (transform_mask(mask0, canonical[3]), transform_mask(mask1, canonical[3])))
+
+    @settings(max_examples=20, deadline=None)
+    @given(seed=st.integers(min_value=0, max_value=2 ** 16), t=st.integers(min_value=0, max_value=15))
+    def test_canonicalize(self, seed, t):
+        board = random_board(seed)
+        image = transform_board(board, t)
+        self.assertEqual(image.zobrist, image._compute_hash())
+        self.assertEqual(transform_board(image, INVERSE[t]), board)
+        for cell in board.cells:
+            self.assertEqual(image.cells[PERMUTATIONS[t][cell.id]].occupant, cell.occupant)
+        for player in board.players:
+            self.assertEqual(image.get_player_state(player), board.get_player_state(player))
+            self.assertEqual(len(image.get_possible_moves(player)), len(board.get_possible_moves(player)))
+        canonical, s = canonicalize(board)
+        self.assertEqual(canonicalize(image)[0], canonical)
+        self.assertEqual(transform_board(board, s), canonical)
+        self.assertEqual(canonical_key(board), canonical.zobrist)
+        self.assertEqual(canonical_key(image), canonical.zobrist)
+        bitboard, u = canonicalize(BitBoard.from_board(board))
+        self.assertEqual(u, s)
+        self.assertTupleEqual(bitboard.occupancy, BitBoard.from_board(canonical).occupancy)
+        self.assertEqual(canonical_key(BitBoard.from_board(image)), canonical.zobrist)
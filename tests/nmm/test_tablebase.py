@@ -0,0 +1,261 @@
+import unittest
+import random
+import tempfile
+import numpy as np
+from nmm.topology import NUM_CELLS, FULL_MASK, ADJACENT_MASKS, MILL_MASKS, CELL_MILLS, mask_to_ids
+from nmm.tablebase import WDL, num_positions, tablebase_index, read_class, write_class, \
+                          solve_order, solve_group, predecessors
+from nmm.tablebase.generate import _positions, _threats, _ClassState, NO_WIN
+from nmm.tablebase.__main__ import main
+from nmm.tablebase.probe import Tablebase
+from nmm.tablebase.storage import Codec, class_file, read_header, pack, unpack, read_depths, write_depths
+from nmm.topology import CELLS
+from nmm.pieces import PieceState
+from nmm.dtypes import PlayerState
+from nmm.boards import Board
+from nmm.bitboards import BitBoard
+from nmm.positions import Position, decode_turn
+from nmm.agent import RandomAgent
+
+
+def make_board(mask_x, mask_y, utilize=True):
+    """A board with all pieces placed, `x` on the cells of `mask_x` and `y` on the cells of `mask_y`
+    (with the kills of their mills made if `utilize`)."""
+    board = Board(['x', 'y'])
+    for player, mask in (('x', mask_x), ('y', mask_y)):
+        for c in mask_to_ids(mask):
+            board.place(board.cells[c], player)
+        while board.get_my_ready_pieces(player):
+            piece = board._pieces[PieceState.READY][player].pop()
+            piece.state = PieceState.DEAD
+            board._pieces[PieceState.DEAD][player].append(piece)
+    if utilize:
+        for mill in board.mills:
+            mill.utilized = True
+    return board
+
+
+def successors(a, b, mover, other):
+    """Yield `(kill, mover, other)` for every turn of the side to move (after the turn, `other` is to move)."""
+    empty = FULL_MASK & ~(mover | other)
+    for src in mask_to_ids(mover):
+        targets = empty if a == 3 else empty & ADJACENT_MASKS[src]
+        for dst in mask_to_ids(targets):
+            moved = mover ^ (1 << src) ^ (1 << dst)
+            if any(moved & MILL_MASKS[m] == MILL_MASKS[m] for m in CELL_MILLS[dst]):
+                for victim in mask_to_ids(other):
+                    yield True, moved, other ^ (1 << victim)
+            else:
+                yield False, moved, other
+
+
+class Hashed:
+    """Stands for the values (or the depths) of a solved class: any index is mixed into one of `modulo` values."""
+
+    def __init__(self, modulo, seed):
+        self.modulo, self.seed = modulo, seed
+
+    def __getitem__(self, indices):
+        return (np.asarray(indices, dtype=np.int64) * 2654435761 + self.seed) % 1000003 % self.modulo
+
+
+class TestTablebase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.values, cls.depths = solve_group([(3, 3)], {})[(3, 3)]
+        cls.directory = tempfile.TemporaryDirectory()
+        write_class(cls.directory.name, 3, 3, cls.values)
+        write_depths(cls.directory.name, 3, 3, cls.depths)
+        cls.tablebase = Tablebase(cls.directory.name)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tablebase.close()
+        cls.directory.cleanup()
+
+    def test_solve_order(self):
+        self.assertEqual(solve_order(3), [[(3, 3)]])
+        self.assertEqual(solve_order(4), [[(3, 3)], [(3, 4), (4, 3)], [(4, 4)]])
+        groups = solve_order()
+        self.assertEqual(sum(len(group) for group in groups), 7 * 7)
+        self.assertEqual(groups[-1], [(9, 9)])
+        self.assertEqual(solve_order(5, flying=True), [[(3, 3)], [(3, 4), (4, 3)], [(3, 5), (5, 3)]])
+
+    def test_values(self):
+        self.assertEqual(len(self.values), num_positions(3, 3))
+        self.assertEqual(tuple(np.bincount(self.values, minlength=3)), (455648, 4112, 2232160))
+
+    def test_consistency(self):
+        rng = np.random.default_rng(7)
+        indices = rng.choice(num_positions(3, 3), 300, replace=False)
+        movers, others = _positions(3, 3, indices)
+        for index, mover, other in zip(indices.tolist(), movers.tolist(), others.tolist()):
+            children = []
+            for kill, moved, rest in successors(3, 3, mover, other):
+                if kill:
+                    children.append((WDL.LOSS, 0))  # the other side is left with two pieces
+                else:
+                    child = int(tablebase_index(np.array([rest]), np.array([moved]))[0])
+                    children.append((WDL(self.values[child]), int(self.depths[child])))
+            value, depth = WDL(self.values[index]), int(self.depths[index])
+            if value == WDL.WIN:
+                self.assertEqual(depth, 1 + min(d for v, d in children if v == WDL.LOSS))
+            elif value == WDL.LOSS:
+                self.assertTrue(all(v == WDL.WIN for v, _ in children))
+                self.assertEqual(depth, 1 + max(d for _, d in children) if children else 0)
+            else:
+                self.assertNotIn(WDL.LOSS, [v for v, _ in children])
+                self.assertIn(WDL.DRAW, [v for v, _ in children])
+
+    def test_kills(self):
+        rng = np.random.default_rng(3)
+        closures = [0, 0, 0]  # the turns killing 0, 1 or 2 pieces
+        for a, b in [(4, 3), (5, 4), (6, 5), (9, 9)]:
+            solved = {(b - kills, a): (Hashed(3, kills), Hashed(40, kills + 2)) for kills in (1, 2) if b - kills >= 3}
+            indices = rng.choice(num_positions(a, b), 300, replace=False)
+            movers, others = _positions(a, b, indices)
+            state = _ClassState(a, b, size=len(indices))
+            state.initialize_rows(np.arange(len(indices)), movers, others, solved)
+            for row, (mover, other) in enumerate(zip(movers.tolist(), others.tolist())):
+                position, moves, children = Position((mover, other), (0, 0)), 0, []
+                for turn in position.turns():
+                    kills = decode_turn(turn)[1].bit_count()
+                    closures[kills] += 1
+                    child = position.copy()
+                    child.play(turn)
+                    if not kills:
+                        moves += 1
+                    elif child.is_lost():
+                        children.append((WDL.LOSS, 0))
+                    else:
+                        values, depths = solved[(b - kills, a)]
+                        child = tablebase_index(np.array([child.occupancy[1]]), np.array([child.occupancy[0]]))
+                        children.append((WDL(int(values[child][0])), int(depths[child][0])))
+                self.assertEqual(state.count[row], moves)
+                self.assertEqual(state.win[row], min([d + 1 for v, d in children if v == WDL.LOSS], default=NO_WIN))
+                self.assertEqual(state.floor[row], max([d + 1 for v, d in children if v == WDL.WIN], default=0))
+                self.assertEqual(state.blocked[row], WDL.DRAW in [v for v, _ in children])
+        self.assertGreater(closures[1], 0)
+        self.assertEqual(closures[2], 0)  # a moved piece leaves one of the two mills of its destination
+
+    def test_threats(self):
+        rng = np.random.default_rng(4)
+        for a, b in [(3, 3), (3, 5), (3, 8)]:
+            movers, others = _positions(a, b, rng.choice(num_positions(a, b), 50, replace=False))
+            threats = _threats(others, b == 3)
+            for mover, other, threat in zip(movers.tolist(), others.tolist(), threats.tolist()):
+                for c in range(NUM_CELLS):
+                    if other >> c & 1:
+                        continue
+                    closing = any(kill and moved >> c & 1 for kill, moved, _ in successors(b, a, other, mover & ~(1 << c)))
+                    self.assertEqual(closing, bool(threat >> c & 1))
+
+    def test_predecessors(self):
+        rng = np.random.default_rng(11)
+        for a, b in [(3, 3), (4, 3), (3, 5), (6, 6)]:
+            indices = rng.choice(num_positions(a, b), 20, replace=False)
+            movers, others = _positions(a, b, indices)
+            before = predecessors(a, b, indices)
+            before_movers, before_others = _positions(b, a, before)
+            targets = set(tablebase_index(movers, others).tolist())
+            for mover, other in zip(before_movers.tolist(), before_others.tolist()):
+                reached = {int(tablebase_index(np.array([rest]), np.array([moved]))[0])
+                           for kill, moved, rest in successors(b, a, mover, other) if not kill}
+                self.assertTrue(reached & targets)
+            # every position reached by a move that does not close a mill has its predecessor
+            for mover, other in zip(before_movers[:5].tolist(), before_others[:5].tolist()):
+                for kill, moved, rest in successors(b, a, mover, other):
+                    if not kill:
+                        child = tablebase_index(np.array([rest]), np.array([moved]))
+                        parent = tablebase_index(np.array([mover]), np.array([other]))[0]
+                        self.assertIn(parent, predecessors(a, b, child))
+
+    def test_storage(self):
+        values = np.random.default_rng(1).integers(0, 3, 1001).astype(np.uint8)
+        self.assertTrue(np.array_equal(unpack(pack(values), len(values)), values))
+        self.assertEqual(len(pack(values)), 251)
+        self.assertTrue(np.array_equal(read_class(self.directory.name, 3, 3), self.values))
+        with tempfile.TemporaryDirectory() as directory:
+            write_class(directory, 3, 3, self.values, Codec.LZMA, block_size=1 << 20)
+            header = read_header(class_file(directory, 3, 3))
+            self.assertEqual(header, (3, 3, num_positions(3, 3), Codec.LZMA, 2, 1 << 20))
+            self.assertEqual(header.blocks, 3)
+            self.assertTrue(np.array_equal(read_class(directory, 3, 3), self.values))
+            with self.assertRaises(ValueError):
+                write_class(directory, 3, 4, self.values)
+            with self.assertRaises(ValueError):
+                write_class(directory, 3, 3, self.values, block_size=1001)
+            write_depths(directory, 3, 3, self.depths.astype(np.uint16) * 300, block_size=1 << 10)
+            self.assertEqual(read_header(class_file(directory, 3, 3, 'dtm')).bits, 16)
+            self.assertTrue(np.array_equal(read_depths(directory, 3, 3), self.depths * 300))
+            with Tablebase(directory) as tablebase:
+                self.assertEqual(tablebase.probe_masks(0b111, 0b111 << 8), (WDL.WIN, 300 * self.depths[
+                    tablebase_index(np.array([0b111]), np.array([0b111 << 8]))[0]]))
+        self.assertEqual(read_header(class_file(self.directory.name, 3, 3, 'dtm')).bits, 8)
+        self.assertTrue(np.array_equal(read_depths(self.directory.name, 3, 3), self.depths))
+
+    def test_block_cache(self):
+        with Tablebase(self.directory.name, cache_mb=0.2) as tablebase:
+            rng = np.random.default_rng(2)
+            indices = rng.choice(num_positions(3, 3), 200, replace=False)
+            movers, others = _positions(3, 3, indices)
+            for index, mover, other in zip(indices.tolist(), movers.tolist(), others.tolist()):
+                self.assertEqual(tablebase.probe_masks(mover, other)[0], self.values[index])
+                self.assertLessEqual(tablebase._cached, tablebase.cache_size)
+            self.assertGreater(len(tablebase._cache), 1)  # 16 KB blocks of values, 64 KB blocks of depths
+            self.assertEqual(tablebase._cached, sum(len(block) for block in tablebase._cache.values()))
+
+    def test_command_line(self):
+        with self.assertRaises(SystemExit):
+            main(['build', '--max-pieces', '2'])
+
+    def test_probe(self):
+        self.assertEqual(self.tablebase.classes, [(3, 3)])
+        rng = np.random.default_rng(5)
+        indices = rng.choice(num_positions(3, 3), 50, replace=False)
+        movers, others = _positions(3, 3, indices)
+        for index, mover, other in zip(indices.tolist(), movers.tolist(), others.tolist()):
+            expected = (WDL(self.values[index]), int(self.depths[index]))
+            self.assertEqual(self.tablebase.probe_masks(mover, other), expected)
+            board = make_board(mover, other)
+            self.assertEqual(self.tablebase.probe(board, 'x'), expected)
+            self.assertEqual(self.tablebase.probe(BitBoard.from_board(board), 'x'), expected)
+        self.assertIsNone(self.tablebase.probe_masks(0b1111, 0b111 << 8))  # 4v3 was not built
+        self.assertIsNone(self.tablebase.probe(Board(['x', 'y']), 'x'))
+        with self.assertRaises(ValueError):
+            Tablebase(self.directory.name + '-missing')
+
+    def test_best_move(self):
+        rng = np.random.default_rng(9)
+        wins = np.flatnonzero(self.values == WDL.WIN)
+        for index in rng.choice(wins, 20, replace=False).tolist():
+            mover, other = (int(mask[0]) for mask in _positions(3, 3, np.array([index])))
+            board = make_board(mover, other)
+            source, destination = self.tablebase.best_move(board, 'x')
+            agent = RandomAgent('x', tablebase=self.directory.name)
+            self.assertEqual(agent.play(board, PlayerState.FLYING), (source, destination))
+            board.fly(source, destination)
+            if board.get_player_state('x') == PlayerState.KILLING:
+                victim = self.tablebase.best_kill(board, 'x')
+                self.assertEqual(agent.play(board, PlayerState.KILLING), victim)
+                board.kill(victim, [mill for mill in board.get_my_mills('x') if not mill.utilized][0])
+                self.assertEqual(board.get_player_state('y'), PlayerState.LOOSING)
+                self.assertEqual(self.depths[index], 1)
+            else:
+                self.assertEqual(self.tablebase.probe(board, 'y'), (WDL.LOSS, self.depths[index] - 1))
+        self.assertIsNone(RandomAgent('x').tablebase_play(board, PlayerState.FLYING))
+
+    def test_best_kills(self):
+        m1, m2 = CELL_MILLS[1]
+        mask_y = 0b1111 << 12
+        board = make_board(MILL_MASKS[m1] | MILL_MASKS[m2], mask_y, utilize=False)  # two kills to make
+        self.assertEqual(board.get_player_state('x'), PlayerState.KILLING)
+        agent = RandomAgent('x', tablebase=self.tablebase)
+        for left in (3, 2):  # one kill would lead to 3v5, which is not built: the two kills win at once
+            victim = self.tablebase.best_kill(board, 'x')
+            self.assertEqual(agent.play(board, PlayerState.KILLING), victim)
+            self.assertIn(victim.id, mask_to_ids(mask_y))
+            board.kill(victim, [mill for mill in board.get_my_mills('x') if not mill.utilized][0])
+            self.assertEqual(len(board.get_my_cells('y')), left)
+        self.assertEqual(board.get_player_state('y'), PlayerState.LOOSING)
@@ -0,0 +1,46 @@
+import unittest
+from itertools import product
+from nmm.topology import CELLS, CELL_IDS, NEIGHBORS, NEIGHBOR_KEYS, ADJACENT, ADJACENT_MASKS, \
+                         MILL_CELLS, MILL_MASKS, CELL_MILLS, FULL_MASK, mask_to_ids
+from nmm.boards import Board
+
+
+valid_cells = list(filter(lambda x: x[1:] != (1, 1), product([0, 1, 2], repeat=3)))
+
+
+class TestTopology(unittest.TestCase):
+
+    def test_cells(self):
+        self.assertEqual(len(CELLS), 24)
+        self.assertListEqual(list(CELLS), valid_cells)
+        for cell, c in CELL_IDS.items():
+            self.assertEqual(CELLS[c], cell)
+        self.assertEqual(FULL_MASK.bit_count(), 24)
+
+    def test_neighbor_table(self):
+        opposite = dict(right='left', left='right', upper='lower', 
+                        lower='upper', outer='inner', inner='outer')
+        for c, neighbors in enumerate(NEIGHBORS):
+            self.assertEqual(len(neighbors), len(NEIGHBOR_KEYS))
+            for key, n in zip(NEIGHBOR_KEYS, neighbors):
+                if n >= 0:
+                    self.assertEqual(NEIGHBORS[n][NEIGHBOR_KEYS.index(opposite[key])], c)
+        self.assertEqual(sum(len(adjacent) for adjacent in ADJACENT), 64)
+
+    def test_neighbors(self):
+        board = Board(['x', 'y'])
+        for cell in board.cells:
+            expected = {neighbor.id for neighbor in cell.neighbors.values()}
+            self.assertSetEqual(set(ADJACENT[cell.id]), expected)
+            self.assertSetEqual(set(mask_to_ids(ADJACENT_MASKS[cell.id])), expected)
+
+    def test_mills(self):
+        self.assertEqual(len(MILL_CELLS), 16)
+        self.assertEqual(len(set(MILL_CELLS)), 16)
+        for mill, mask in zip(MILL_CELLS, MILL_MASKS):
+            self.assertEqual(mask.bit_count(), 3)
+            self.assertTupleEqual(mask_to_ids(mask), mill)
+        for c in range(24):
+            self.assertEqual(len(CELL_MILLS[c]), 2)
+            for m in CELL_MILLS[c]:
+                self.assertIn(c, MILL_CELLS[m])